@@ -0,0 +1,4 @@
+"""
+Benchmarks for Ready Set Bet
+Run individual scripts with: python -m benchmarks.<name>
+"""
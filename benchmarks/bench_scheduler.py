@@ -0,0 +1,62 @@
+"""
+Scheduling overhead of the server timer scheduler
+Usage: python -m benchmarks.bench_scheduler [--timers 10000]
+"""
+import argparse
+import random
+import time
+
+from server.scheduler import TimerScheduler
+
+
+def _noop(*args):
+    pass
+
+
+def bench(timers: int, rounds: int = 5) -> dict:
+    """Time schedule/reschedule/cancel/fire with `timers` active timers"""
+    results = {"schedule": [], "reschedule": [], "cancel": [], "fire": []}
+    rng = random.Random(0)
+
+    for _ in range(rounds):
+        clock = [0.0]
+        scheduler = TimerScheduler(clock=lambda: clock[0])
+        delays = [rng.uniform(1, 300) for _ in range(timers)]
+
+        start = time.perf_counter()
+        for i, delay in enumerate(delays):
+            scheduler.schedule(("idle", i), delay, _noop)
+        results["schedule"].append(time.perf_counter() - start)
+
+        # Every session touching its idle timer once
+        start = time.perf_counter()
+        for i, delay in enumerate(delays):
+            scheduler.schedule(("idle", i), delay + 1, _noop)
+        results["reschedule"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(0, timers, 2):
+            scheduler.cancel(("idle", i))
+        results["cancel"].append(time.perf_counter() - start)
+
+        clock[0] = 1000.0
+        start = time.perf_counter()
+        scheduler.run_due()
+        results["fire"].append(time.perf_counter() - start)
+
+    counts = {"schedule": timers, "reschedule": timers, "cancel": timers // 2, "fire": timers - timers // 2}
+    return {op: min(times) / counts[op] * 1e6 for op, times in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--timers", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"Timer scheduler, {args.timers} active timers")
+    for op, usec in bench(args.timers).items():
+        print(f"  {op:<12} {usec:8.2f} µs/op")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Bytes on the wire and CPU per message with permessage-deflate
+Replays a race's worth of server messages through one connection: a
+state_sync after each of the 45 bets of a 9-player full board, with a small
+notification between them. Each setting reports the average frame size,
+the compression ratio against the uncompressed frames, and the time spent
+compressing and decompressing per message.
+
+Usage:
+    python -m benchmarks.compression [--encoding json|msgpack] [--board full|bitset]
+"""
+import argparse
+import time
+from typing import List
+
+from websockets import frames
+
+from benchmarks.suite import state_payload
+from src import protocol
+from src.board import compact_state
+from src.compression import DEFAULT_LEVEL, DEFAULT_MEM_LEVEL, DEFAULT_MIN_SIZE, DEFAULT_WINDOW_BITS, ThresholdDeflate
+
+SETTINGS = [
+    # (level, min_size, window_bits, mem_level)
+    (DEFAULT_LEVEL, DEFAULT_MIN_SIZE, DEFAULT_WINDOW_BITS, DEFAULT_MEM_LEVEL),
+    (DEFAULT_LEVEL, 0, DEFAULT_WINDOW_BITS, DEFAULT_MEM_LEVEL),
+    (DEFAULT_LEVEL, DEFAULT_MIN_SIZE, 12, DEFAULT_MEM_LEVEL),
+    (1, DEFAULT_MIN_SIZE, DEFAULT_WINDOW_BITS, DEFAULT_MEM_LEVEL),
+    (6, DEFAULT_MIN_SIZE, DEFAULT_WINDOW_BITS, DEFAULT_MEM_LEVEL),
+    (9, DEFAULT_MIN_SIZE, DEFAULT_WINDOW_BITS, 9),
+    # uvicorn's default: zlib defaults, every message compressed
+    (6, 0, 15, 8),
+]
+
+
+def race_messages(codec, compact_board: bool) -> List[bytes]:
+    """Encoded frames the server sends one connection during a race"""
+    full = state_payload()
+    messages = []
+    for count in range(len(full["current_bets"]) + 1):
+        bets = full["current_bets"][:count]
+        state = {**full, "current_bets": bets, "locked_spots": {bet["spot_key"]: bet["player"] for bet in bets}}
+        messages.append({"type": "state_sync", "trace_id": f"a1b2c3-{count:x}",
+                         "data": compact_state(state) if compact_board else state})
+        messages.append({"type": "player_connected", "player_name": f"Player{count % 9 + 1}"})
+    frames_out = []
+    for message in messages:
+        frame = codec.encode(message)
+        frames_out.append(frame.encode() if isinstance(frame, str) else frame)
+    return frames_out
+
+
+def replay(messages: List[bytes], opcode, level: int, min_size: int, window_bits: int, mem_level: int) -> dict:
+    """Compress and decompress every message through one connection's contexts"""
+    settings = {"level": level, "memLevel": mem_level}
+    sender = ThresholdDeflate(False, False, window_bits, window_bits, settings, min_size=min_size)
+    receiver = ThresholdDeflate(False, False, window_bits, window_bits, settings, min_size=min_size)
+    wire = compress_time = decompress_time = 0
+    for data in messages:
+        frame = frames.Frame(opcode, data)
+        start = time.perf_counter()
+        encoded = sender.encode(frame)
+        compress_time += time.perf_counter() - start
+        start = time.perf_counter()
+        decoded = receiver.decode(encoded)
+        decompress_time += time.perf_counter() - start
+        assert decoded.data == data
+        wire += len(encoded.data)
+    count = len(messages)
+    return {"bytes": wire / count, "compress_us": compress_time / count * 1e6,
+            "decompress_us": decompress_time / count * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="permessage-deflate bytes and CPU per message")
+    parser.add_argument("--encoding", choices=["json", "msgpack"], default="json")
+    parser.add_argument("--board", choices=["full", "bitset"], default="full")
+    parser.add_argument("--repeat", type=int, default=5, help="Replays per setting (best time is kept)")
+    args = parser.parse_args()
+
+    codec = protocol.JSON if args.encoding == "json" else protocol.CODECS.get(protocol.MsgpackCodec.name)
+    if codec is None:
+        parser.error("msgpack is not installed")
+    messages = race_messages(codec, args.board == "bitset")
+    opcode = frames.OP_BINARY if codec.binary else frames.OP_TEXT
+    raw = sum(len(data) for data in messages) / len(messages)
+
+    print(f"{len(messages)} messages, {args.encoding}, {args.board} board, {raw:.0f} bytes/message uncompressed")
+    print(f"{'level':>5} {'min size':>8} {'window':>6} {'mem':>3} {'bytes':>7} {'ratio':>6} "
+          f"{'compress us':>11} {'decompress us':>13}")
+    for level, min_size, window_bits, mem_level in SETTINGS:
+        runs = [replay(messages, opcode, level, min_size, window_bits, mem_level) for _ in range(args.repeat)]
+        result = min(runs, key=lambda run: run["compress_us"] + run["decompress_us"])
+        print(f"{level:>5} {min_size:>8} {window_bits:>6} {mem_level:>3} {result['bytes']:>7.0f} "
+              f"{raw / result['bytes']:>5.1f}x {result['compress_us']:>11.1f} {result['decompress_us']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""
+Headless WebSocket load test for the multiplayer server
+Creates sessions through /api/sessions/create, joins up to 9 players each and
+drives place/remove/start/end/next cycles over WebSockets. Latency is measured
+from send to the first state_sync that reflects the command.
+
+Usage:
+    python -m benchmarks.loadtest --spawn --sessions 50 --players 9 --games 2
+    python -m benchmarks.loadtest --server http://localhost:8000 --sessions 10
+    python -m benchmarks.loadtest --in-process --sessions 20 --out results.json
+"""
+import argparse
+import asyncio
+import functools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+import requests
+import websockets
+
+from src import compression, protocol
+from src.board import expand_state, open_spots
+from src.models import GameState
+from src.race_model import simulate_race
+from src.bots import TOKEN_VALUES
+
+
+# A player stops betting for the race after this many commands in a row fail
+MAX_FAILED_COMMANDS = 5
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (16 buckets per power of two, ~4% precision)"""
+
+    SUB_BUCKETS = 16
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        micros = max(seconds * 1e6, 1.0)
+        self.buckets[int(math.log2(micros) * self.SUB_BUCKETS)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @classmethod
+    def _upper_ms(cls, bucket: int) -> float:
+        return 2 ** ((bucket + 1) / cls.SUB_BUCKETS) / 1000
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile, in milliseconds"""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(p / 100 * self.count)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self._upper_ms(bucket), self.max * 1000)
+        return self.max * 1000
+
+    def merge(self, other: "LatencyHistogram"):
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "p999_ms": round(self.percentile(99.9), 3),
+            "max_ms": round(self.max * 1000, 3),
+            "histogram": [[round(self._upper_ms(b), 4), self.buckets[b]] for b in sorted(self.buckets)]
+        }
+
+
+class Stats:
+    """Results shared by every simulated player"""
+
+    def __init__(self):
+        self.latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.messages_received = 0
+        self.bytes_received = 0
+        self.sessions_completed = 0
+
+    def to_dict(self, elapsed: float) -> dict:
+        overall = LatencyHistogram()
+        for histogram in self.latency.values():
+            overall.merge(histogram)
+        return {
+            "duration_s": round(elapsed, 3),
+            "sessions_completed": self.sessions_completed,
+            "commands": {
+                msg_type: {**histogram.to_dict(), "errors": self.errors.get(msg_type, 0)}
+                for msg_type, histogram in sorted(self.latency.items())
+            },
+            "errors": dict(self.errors),
+            "overall": overall.to_dict(),
+            "throughput": {
+                "commands_per_s": round(overall.count / elapsed, 2) if elapsed else 0.0,
+                "messages_received_per_s": round(self.messages_received / elapsed, 2) if elapsed else 0.0,
+                "bytes_received_per_s": round(self.bytes_received / elapsed, 2) if elapsed else 0.0
+            }
+        }
+
+
+class PlayerConnection:
+    """One simulated player: a WebSocket plus the latest state it has seen"""
+
+    def __init__(self, name: str, stats: Stats, timeout: float):
+        self.name = name
+        self.stats = stats
+        self.timeout = timeout
+        self.websocket = None
+        self.codec = protocol.JSON
+        self.game_state = GameState()
+        self.state: Optional[dict] = None
+        self._synced = asyncio.Event()
+        self._pending: Optional[tuple] = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def open(self, ws_url: str, subprotocols: Optional[List[str]] = None, extensions: Optional[list] = None):
+        self.websocket = await websockets.connect(ws_url, max_size=None, subprotocols=subprotocols,
+                                                  compression=None, extensions=extensions)
+        self.codec = protocol.negotiate([self.websocket.subprotocol] if self.websocket.subprotocol else [])
+        self._reader = asyncio.create_task(self._read())
+        await asyncio.wait_for(self._synced.wait(), self.timeout)
+
+    async def close(self):
+        if self.websocket:
+            await self.websocket.close()
+        if self._reader:
+            self._reader.cancel()
+
+    async def _read(self):
+        try:
+            async for raw in self.websocket:
+                self.stats.messages_received += 1
+                self.stats.bytes_received += len(raw)
+                message = self.codec.decode(raw)
+                msg_type = message.get("type")
+
+                if msg_type == "state_sync":
+                    self.state = expand_state(message["data"])
+                    self.game_state.load_server_state(self.state)
+                    self._synced.set()
+                    if self._pending and self._pending[1](self.state):
+                        self._resolve(True)
+                elif msg_type == "error" and self._pending:
+                    self._resolve(False)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            if self._pending:
+                self._resolve(False)
+
+    def _resolve(self, ok: bool):
+        msg_type, predicate, sent_at, future = self._pending
+        self._pending = None
+        if ok:
+            self.stats.latency[msg_type].record(time.perf_counter() - sent_at)
+        else:
+            self.stats.errors[msg_type] += 1
+        if not future.done():
+            future.set_result(ok)
+
+    async def command(self, message: dict, predicate: Callable[[dict], bool]) -> bool:
+        """Send a command and wait for a state_sync that satisfies predicate"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending = (message["type"], predicate, time.perf_counter(), future)
+        await self.websocket.send(self.codec.encode(message))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self._pending = None
+            self.stats.errors[f"{message['type']}_timeout"] += 1
+            return False
+
+    async def bet_round(self, rng: random.Random, remove_rate: float, think_time: float):
+        """Place random bets until out of tokens, removing some of them again"""
+        failures = 0
+        while self.state and self.state["race_active"] and self.state.get("betting_open", True):
+            if failures >= MAX_FAILED_COMMANDS:
+                # e.g. betting closed before the state_sync saying so arrived
+                self.stats.errors["bet_round_abandoned"] += 1
+                return
+            player = self.game_state.players.get(self.name)
+            if not player:
+                return
+            tokens = [int(v) for v in TOKEN_VALUES if player.get_available_tokens(v) > 0]
+            spots = open_spots(self.game_state, self.name)
+            if not tokens or not spots:
+                return
+
+            spot = rng.choice(spots)
+            spot_key = spot.key_for(self.name)
+            placed = await self.command(
+                {"type": "place_bet", "data": spot.bet_data(self.name, rng.choice(tokens))},
+                lambda state: any(b["spot_key"] == spot_key and b["player"] == self.name
+                                  for b in state["current_bets"])
+            )
+            failures = 0 if placed else failures + 1
+            if placed and rng.random() < remove_rate:
+                await self.command(
+                    {"type": "remove_bet", "spot_key": spot_key},
+                    lambda state: all(b["spot_key"] != spot_key for b in state["current_bets"])
+                )
+            if think_time:
+                await asyncio.sleep(rng.uniform(0, think_time))
+
+
+async def http_post(url: str, **params) -> dict:
+    loop = asyncio.get_running_loop()
+    response = await loop.run_in_executor(None, functools.partial(requests.post, url, params=params, timeout=30))
+    response.raise_for_status()
+    return response.json()
+
+
+async def run_session(http_url: str, ws_url: str, args, slot: int, stats: Stats):
+    """Play args.games full games with one session per game"""
+    rng = random.Random(f"{args.seed}:{slot}")
+
+    for game in range(args.games):
+        session_id = (await http_post(f"{http_url}/api/sessions/create"))["session_id"]
+        players = []
+        for i in range(args.players):
+            joined = await http_post(f"{http_url}/api/sessions/{session_id}/join", player_name=f"P{i + 1}")
+            player = PlayerConnection(joined["player_name"], stats, args.timeout)
+            query = f"?board={args.board}" if args.board != "full" else ""
+            subprotocols = [protocol.MsgpackCodec.name] if args.encoding == "msgpack" else None
+            await player.open(f"{ws_url}/ws/{session_id}/{joined['player_token']}{query}", subprotocols,
+                              compression.client_extensions(args.deflate_level))
+            players.append(player)
+
+        host = players[0]
+        try:
+            while host.state["status"] != "completed":
+                race = host.state["current_race"]
+                await host.command({"type": "start_race"}, lambda s: s["race_active"])
+                await asyncio.gather(*(p.bet_round(rng, args.remove_rate, args.think_time) for p in players))
+
+                results = simulate_race(rng, host.state["current_prop_bets"], host.state["current_exotic_finishes"])
+                await host.command({"type": "end_race", "data": {
+                    "win_horses": results.win_horses,
+                    "place_horses": results.place_horses,
+                    "show_horses": results.show_horses,
+                    "prop_bet_results": results.prop_bet_results,
+                    "exotic_finish_results": results.exotic_finish_results
+                }}, lambda s: not s["race_active"])
+                await host.command({"type": "next_race"},
+                                   lambda s, race=race: s["current_race"] > race)
+            stats.sessions_completed += 1
+        finally:
+            await asyncio.gather(*(p.close() for p in players), return_exceptions=True)
+
+
+def wait_for_server(http_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{http_url}/", timeout=2).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {http_url} did not become ready")
+
+
+def spawn_server(port: int, database_url: str) -> subprocess.Popen:
+    """Run the server in a subprocess"""
+    env = dict(os.environ, DATABASE_URL=database_url, HOST="127.0.0.1", PORT=str(port))
+    return subprocess.Popen([sys.executable, "-m", "server.main"], env=env)
+
+
+async def serve_in_process(port: int, database_url: str):
+    """Run the server on this event loop"""
+    os.environ["DATABASE_URL"] = database_url
+    import uvicorn
+    from server.main import app
+    from server.ws_protocol import DeflateWebSocketProtocol
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           ws=DeflateWebSocketProtocol))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+async def run(args) -> dict:
+    http_url = args.server.rstrip("/")
+    stop_server = None
+
+    if args.spawn or args.in_process:
+        tmpdir = tempfile.mkdtemp(prefix="rsb-loadtest-")
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmpdir, 'loadtest.db')}"
+        http_url = f"http://127.0.0.1:{args.port}"
+        if args.spawn:
+            process = spawn_server(args.port, database_url)
+            await asyncio.get_running_loop().run_in_executor(None, wait_for_server, http_url)
+
+            async def stop_server():
+                process.terminate()
+                process.wait(timeout=10)
+        else:
+            server, task = await serve_in_process(args.port, database_url)
+
+            async def stop_server():
+                server.should_exit = True
+                await task
+
+    ws_url = http_url.replace("http://", "ws://").replace("https://", "wss://")
+    stats = Stats()
+    start = time.perf_counter()
+    try:
+        semaphore = asyncio.Semaphore(args.concurrency or args.sessions)
+
+        async def slot(i):
+            async with semaphore:
+                try:
+                    await run_session(http_url, ws_url, args, i, stats)
+                except Exception as e:
+                    stats.errors[f"session_{type(e).__name__}"] += 1
+
+        await asyncio.gather(*(slot(i) for i in range(args.sessions)))
+    finally:
+        elapsed = time.perf_counter() - start
+        if stop_server:
+            await stop_server()
+
+    result = stats.to_dict(elapsed)
+    result["config"] = {
+        "sessions": args.sessions,
+        "players": args.players,
+        "games": args.games,
+        "remove_rate": args.remove_rate,
+        "think_time": args.think_time,
+        "board": args.board,
+        "encoding": args.encoding,
+        "deflate_level": args.deflate_level,
+        "server": "spawn" if args.spawn else "in-process" if args.in_process else http_url,
+        "seed": args.seed
+    }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket load test for the Ready Set Bet server")
+    parser.add_argument("--server", default="http://localhost:8000", help="Existing server to test")
+    parser.add_argument("--spawn", action="store_true", help="Start the server in a subprocess")
+    parser.add_argument("--in-process", action="store_true", help="Run the server on the load test's event loop")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --spawn/--in-process")
+    parser.add_argument("--database-url", help="Database for --spawn/--in-process (default: temporary SQLite)")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, help="Sessions running at once (default: all)")
+    parser.add_argument("--players", type=int, default=9, choices=range(1, 10), metavar="1-9")
+    parser.add_argument("--games", type=int, default=1, help="Full 4-race games per session slot")
+    parser.add_argument("--remove-rate", type=float, default=0.2, help="Chance a placed bet is removed again")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Max random pause between bets (s)")
+    parser.add_argument("--board", choices=("full", "bitset"), default="full",
+                        help="Board format requested for state_sync messages")
+    parser.add_argument("--encoding", choices=("json", "msgpack"), default="json",
+                        help="Wire encoding to negotiate")
+    parser.add_argument("--deflate-level", type=int, default=compression.DEFAULT_LEVEL, choices=range(10),
+                        metavar="0-9", help="Client permessage-deflate level (0 disables compression)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write JSON results to a file instead of stdout")
+    args = parser.parse_args()
+
+    if args.spawn and args.in_process:
+        parser.error("Choose one of --spawn and --in-process")
+
+    result = asyncio.run(run(args))
+    output = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Memory per game session under load
+Ramps up full sessions in one process until a memory budget is reached and
+reports how many bytes each session costs. Every session has 9 players with
+a full board of bets, and every player has a connection with its own
+database session (as the WebSocket endpoint does), a ConnectionManager entry
+and an idle timer.
+
+Usage:
+    python -m benchmarks.memory_ramp --budget-mb 256
+    python -m benchmarks.memory_ramp --max-sessions 200 --step 20 --out memory.json
+
+Memory is measured with tracemalloc, so only Python allocations count; the
+in-memory SQLite database's pages are allocated by SQLite and are not
+included.
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from benchmarks.suite import PLAYER_NAMES, FakeWebSocket, full_board_bets
+from server import memory
+from server.database import Base
+from server.scheduler import TimerScheduler
+from server.session_manager import SessionManager
+from server.websocket_manager import ConnectionManager
+from src.models import GameState
+
+
+def _noop(*args):
+    pass
+
+
+def create_full_session(make_db) -> str:
+    """Create a session with 9 players and a full board; returns its id"""
+    db = make_db()
+    try:
+        session_manager = SessionManager(db)
+        session_id = session_manager.create_session().id
+        for name in PLAYER_NAMES:
+            session_manager.join_session(session_id, name)
+        session_manager.start_race(session_id)
+
+        game_state = GameState()
+        game_state.current_prop_bets = session_manager.get_session(session_id).current_prop_bets
+        for bet in full_board_bets(game_state):
+            session_manager.place_bet(session_id, bet.player, {
+                "horse": bet.horse,
+                "bet_type": bet.bet_type[:20],
+                "multiplier": bet.multiplier,
+                "penalty": bet.penalty,
+                "token_value": bet.token_value,
+                "spot_key": bet.spot_key,
+                "row": bet.row,
+                "col": bet.col,
+                "prop_bet_id": bet.prop_bet_id
+            })
+        return session_id
+    finally:
+        db.close()
+
+
+def connect_players(make_db, manager: ConnectionManager, scheduler: TimerScheduler, session_id: str) -> list:
+    """Hold what the server holds for each connected player; returns the db sessions"""
+    held = []
+    for name in PLAYER_NAMES:
+        db = make_db()
+        memory.track_db_session(db)
+        SessionManager(db).get_session_state(session_id)
+        socket = FakeWebSocket()
+        manager.active_connections.setdefault(session_id, set()).add(socket)
+        manager.connection_info[socket] = (session_id, name, f"{session_id}-{name}")
+        held.append(db)
+    scheduler.schedule(("idle", session_id), 3600, _noop, session_id)
+    return held
+
+
+def traced_bytes() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def ramp(budget_bytes: int, max_sessions: int, step: int) -> dict:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    make_db = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    manager = ConnectionManager()
+    scheduler = TimerScheduler(clock=lambda: 0.0)
+
+    # Warm up imports and SQLAlchemy's statement caches before the baseline
+    warmup = connect_players(make_db, ConnectionManager(), TimerScheduler(clock=lambda: 0.0),
+                             create_full_session(make_db))
+
+    memory.start()
+    baseline = traced_bytes()
+    held = []
+    steps = []
+    sessions = 0
+    started = time.perf_counter()
+    while sessions < max_sessions:
+        for _ in range(min(step, max_sessions - sessions)):
+            held.extend(connect_players(make_db, manager, scheduler, create_full_session(make_db)))
+            sessions += 1
+        used = traced_bytes() - baseline
+        steps.append({"sessions": sessions, "traced_bytes": used, "bytes_per_session": used // sessions})
+        print(f"{sessions:6d} sessions  {used / 1e6:8.2f} MB  {used // sessions:8d} B/session", file=sys.stderr)
+        if used >= budget_bytes:
+            break
+
+    first, last = steps[0], steps[-1]
+    marginal = None
+    if last["sessions"] > first["sessions"]:
+        marginal = (last["traced_bytes"] - first["traced_bytes"]) // (last["sessions"] - first["sessions"])
+
+    footprints = memory.session_footprints(manager, scheduler)
+    components = ("connection_bytes", "timer_bytes", "orm_bytes", "orm_objects", "total_bytes")
+    footprint = {key: sum(entry[key] for entry in footprints.values()) // len(footprints) for key in components}
+
+    result = {
+        "sessions": sessions,
+        "connections": len(manager.connection_info),
+        "budget_bytes": budget_bytes,
+        "traced_bytes": last["traced_bytes"],
+        "bytes_per_session": last["bytes_per_session"],
+        "marginal_bytes_per_session": marginal,
+        "estimated_footprint_per_session": footprint,
+        "by_category": memory.allocations(0)["by_category"],
+        "steps": steps,
+        "elapsed_seconds": round(time.perf_counter() - started, 2)
+    }
+    memory.stop()
+    for db in held + warmup:
+        db.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp game sessions until a memory budget is reached")
+    parser.add_argument("--budget-mb", type=float, default=256, help="Stop once traced memory exceeds this")
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument("--step", type=int, default=10, help="Sessions added between measurements")
+    parser.add_argument("--out", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    result = ramp(int(args.budget_mb * 1024 * 1024), args.max_sessions, max(1, args.step))
+    report = json.dumps(result, indent=2)
+    print(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Object count and memory of the game models for a full board
+Builds a 9-player game with every token placed (45 bets) and race results,
+then counts the objects and bytes each part keeps alive. Objects shared with
+the rest of the process (constants, small ints, None/True/False) are not
+counted. sys.getsizeof misses the attribute values of instances without a
+__dict__ on some Python versions, so the bytes allocated while building the
+state are also measured with tracemalloc. Also times rebuilding the client
+state from a state_sync payload, which the client does on every update.
+
+Usage:
+    python -m benchmarks.model_size [--json]
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from benchmarks.suite import full_board_state, state_payload
+from server.memory import reachable
+from src import constants
+from src.models import GameState
+from src.race_model import simulate_race
+
+
+def shared_ids() -> set:
+    """Objects every game state may reference without owning them"""
+    ids = {id(None), id(True), id(False)}
+    ids.update(id(i) for i in range(-5, 257))
+    for value in vars(constants).values():
+        stack = [value]
+        while stack:
+            current = stack.pop()
+            if id(current) in ids:
+                continue
+            ids.add(id(current))
+            if isinstance(current, dict):
+                stack.extend(current.keys())
+                stack.extend(current.values())
+            elif isinstance(current, (list, tuple)):
+                stack.extend(current)
+    return ids
+
+
+def measure(game_state: GameState) -> dict:
+    skip = shared_ids()
+    objects, total = reachable(game_state, skip)
+    result = {"game_state": {"objects": objects, "bytes": total}}
+
+    for name, items in (("players", list(game_state.players.values())),
+                        ("bets", list(game_state.current_bets.values()))):
+        objects = total = 0
+        for item in items:
+            item_objects, item_bytes = reachable(item, skip)
+            objects += item_objects
+            total += item_bytes
+        result[name] = {"count": len(items), "objects": objects, "bytes": total,
+                        "bytes_each": total // max(len(items), 1)}
+
+    objects, total = reachable(game_state.race_results, skip)
+    result["race_results"] = {"objects": objects, "bytes": total}
+    return result
+
+
+def build() -> GameState:
+    game_state = full_board_state()
+    game_state.race_results = simulate_race(random.Random(0), game_state.current_prop_bets,
+                                            game_state.current_exotic_finishes)
+    return game_state
+
+
+def traced_build_bytes() -> int:
+    """Bytes allocated and still held after building a full-board game state"""
+    build()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    game_state = build()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del game_state
+    return held
+
+
+def time_load(loops: int = 2000) -> float:
+    """Microseconds per load_server_state of a full-board payload"""
+    payload = state_payload()
+    game_state = GameState()
+    start = time.perf_counter()
+    for _ in range(loops):
+        game_state.load_server_state(payload)
+    return (time.perf_counter() - start) / loops * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Object count and bytes of a 9-player full board")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    result = measure(build())
+    result["traced_bytes"] = traced_build_bytes()
+    result["load_server_state_us"] = round(time_load(), 1)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"{'part':14} {'count':>6} {'objects':>8} {'bytes':>8} {'each':>7}")
+    for name in ("game_state", "players", "bets", "race_results"):
+        entry = result[name]
+        print(f"{name:14} {entry.get('count', 1):>6} {entry['objects']:>8} {entry['bytes']:>8} "
+              f"{entry.get('bytes_each', entry['bytes']):>7}")
+    print(f"allocated building the state: {result['traced_bytes']} bytes")
+    print(f"load_server_state: {result['load_server_state_us']} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,504 @@
+"""
+Micro-benchmarks for core game and server hot paths
+Usage:
+    python -m benchmarks.suite                     # run and print
+    python -m benchmarks.suite --save              # store results as the baseline
+    python -m benchmarks.suite --compare           # flag regressions against the baseline
+    python -m benchmarks.suite -k state --repeat 9 # run a subset
+
+Each benchmark reports the best and median time per operation over several
+repeats; comparisons use the best time, which is the most stable across runs.
+Benchmarks whose dependencies are missing are reported as skipped.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from src import protocol
+from src.board import board_spots, compact_state
+from src.game_logic import GameLogic
+from src.models import GameState
+from src.race_model import simulate_race
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# name -> (function(loops) -> elapsed seconds, operations per loop)
+BENCHMARKS: Dict[str, tuple] = {}
+
+
+class Skip(Exception):
+    """Raised by a benchmark whose dependencies are unavailable"""
+
+
+def benchmark(name: str, ops: int = 1):
+    """Register fn(loops) -> seconds spent on loops * ops operations"""
+    def decorator(fn: Callable[[int], float]):
+        BENCHMARKS[name] = (fn, ops)
+        return fn
+    return decorator
+
+
+# --- Fixtures -----------------------------------------------------------------
+
+PLAYER_NAMES = [f"Player{i + 1}" for i in range(9)]
+
+
+def full_board_state() -> GameState:
+    """9 players with every token placed (45 bets)"""
+    game_state = GameState()
+    game_state.generate_prop_bets_for_race()
+    game_state.generate_exotic_finish_for_race()
+    for name in PLAYER_NAMES:
+        game_state.add_player(name)
+    game_state.start_race()
+    fill_board(game_state)
+    return game_state
+
+
+def full_board_bets(game_state: GameState) -> list:
+    """Bets covering the board: each player spends 5, 3, 3, 2 and 1"""
+    spots = [spot for spot in board_spots(game_state) if not spot.is_exotic()]
+    tokens = [5, 3, 3, 2, 1]
+    bets = []
+    for i in range(len(PLAYER_NAMES) * len(tokens)):
+        player = PLAYER_NAMES[i % len(PLAYER_NAMES)]
+        bets.append(spots[i].make_bet(player, tokens[i // len(PLAYER_NAMES)]))
+    return bets
+
+
+def fill_board(game_state: GameState):
+    for bet in full_board_bets(game_state):
+        game_state.place_bet(bet)
+
+
+def state_payload(bet_count: int = 45) -> dict:
+    """A state_sync payload shaped like SessionManager.get_session_state"""
+    game_state = full_board_state()
+    bets = list(game_state.current_bets.values())[:bet_count]
+    return {
+        "session_id": "ABCD1234",
+        "status": "active",
+        "current_race": 1,
+        "max_races": 4,
+        "race_active": True,
+        "locked_spots": {bet.spot_key: bet.player for bet in bets},
+        "current_prop_bets": game_state.current_prop_bets,
+        "current_exotic_finishes": game_state.current_exotic_finishes,
+        "game_log": [],
+        "players": [
+            {
+                "name": player.name,
+                "money": player.money,
+                "vip_cards": player.vip_cards,
+                "tokens": dict(player.tokens),
+                "used_tokens": dict(player.used_tokens),
+                "is_connected": True
+            }
+            for player in game_state.players.values()
+        ],
+        "current_bets": [
+            {
+                "player": bet.player,
+                "horse": bet.horse,
+                "bet_type": bet.bet_type,
+                "multiplier": bet.multiplier,
+                "penalty": bet.penalty,
+                "token_value": bet.token_value,
+                "spot_key": bet.spot_key,
+                "row": bet.row,
+                "col": bet.col,
+                "prop_bet_id": bet.prop_bet_id,
+                "exotic_finish_id": bet.exotic_finish_id
+            }
+            for bet in bets
+        ]
+    }
+
+
+# --- Game model -----------------------------------------------------------------
+
+@benchmark("game_state.place_bet", ops=45)
+def bench_place_bet(loops: int) -> float:
+    game_state = full_board_state()
+    bets = full_board_bets(game_state)
+    elapsed = 0.0
+    for _ in range(loops):
+        game_state.clear_all_bets()
+        start = time.perf_counter()
+        for bet in bets:
+            game_state.place_bet(bet)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+@benchmark("game_state.remove_bet", ops=45)
+def bench_remove_bet(loops: int) -> float:
+    game_state = full_board_state()
+    elapsed = 0.0
+    for _ in range(loops):
+        game_state.clear_all_bets()
+        fill_board(game_state)
+        bet_ids = list(game_state.current_bets)
+        start = time.perf_counter()
+        for bet_id in bet_ids:
+            game_state.remove_bet(bet_id)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+@benchmark("game_state.clear_all_bets")
+def bench_clear_all_bets(loops: int) -> float:
+    game_state = full_board_state()
+    elapsed = 0.0
+    for _ in range(loops):
+        fill_board(game_state)
+        start = time.perf_counter()
+        game_state.clear_all_bets()
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+@benchmark("game_logic.process_race_results")
+def bench_process_race_results(loops: int) -> float:
+    import random
+    rng = random.Random(0)
+    game_state = full_board_state()
+    game_logic = GameLogic(game_state, rng=rng)
+    results = simulate_race(rng, game_state.current_prop_bets, game_state.current_exotic_finishes)
+    elapsed = 0.0
+    for _ in range(loops):
+        for player in game_state.players.values():
+            player.money = 0
+            player.vip_cards.clear()
+        start = time.perf_counter()
+        game_logic.process_race_results(
+            results.win_horses,
+            results.place_horses,
+            results.show_horses,
+            results.prop_bet_results,
+            results.exotic_finish_results
+        )
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+# --- Encoding -------------------------------------------------------------------
+
+@benchmark("state_json.encode")
+def bench_state_encode(loops: int) -> float:
+    payload = {"type": "state_sync", "data": state_payload()}
+    dumps = json.dumps
+    start = time.perf_counter()
+    for _ in range(loops):
+        dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    return time.perf_counter() - start
+
+
+@benchmark("state_json.encode[bitset board]")
+def bench_state_encode_bitset(loops: int) -> float:
+    payload = {"type": "state_sync", "data": state_payload()}
+    dumps = json.dumps
+    start = time.perf_counter()
+    for _ in range(loops):
+        dumps({**payload, "data": compact_state(payload["data"])}, separators=(",", ":"), ensure_ascii=False)
+    return time.perf_counter() - start
+
+
+@benchmark("state_json.decode")
+def bench_state_decode(loops: int) -> float:
+    encoded = json.dumps({"type": "state_sync", "data": state_payload()})
+    loads = json.loads
+    start = time.perf_counter()
+    for _ in range(loops):
+        loads(encoded)
+    return time.perf_counter() - start
+
+
+@benchmark("state_json.encode[codec]")
+def bench_state_encode_codec(loops: int) -> float:
+    """protocol.JSON: orjson when installed, else the standard library"""
+    encode = protocol.JSON.encode
+    payload = {"type": "state_sync", "data": state_payload()}
+    start = time.perf_counter()
+    for _ in range(loops):
+        encode(payload)
+    return time.perf_counter() - start
+
+
+@benchmark("state_json.decode[codec]")
+def bench_state_decode_codec(loops: int) -> float:
+    encoded = protocol.JSON.encode({"type": "state_sync", "data": state_payload()})
+    decode = protocol.JSON.decode
+    start = time.perf_counter()
+    for _ in range(loops):
+        decode(encoded)
+    return time.perf_counter() - start
+
+
+@benchmark("state_sync.encode[cached state]")
+def bench_state_sync_cached(loops: int) -> float:
+    """A state_sync frame whose state was already encoded at this version"""
+    try:
+        from server.state_cache import EncodedStates
+        from server.websocket_manager import encode_message
+    except ImportError as e:
+        raise Skip(f"missing dependency: {e.name}")
+    states = EncodedStates()
+    message = {"type": "state_sync", "trace_id": "bench",
+               "data": {**state_payload(), "session_id": "BENCH001", "state_version": 1}}
+    encode_message(message, states=states)
+    start = time.perf_counter()
+    for _ in range(loops):
+        encode_message(message, states=states)
+    return time.perf_counter() - start
+
+
+def _msgpack_codec():
+    codec = protocol.CODECS.get(protocol.MsgpackCodec.name)
+    if codec is None:
+        raise Skip("missing dependency: msgpack")
+    return codec
+
+
+@benchmark("state_msgpack.encode")
+def bench_state_encode_msgpack(loops: int) -> float:
+    encode = _msgpack_codec().encode
+    payload = {"type": "state_sync", "data": state_payload()}
+    start = time.perf_counter()
+    for _ in range(loops):
+        encode(payload)
+    return time.perf_counter() - start
+
+
+@benchmark("state_msgpack.encode[bitset board]")
+def bench_state_encode_msgpack_bitset(loops: int) -> float:
+    encode = _msgpack_codec().encode
+    payload = {"type": "state_sync", "data": state_payload()}
+    start = time.perf_counter()
+    for _ in range(loops):
+        encode({**payload, "data": compact_state(payload["data"])})
+    return time.perf_counter() - start
+
+
+@benchmark("state_msgpack.decode")
+def bench_state_decode_msgpack(loops: int) -> float:
+    codec = _msgpack_codec()
+    encoded = codec.encode({"type": "state_sync", "data": state_payload()})
+    decode = codec.decode
+    start = time.perf_counter()
+    for _ in range(loops):
+        decode(encoded)
+    return time.perf_counter() - start
+
+
+# --- Server -----------------------------------------------------------------------
+
+def _server_db(bet_count: int):
+    """In-memory database with one 9-player session and bet_count bets"""
+    try:
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from sqlalchemy.pool import StaticPool
+        from server.database import Base
+        from server.session_manager import SessionManager
+    except ImportError as e:
+        raise Skip(f"missing dependency: {e.name}")
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+    session_manager = SessionManager(db)
+    session_id = session_manager.create_session().id
+    for name in PLAYER_NAMES:
+        session_manager.join_session(session_id, name)
+    session_manager.start_race(session_id)
+
+    game_state = GameState()
+    game_state.current_prop_bets = session_manager.get_session(session_id).current_prop_bets
+    for bet in full_board_bets(game_state)[:bet_count]:
+        session_manager.place_bet(session_id, bet.player, {
+            "horse": bet.horse,
+            "bet_type": bet.bet_type[:20],
+            "multiplier": bet.multiplier,
+            "penalty": bet.penalty,
+            "token_value": bet.token_value,
+            "spot_key": bet.spot_key,
+            "row": bet.row,
+            "col": bet.col,
+            "prop_bet_id": bet.prop_bet_id
+        })
+    return session_manager, session_id
+
+
+def _get_session_state_bench(bet_count: int):
+    def bench(loops: int) -> float:
+        session_manager, session_id = _server_db(bet_count)
+        start = time.perf_counter()
+        for _ in range(loops):
+            session_manager.get_session_state(session_id)
+        return time.perf_counter() - start
+    return bench
+
+
+for _count in (0, 20, 45):
+    benchmark(f"session_manager.get_session_state[{_count} bets]")(_get_session_state_bench(_count))
+
+
+class FakeWebSocket:
+    """Stands in for a Starlette WebSocket; encodes like send_json"""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    async def send_json(self, data):
+        self.bytes_sent += len(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+    async def send_text(self, data):
+        self.bytes_sent += len(data)
+
+    async def send_bytes(self, data):
+        self.bytes_sent += len(data)
+
+
+@benchmark("connection_manager.broadcast[9 sockets]")
+def bench_broadcast(loops: int) -> float:
+    try:
+        from server.websocket_manager import ConnectionManager
+    except ImportError as e:
+        raise Skip(f"missing dependency: {e.name}")
+
+    manager = ConnectionManager()
+    for name in PLAYER_NAMES:
+        socket = FakeWebSocket()
+        manager.active_connections.setdefault("ABCD1234", set()).add(socket)
+        manager.connection_info[socket] = ("ABCD1234", name, name)
+
+    message = {"type": "state_sync", "data": state_payload()}
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(loops):
+            await manager.broadcast_to_session("ABCD1234", message)
+        return time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+@benchmark("scheduler.reschedule[10k timers]")
+def bench_scheduler(loops: int) -> float:
+    from server.scheduler import TimerScheduler
+
+    scheduler = TimerScheduler(clock=lambda: 0.0)
+    for i in range(10000):
+        scheduler.schedule(("idle", i), 300 + i, print)
+    start = time.perf_counter()
+    for i in range(loops):
+        scheduler.schedule(("idle", i % 10000), 600, print)
+    return time.perf_counter() - start
+
+
+# --- Runner -----------------------------------------------------------------------
+
+def measure(fn: Callable[[int], float], ops: int, repeat: int, min_time: float) -> dict:
+    """Calibrate the loop count, then time `repeat` runs"""
+    loops = 1
+    while True:
+        elapsed = fn(loops)
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2 if elapsed < min_time / 10 else 1 + int(min_time / max(elapsed, 1e-9))
+
+    times = [elapsed] + [fn(loops) for _ in range(repeat - 1)]
+    per_op = [t / (loops * ops) * 1e6 for t in times]
+    return {"best_us": round(min(per_op), 4), "median_us": round(statistics.median(per_op), 4), "loops": loops}
+
+
+def run_benchmarks(selected: List[str], repeat: int, min_time: float) -> Dict[str, dict]:
+    results = {}
+    for name in selected:
+        fn, ops = BENCHMARKS[name]
+        try:
+            results[name] = measure(fn, ops, repeat, min_time)
+        except Skip as e:
+            results[name] = {"skipped": str(e)}
+        line = results[name]
+        if "skipped" in line:
+            print(f"  {name:<48} skipped ({line['skipped']})")
+        else:
+            print(f"  {name:<48} {line['best_us']:>12.3f} µs  (median {line['median_us']:.3f})")
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Print a comparison table and return the names of regressed benchmarks"""
+    regressions = []
+    print(f"\nComparison against baseline (threshold {threshold:.0%}):")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if "skipped" in result or not base or "skipped" in base:
+            continue
+        ratio = result["best_us"] / base["best_us"] if base["best_us"] else 1.0
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        print(f"  {name:<48} {base['best_us']:>12.3f} -> {result['best_us']:>12.3f} µs  {ratio:6.2f}x  {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ready Set Bet micro-benchmarks")
+    parser.add_argument("-k", "--filter", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1, help="Minimum seconds per repeat")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file")
+    parser.add_argument("--save", action="store_true", help="Save results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown before flagging")
+    args = parser.parse_args()
+
+    selected = [name for name in BENCHMARKS if not args.filter or args.filter in name]
+    print(f"Python {platform.python_version()} on {platform.machine()}, {len(selected)} benchmarks")
+    results = run_benchmarks(selected, args.repeat, args.min_time)
+
+    exit_code = 0
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            parser.error(f"No baseline at {args.baseline}; run with --save first")
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            exit_code = 1
+
+    if args.save:
+        previous = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                previous = json.load(f)["results"]
+        previous.update({name: result for name, result in results.items() if "skipped" not in result})
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": previous
+            }, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {args.baseline}")
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Bytes and encode/decode time of one full-board state_sync per wire format
+Compares the JSON and msgpack encodings, each with the full and the bitset
+board, for a 9-player game with every token placed.
+
+Usage:
+    python -m benchmarks.wire_format
+"""
+import time
+
+from benchmarks.suite import state_payload
+from src import protocol
+from src.board import compact_state
+
+
+def time_us(fn, arg, loops: int = 2000) -> float:
+    fn(arg)
+    start = time.perf_counter()
+    for _ in range(loops):
+        fn(arg)
+    return (time.perf_counter() - start) / loops * 1e6
+
+
+def main():
+    message = {"type": "state_sync", "data": state_payload()}
+    boards = {"full": message, "bitset": {**message, "data": compact_state(message["data"])}}
+
+    print(f"{'encoding':16} {'board':7} {'bytes':>7} {'encode us':>10} {'decode us':>10}")
+    for name, codec in protocol.CODECS.items():
+        for board, payload in boards.items():
+            frame = codec.encode(payload)
+            size = len(frame.encode() if isinstance(frame, str) else frame)
+            print(f"{name:16} {board:7} {size:>7} {time_us(codec.encode, payload):>10.1f} "
+                  f"{time_us(codec.decode, frame):>10.1f}")
+    if protocol.msgpack is None:
+        print("msgpack not installed, binary encoding skipped")
+
+
+if __name__ == "__main__":
+    main()
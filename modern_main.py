@@ -3,9 +3,12 @@ Ready Set Bet - Modern Betting Application
 Entry point for the CustomTkinter version with icon support
 """
 
+import argparse
 import customtkinter as ctk
+from src.bots import STRATEGIES
 from src.modern_app import ModernReadySetBetApp
 from src.icon_utils import icon_manager
+from src.log import configure as configure_logging
 
 # Set appearance mode and color theme
 ctk.set_appearance_mode("dark")  # "dark" or "light"
@@ -13,6 +16,13 @@ ctk.set_default_color_theme("blue")  # "blue", "green", "dark-blue"
 
 def main():
     """Main entry point for the modern application."""
+    parser = argparse.ArgumentParser(description="Ready Set Bet - single player")
+    parser.add_argument("--bots", type=int, default=0, help="Number of computer opponents")
+    parser.add_argument("--strategy", default="greedy", choices=sorted(STRATEGIES),
+                        help="Betting strategy for the bots")
+    args = parser.parse_args()
+    configure_logging()
+
     root = ctk.CTk()
 
     # Set the window icon
@@ -20,6 +30,8 @@ def main():
 
     # Initialize the app
     app = ModernReadySetBetApp(root)
+    for i in range(args.bots):
+        app.add_bot(f"Bot {i + 1}", args.strategy)
 
     # Start the main loop
     root.mainloop()
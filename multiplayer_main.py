@@ -10,11 +10,14 @@ import sys
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+from src.log import configure as configure_logging
 from src.multiplayer_app import MultiplayerReadySetBetApp
 
 
 def main():
     """Main entry point for multiplayer version"""
+    configure_logging()
+
     # Set appearance
     ctk.set_appearance_mode("dark")
     ctk.set_default_color_theme("blue")
@@ -1,8 +1,14 @@
 """
 Database configuration for Ready Set Bet multiplayer server
 """
+import heapq
+import itertools
 import os
-from sqlalchemy import create_engine
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -28,6 +34,116 @@ else:
     # PostgreSQL or other databases
     engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 
+
+class QueryStats:
+    """Per-statement timing and the slowest statements seen since startup"""
+
+    MAX_STATEMENTS = 500  # Distinct statement texts tracked
+
+    def __init__(self, top_n: int = 20):
+        self.top_n = top_n
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total_time = 0.0
+        # statement -> [count, total seconds, max seconds]
+        self.statements: Dict[str, list] = {}
+        # Min-heap of (seconds, seq, statement) holding the top_n slowest
+        self.slowest: List[tuple] = []
+        self._seq = itertools.count()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.total_time += seconds
+
+        entry = self.statements.get(statement)
+        if entry is None and len(self.statements) < self.MAX_STATEMENTS:
+            entry = self.statements[statement] = [0, 0.0, 0.0]
+        if entry is not None:
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+        item = (seconds, next(self._seq), statement)
+        if len(self.slowest) < self.top_n:
+            heapq.heappush(self.slowest, item)
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, item)
+
+    def summary(self, limit: int = 20) -> Dict:
+        """Totals, the busiest statements and the slowest single executions"""
+        busiest = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            "statements": self.count,
+            "total_ms": round(self.total_time * 1000, 3),
+            "by_statement": [
+                {
+                    "statement": statement,
+                    "count": count,
+                    "total_ms": round(total * 1000, 3),
+                    "mean_ms": round(total / count * 1000, 3),
+                    "max_ms": round(longest * 1000, 3)
+                }
+                for statement, (count, total, longest) in busiest[:limit]
+            ],
+            "slowest": [
+                {"statement": statement, "ms": round(seconds * 1000, 3)}
+                for seconds, seq, statement in sorted(self.slowest, reverse=True)[:limit]
+            ]
+        }
+
+
+class StatementCounter:
+    """Statements executed within one request or message"""
+
+    __slots__ = ("count", "time")
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+
+query_stats = QueryStats(int(os.getenv("SLOW_QUERY_TOP_N", "20")))
+_statement_counter: ContextVar[Optional[StatementCounter]] = ContextVar("rsb_statement_counter", default=None)
+
+
+@contextmanager
+def count_statements():
+    """Count the statements executed inside the block (in this context)"""
+    counter = StatementCounter()
+    token = _statement_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _statement_counter.reset(token)
+
+
+def instrument_engine(target_engine, stats: QueryStats = query_stats):
+    """Time every statement executed through an engine"""
+
+    @event.listens_for(target_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(target_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        stats.record(statement, seconds)
+        counter = _statement_counter.get()
+        if counter is not None:
+            counter.count += 1
+            counter.time += seconds
+
+    @event.listens_for(target_engine, "handle_error")
+    def _handle_error(context):
+        started = context.connection.info.get("query_started") if context.connection else None
+        if started:
+            started.pop()
+
+
+instrument_engine(engine)
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
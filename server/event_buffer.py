@@ -0,0 +1,51 @@
+"""
+Per-session ring buffer of sequenced broadcasts
+Every message broadcast to a session gets the next sequence number of that
+session's buffer. A client that reconnects with the last seq it saw is sent
+only the messages it missed; when they are no longer buffered (or the seq
+is from another buffer, e.g. before a server restart) it gets a snapshot.
+
+Each state_sync carries the complete state, so only the latest one is kept:
+older ones are replaced by a placeholder when a new one arrives and the
+buffer holds one state plus small notifications however long it is.
+"""
+import time
+from collections import deque
+from typing import List, Optional
+
+DEFAULT_SIZE = 256
+
+
+class EventBuffer:
+    """Recent broadcasts of one session, numbered by consecutive seqs"""
+
+    __slots__ = ("events", "last_seq", "_state_seq")
+
+    def __init__(self, size: int = DEFAULT_SIZE):
+        # (seq, message), or (seq, None) for a superseded state_sync
+        self.events = deque(maxlen=size)
+        # Start from the clock so a new buffer never reuses an older buffer's seqs
+        self.last_seq = time.time_ns() // 1000
+        self._state_seq: Optional[int] = None
+
+    def append(self, message: dict) -> dict:
+        """Record a broadcast; returns it with its "seq" set"""
+        self.last_seq += 1
+        message = {**message, "seq": self.last_seq}
+        if message.get("type") == "state_sync":
+            if self._state_seq is not None and self.events:
+                index = self._state_seq - self.events[0][0]
+                if index >= 0:
+                    self.events[index] = (self._state_seq, None)
+            self._state_seq = self.last_seq
+        self.events.append((self.last_seq, message))
+        return message
+
+    def since(self, seq: int) -> Optional[List[dict]]:
+        """Messages after seq, or None if some of them are no longer buffered"""
+        if seq == self.last_seq:
+            return []
+        first = self.events[0][0] if self.events else self.last_seq + 1
+        if seq > self.last_seq or seq < first - 1:
+            return None
+        return [message for event_seq, message in self.events if event_seq > seq and message is not None]
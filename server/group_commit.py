@@ -0,0 +1,89 @@
+"""
+Group commit: one transaction for the writes of many commands
+A busy betting window sends a burst of bets from every session, and each
+one used to pay for its own commit. With a window set, GroupCommitter
+collects the writes submitted within it, from any session, runs them in one
+database session and commits them together. Every write runs inside a
+savepoint, so one that raises is rolled back on its own and the rest still
+commit.
+
+run() returns only once the commit has succeeded, so acks and state_syncs
+sent after it never report a write that could still be lost.
+"""
+import asyncio
+import contextvars
+from typing import Callable, List, Tuple, TypeVar
+
+from sqlalchemy.orm import Session
+
+from . import metrics
+
+T = TypeVar("T")
+
+# Commit straight away once this many writes are waiting
+DEFAULT_MAX_WRITES = 256
+
+
+class GroupCommitter:
+    """Coalesces writes submitted within window seconds into one commit"""
+
+    def __init__(self, session_factory: Callable[[], Session], window: float, max_writes: int = DEFAULT_MAX_WRITES):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_writes = max_writes
+        self._pending: List[Tuple[Callable[[Session], object], asyncio.Future]] = []
+        self._timer = None
+
+    async def run(self, write: Callable[[Session], T]) -> T:
+        """
+        Run write(db) in the next group and return its result once committed
+        write must not commit itself (see SessionManager's defer_commit).
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((write, future))
+        if len(self._pending) >= self.max_writes:
+            self.flush()
+        elif self._timer is None:
+            # Outside the submitting command's context: the commit belongs to the whole group
+            self._timer = loop.call_later(self.window, self.flush, context=contextvars.Context())
+        return await future
+
+    def flush(self):
+        """Run and commit every waiting write now"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        results = []
+        db = self.session_factory()
+        try:
+            if db.get_bind().dialect.name == "sqlite":
+                # pysqlite only opens a transaction before DML, and releasing a
+                # savepoint outside one commits it
+                db.connection().exec_driver_sql("BEGIN")
+            for write, future in batch:
+                try:
+                    with db.begin_nested():
+                        results.append((future, write(db), None))
+                except Exception as e:
+                    results.append((future, None, e))
+            db.commit()
+        except Exception as e:
+            # Nothing in the group is durable
+            db.rollback()
+            results = [(future, None, e) for _, future in batch]
+        finally:
+            db.close()
+
+        metrics.GROUP_COMMIT_WRITES.observe(len(batch))
+        for future, result, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
@@ -0,0 +1,121 @@
+"""
+Event loop lag monitor and blocking-call detector
+A heartbeat callback on the loop measures how late it runs. A watchdog
+thread notices when the heartbeat is overdue by more than the block
+threshold, which means something is running synchronously on the loop
+(e.g. a database commit), and captures the loop thread's stack while it is
+still blocked. The session id and message type come from the trace of the
+message being handled, found in the blocked frames. Samples and the blocked
+counter are only touched on the loop thread, which also reads them for
+/admin/loop and /metrics: the watchdog hands each sample over once the loop
+is free again.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional
+
+from src.log import get_logger
+
+from . import metrics, tracing
+
+log = get_logger(__name__)
+
+LOOP_BLOCKED = metrics.REGISTRY.counter(
+    "rsb_event_loop_blocked_total", "Times the event loop was blocked past the threshold")
+LOOP_BLOCKED_DURATION = metrics.REGISTRY.histogram(
+    "rsb_event_loop_blocked_seconds", "How long the event loop stayed blocked, per episode",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+
+MAX_STACK_DEPTH = 30
+
+
+class LoopMonitor:
+    """Measures loop lag and samples the stack of callbacks that block it"""
+
+    def __init__(self, interval: float = 0.25, block_threshold: float = 0.1, max_samples: int = 20):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.samples = deque(maxlen=max_samples)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._thread_id: Optional[int] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._due = 0.0
+        self._reported = False
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Start monitoring; must be called from the loop's thread"""
+        self._loop = loop or asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._schedule()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._handle:
+            self._handle.cancel()
+        self._handle = None
+
+    def _schedule(self):
+        self._due = self._loop.time() + self.interval
+        self._handle = self._loop.call_at(self._due, self._tick)
+
+    def _tick(self):
+        lag = max(0.0, self._loop.time() - self._due)
+        metrics.LOOP_LAG.set(lag)
+        metrics.LOOP_LAG_HISTOGRAM.observe(lag)
+        if lag >= self.block_threshold:
+            LOOP_BLOCKED_DURATION.observe(lag)
+        self._reported = False
+        self._schedule()
+
+    def _watch(self):
+        # loop.time() is time.monotonic() for the default loops
+        while not self._stopped.wait(self.block_threshold / 2):
+            overdue = time.monotonic() - self._due
+            if overdue > self.block_threshold and not self._reported:
+                self._reported = True
+                self._capture(overdue)
+
+    def _capture(self, overdue: float):
+        frame = sys._current_frames().get(self._thread_id)
+        if frame is None:
+            return
+
+        trace = tracing.find_trace(frame)
+        stack = traceback.extract_stack(frame, limit=MAX_STACK_DEPTH)
+        sample = {
+            "time": time.time(),
+            "blocked_ms": round(overdue * 1000, 1),
+            "session_id": trace.session_id if trace else None,
+            "message_type": trace.msg_type if trace else None,
+            "trace_id": trace.trace_id if trace else None,
+            "stack": [f"{entry.filename}:{entry.lineno} {entry.name}" for entry in stack]
+        }
+        try:
+            self._loop.call_soon_threadsafe(self._record, sample)
+        except RuntimeError:
+            return  # Loop closed
+
+        where = sample["stack"][-1] if sample["stack"] else "unknown"
+        log.warning("Event loop blocked for %sms at %s", sample["blocked_ms"], where, extra={
+            "session_id": sample["session_id"],
+            "message_type": sample["message_type"],
+            "trace_id": sample["trace_id"],
+            "stack": sample["stack"]
+        })
+
+    def _record(self, sample: Dict):
+        self.samples.append(sample)
+        LOOP_BLOCKED.inc()
+
+    def recent(self) -> List[Dict]:
+        """Most recent block samples, newest first"""
+        return list(reversed(self.samples))
@@ -2,18 +2,69 @@
 Ready Set Bet - Multiplayer Server
 FastAPI backend with WebSocket support
 """
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from sqlalchemy.orm import Session
 from typing import Dict, Optional
-import json
-
-from .database import get_db, init_db
+import asyncio
+import functools
+import hmac
+import os
+import threading
+
+from src import protocol
+from src.log import configure as configure_logging, get_logger
+
+from . import memory, metrics, tracing
+from .database import get_db, init_db, SessionLocal, count_statements, query_stats
+from .group_commit import GroupCommitter
+from .loop_monitor import LoopMonitor
+from .profiler import profile_thread
+from .request_cache import valid_request_id
+from .scheduler import TimerScheduler
 from .session_manager import SessionManager
 from .websocket_manager import ConnectionManager
 
+# Server-side timers (seconds, 0 disables)
+BETTING_WINDOW_SECONDS = float(os.getenv("BETTING_WINDOW_SECONDS", "0"))
+AUTO_NEXT_RACE_SECONDS = float(os.getenv("AUTO_NEXT_RACE_SECONDS", "0"))
+SESSION_IDLE_TIMEOUT_SECONDS = float(os.getenv("SESSION_IDLE_TIMEOUT_SECONDS", "0"))
+DISCONNECT_GRACE_SECONDS = float(os.getenv("DISCONNECT_GRACE_SECONDS", "10"))
+# How long a protocol 2 client has to send its hello after connecting
+HELLO_TIMEOUT_SECONDS = float(os.getenv("HELLO_TIMEOUT_SECONDS", "10"))
+# Broadcasts kept per session for clients that resume after reconnecting
+RESUME_BUFFER_EVENTS = int(os.getenv("RESUME_BUFFER_EVENTS", "256"))
+# Command replies kept per session to answer retried request_ids
+REQUEST_CACHE_SIZE = int(os.getenv("REQUEST_CACHE_SIZE", "512"))
+# Commit the bet writes of every session together, once per this many
+# milliseconds (0 commits each command on its own)
+GROUP_COMMIT_MS = float(os.getenv("GROUP_COMMIT_MS", "0"))
+
+# Report callbacks that block the event loop longer than this
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+
+# Token for /admin endpoints (unset disables them)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+MAX_PROFILE_SECONDS = 60
+
+# Trace allocations from startup with this many frames each (0 = only when
+# /admin/memory?start=N asks for it)
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "0"))
+
+log = get_logger(__name__)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded like WebSocket frames (orjson when installed)"""
+
+    def render(self, content) -> bytes:
+        return protocol.JSON.encode_bytes(content)
+
+
 # Initialize FastAPI app
-app = FastAPI(title="Ready Set Bet Multiplayer Server", version="1.0.0")
+app = FastAPI(title="Ready Set Bet Multiplayer Server", version="1.0.0",
+              default_response_class=FastJSONResponse)
 
 # CORS middleware for web clients
 app.add_middleware(
@@ -25,15 +76,60 @@ app.add_middleware(
 )
 
 # WebSocket connection manager
-manager = ConnectionManager()
+manager = ConnectionManager(event_buffer_size=RESUME_BUFFER_EVENTS, request_cache_size=REQUEST_CACHE_SIZE)
+
+# Single scheduler for every betting window, idle and grace-period timer
+scheduler = TimerScheduler()
+
+# Shared transaction for bet writes from every session (None: each command commits)
+group_commit = GroupCommitter(SessionLocal, GROUP_COMMIT_MS / 1000) if GROUP_COMMIT_MS > 0 else None
+
+# Metrics exposed at /metrics
+MESSAGE_TYPES = {"place_bet", "place_bets", "remove_bet", "start_race", "end_race", "next_race", "request_state"}
+# Commands that change the session, answered from the reply cache when retried
+MUTATING_COMMANDS = MESSAGE_TYPES - {"request_state"}
+metrics.instrument_connections(manager)
+metrics.instrument_db(SessionLocal)
+loop_monitor = LoopMonitor(block_threshold=LOOP_BLOCK_THRESHOLD_MS / 1000)
+
+
+@app.middleware("http")
+async def count_request_statements(request: Request, call_next):
+    """Record how many SQL statements each HTTP request executes"""
+    with count_statements() as statements:
+        response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.DB_STATEMENTS.observe(statements.count, route.path if route else "unmatched")
+    return response
+
+
+def require_admin(x_admin_token: str = Header("")):
+    """Dependency guarding admin endpoints (token in the X-Admin-Token header, kept out of access logs)"""
+    if not ADMIN_TOKEN or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin access required")
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
+    """Initialize logging and the database on startup"""
+    # Here rather than at import, so importing the app (tests, benchmarks) leaves logging alone
+    configure_logging()
     init_db()
-    print("✅ Database initialized")
-    print("🚀 Ready Set Bet Server is running")
+    if MEMORY_TRACE_FRAMES > 0:
+        memory.start(MEMORY_TRACE_FRAMES)
+    scheduler.start()
+    loop_monitor.start()
+    log.info("Database initialized")
+    log.info("Ready Set Bet Server is running")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop firing timers on shutdown"""
+    scheduler.stop()
+    if group_commit:
+        group_commit.flush()
+    loop_monitor.stop()
 
 
 @app.get("/")
@@ -97,6 +193,79 @@ async def reconnect_player(player_token: str, db: Session = Depends(get_db)):
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Server metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admin/queries", dependencies=[Depends(require_admin)])
+async def get_query_stats(limit: int = 20, reset: bool = False):
+    """Statement totals, busiest statements and the slowest queries"""
+    summary = query_stats.summary(limit)
+    if reset:
+        query_stats.reset()
+    return summary
+
+
+@app.get("/admin/loop", dependencies=[Depends(require_admin)])
+async def get_loop_blocks():
+    """Recent event loop blocks with the stack that caused them"""
+    return {
+        "block_threshold_ms": LOOP_BLOCK_THRESHOLD_MS,
+        "lag_seconds": metrics.LOOP_LAG.values.get((), 0.0),
+        "blocks": loop_monitor.recent()
+    }
+
+
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+async def get_memory(top: int = 10, start: int = 0, stop: bool = False):
+    """
+    Memory per session, connection and ORM identity map
+    start=N begins tracing allocations with N frames each; stop=true ends it.
+    Allocation figures only cover memory allocated while tracing.
+    """
+    if start > 0:
+        memory.start(start)
+    result = memory.report(manager, scheduler, top)
+    if stop:
+        memory.stop()
+    return result
+
+
+profile_running = False
+
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)], response_class=PlainTextResponse)
+async def profile_server(seconds: float = 10, hz: float = 100, session_id: Optional[str] = None,
+                         include_idle: bool = False):
+    """
+    Sample the event loop thread for a few seconds
+    Returns collapsed stacks for flamegraph tools. session_id keeps only
+    samples taken while that session's messages are being handled.
+    """
+    global profile_running
+    if profile_running:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    # This handler runs on the loop thread, which is not the main thread when
+    # the server is started from unified_launcher
+    loop_thread = threading.get_ident()
+    profile_running = True
+    try:
+        profiler = await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+            profile_thread, loop_thread, min(max(seconds, 0.1), MAX_PROFILE_SECONDS), hz,
+            session_id, include_idle
+        ))
+    finally:
+        profile_running = False
+
+    return PlainTextResponse(profiler.collapsed(), headers={
+        "X-Profile-Samples": str(profiler.samples),
+        "X-Profile-Kept": str(sum(profiler.stacks.values()))
+    })
+
+
 @app.get("/api/sessions/{session_id}/state")
 async def get_session_state(session_id: str, db: Session = Depends(get_db)):
     """Get current state of a session"""
@@ -106,7 +275,7 @@ async def get_session_state(session_id: str, db: Session = Depends(get_db)):
     if not state:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    return state
+    return Response(manager.states.encode(state), media_type="application/json")
 
 
 @app.websocket("/ws/{session_id}/{player_token}")
@@ -114,12 +283,21 @@ async def websocket_endpoint(
     websocket: WebSocket,
     session_id: str,
     player_token: str,
+    board: str = "",
+    client_protocol: str = Query("", alias="protocol"),
     db: Session = Depends(get_db)
 ):
     """
     WebSocket endpoint for real-time game communication
+    Clients that pass ?board=bitset receive state_sync boards as a bitset of
+    spot ids (see src.board.compact_state) instead of full bet lists.
+    Clients that pass ?protocol=2 send a hello first and get a welcome with
+    the agreed capabilities before the initial state (see src.protocol).
+    A hello with the resume capability and the last seq the client saw is
+    answered with only the broadcasts it missed when they are still buffered.
     """
     session_manager = SessionManager(db)
+    memory.track_db_session(db)
 
     # Verify player token and get info
     player_info = session_manager.reconnect_player(player_token)
@@ -129,16 +307,27 @@ async def websocket_endpoint(
 
     player_name = player_info["player_name"]
 
+    session = session_manager.get_session(session_id)
+    if session and session.status == "expired":
+        await websocket.close(code=4010, reason="Session expired")
+        return
+
     # Connect player
-    await manager.connect(websocket, session_id, player_name, player_token)
+    await manager.connect(websocket, session_id, player_name, player_token, compact_board=board == "bitset")
+
+    # Reconnecting within the grace period cancels the pending disconnect
+    scheduler.cancel(("disconnect_grace", session_id, player_name))
+    touch_session(session_id)
 
     try:
-        # Send initial state
-        state = session_manager.get_session_state(session_id)
-        await manager.send_personal_message({
-            "type": "state_sync",
-            "data": state
-        }, websocket)
+        hello = None
+        if protocol.peer_protocol(client_protocol) >= 2:
+            hello = await receive_hello(websocket)
+            if hello is None:
+                await websocket.close(code=4002, reason="Expected hello")
+                raise WebSocketDisconnect(4002)
+        # Welcome, then replay missed broadcasts or send the initial state
+        await manager.sync(websocket, session_id, hello, lambda: session_manager.get_session_state(session_id))
 
         # Notify others that player connected
         await manager.broadcast_to_session(session_id, {
@@ -147,23 +336,159 @@ async def websocket_endpoint(
         }, exclude=websocket)
 
         # Listen for messages
+        codec = manager.codec_for(websocket)
         while True:
-            data = await websocket.receive_json()
-            await handle_message(websocket, data, session_id, player_name, session_manager, db)
+            # Hand the connection back to the pool while idle and start the next
+            # message from fresh rows (other connections commit through their own sessions)
+            db.rollback()
+            raw = await (websocket.receive_bytes() if codec.binary else websocket.receive_text())
+            trace = tracing.start(session_id)
+            try:
+                with trace.phase("parse"):
+                    data = codec.decode(raw)
+                msg_type = data.get("type") if isinstance(data, dict) else None
+                label = msg_type if msg_type in MESSAGE_TYPES else "unknown"
+                trace.msg_type = label
+                if isinstance(data, dict):
+                    trace.use_client_id(data.get("trace_id"))
+                metrics.MESSAGES.inc(label)
+                with count_statements() as statements:
+                    await handle_command(websocket, data, session_id, player_name, session_manager, db)
+                metrics.DB_STATEMENTS.observe(statements.count, label)
+            finally:
+                metrics.COMMAND_DURATION.observe(tracing.finish(trace), trace.msg_type)
 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
-        # Notify others that player disconnected
-        await manager.broadcast_to_session(session_id, {
-            "type": "player_disconnected",
-            "player_name": player_name
-        })
+        await schedule_disconnect(session_id, player_name)
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        log.warning("WebSocket error: %s", e, extra={"session_id": session_id, "player_name": player_name})
         manager.disconnect(websocket)
+        await schedule_disconnect(session_id, player_name)
 
 
-async def handle_message(
+async def receive_hello(websocket: WebSocket) -> Optional[dict]:
+    """First message of a protocol 2 client (None unless it is a hello)"""
+    codec = manager.codec_for(websocket)
+    try:
+        raw = await asyncio.wait_for(websocket.receive_bytes() if codec.binary else websocket.receive_text(),
+                                     HELLO_TIMEOUT_SECONDS)
+        message = codec.decode(raw)
+    except (asyncio.TimeoutError, ValueError):
+        return None
+    if isinstance(message, dict) and message.get("type") == "hello":
+        return message
+    return None
+
+
+def touch_session(session_id: str):
+    """Restart the idle timeout for a session"""
+    if SESSION_IDLE_TIMEOUT_SECONDS > 0:
+        scheduler.schedule(("idle", session_id), SESSION_IDLE_TIMEOUT_SECONDS, expire_idle_session, session_id)
+
+
+async def schedule_disconnect(session_id: str, player_name: str):
+    """Give a dropped player a grace period to reconnect before others are told"""
+    if manager.is_player_connected(session_id, player_name):
+        return
+
+    if DISCONNECT_GRACE_SECONDS > 0:
+        scheduler.schedule(
+            ("disconnect_grace", session_id, player_name),
+            DISCONNECT_GRACE_SECONDS,
+            finalize_disconnect, session_id, player_name
+        )
+    else:
+        await finalize_disconnect(session_id, player_name)
+
+
+async def finalize_disconnect(session_id: str, player_name: str):
+    """Grace period expired: mark the player disconnected and notify the session"""
+    if manager.is_player_connected(session_id, player_name):
+        return
+
+    db = SessionLocal()
+    try:
+        session_manager = SessionManager(db)
+        session_manager.mark_disconnected(session_id, player_name)
+        session = session_manager.get_session(session_id)
+        # Nobody left within a grace period who could resume the session
+        abandoned = session is None or not any(player.is_connected for player in session.players)
+    finally:
+        db.close()
+
+    await manager.broadcast_to_session(session_id, {
+        "type": "player_disconnected",
+        "player_name": player_name
+    })
+    if abandoned and manager.get_session_connections(session_id) == 0:
+        manager.drop_events(session_id)
+
+
+async def close_betting_window(session_id: str):
+    """Betting window timer fired: stop accepting bets for the current race"""
+    db = SessionLocal()
+    try:
+        session_manager = SessionManager(db)
+        if not session_manager.close_betting(session_id):
+            return
+        state = session_manager.get_session_state(session_id)
+    finally:
+        db.close()
+
+    await manager.broadcast_to_session(session_id, {
+        "type": "state_sync",
+        "data": state
+    })
+    await manager.broadcast_to_session(session_id, {
+        "type": "betting_closed",
+        "race_number": state["current_race"]
+    })
+
+
+async def auto_next_race(session_id: str):
+    """Auto-advance timer fired: move the session on to the next race"""
+    db = SessionLocal()
+    try:
+        session_manager = SessionManager(db)
+        if not session_manager.next_race(session_id):
+            return
+        state = session_manager.get_session_state(session_id)
+    finally:
+        db.close()
+
+    await broadcast_next_race(session_id, state)
+
+
+async def expire_idle_session(session_id: str):
+    """Idle timer fired: expire the session and close its connections"""
+    for kind in ("betting_window", "auto_next"):
+        scheduler.cancel((kind, session_id))
+
+    db = SessionLocal()
+    try:
+        SessionManager(db).expire_session(session_id)
+    finally:
+        db.close()
+
+    await manager.broadcast_to_session(session_id, {"type": "session_expired"})
+    await manager.close_session(session_id, code=4010, reason="Session expired")
+
+
+async def broadcast_next_race(session_id: str, state: dict):
+    """Broadcast the state after advancing to the next race"""
+    await manager.broadcast_to_session(session_id, {
+        "type": "state_sync",
+        "data": state
+    })
+
+    if state["status"] == "completed":
+        await manager.broadcast_to_session(session_id, {
+            "type": "game_completed"
+        })
+
+
+async def handle_command(
     websocket: WebSocket,
     message: dict,
     session_id: str,
@@ -171,17 +496,80 @@ async def handle_message(
     session_manager: SessionManager,
     db: Session
 ):
-    """Handle incoming WebSocket messages"""
+    """
+    Run a command and answer the sender
+    Commands with a request_id get an ack or nack and run once per id: a
+    retried copy is answered with the original reply (see server.request_cache).
+    Commands without one only hear back about errors.
+    """
+    request_id = message.get("request_id") if isinstance(message, dict) else None
+    if not valid_request_id(request_id):
+        error = await handle_message(websocket, message, session_id, player_name, session_manager, db)
+        if error:
+            await manager.send_personal_message({"type": "error", "message": error}, websocket)
+        return
+
+    # Reads are cheap to repeat and their answer is the state, not the ack
+    requests = manager.requests.get(session_id) if message.get("type") in MUTATING_COMMANDS else None
+    if requests is None:
+        error = await handle_message(websocket, message, session_id, player_name, session_manager, db)
+        await manager.send_personal_message(command_reply(request_id, error), websocket)
+        return
+
+    future, first = requests.claim(player_name, request_id)
+    if not first:
+        metrics.DUPLICATE_COMMANDS.inc()
+        reply = await asyncio.shield(future)
+        await manager.send_personal_message(reply or command_reply(request_id, "Command failed"), websocket)
+        return
+
+    reply = None
+    try:
+        error = await handle_message(websocket, message, session_id, player_name, session_manager, db)
+        reply = command_reply(request_id, error)
+    finally:
+        requests.resolve(player_name, request_id, future, reply)
+    await manager.send_personal_message(reply, websocket)
+
+
+async def write_session(session_manager: SessionManager, method: str, *args):
+    """
+    Run a SessionManager write, in the next group commit when enabled
+    Returns once the write is committed either way.
+    """
+    if group_commit is None:
+        return getattr(session_manager, method)(*args)
+    return await group_commit.run(lambda db: getattr(SessionManager(db, defer_commit=True), method)(*args))
+
+
+def command_reply(request_id: str, error: Optional[str]) -> dict:
+    if error:
+        return {"type": "nack", "request_id": request_id, "error": error}
+    return {"type": "ack", "request_id": request_id}
+
+
+async def handle_message(
+    websocket: WebSocket,
+    message: dict,
+    session_id: str,
+    player_name: str,
+    session_manager: SessionManager,
+    db: Session
+) -> Optional[str]:
+    """Handle incoming WebSocket messages; returns an error for the sender, if any"""
     msg_type = message.get("type")
+    touch_session(session_id)
 
     if msg_type == "place_bet":
         # Place a bet
         bet_data = message.get("data")
-        result = session_manager.place_bet(session_id, player_name, bet_data)
+        with tracing.phase("manager"):
+            result = await write_session(session_manager, "place_bet", session_id, player_name, bet_data)
 
         if result["success"]:
             # Get updated state
-            state = session_manager.get_session_state(session_id)
+            with tracing.phase("state"):
+                state = session_manager.get_session_state(session_id)
 
             # Broadcast to all players
             await manager.broadcast_to_session(session_id, {
@@ -189,20 +577,33 @@ async def handle_message(
                 "data": state
             })
         else:
-            # Send error to requester
-            await manager.send_personal_message({
-                "type": "error",
-                "message": result.get("error", "Failed to place bet")
-            }, websocket)
+            return result.get("error", "Failed to place bet")
+
+    elif msg_type == "place_bets":
+        # Place several bets at once: all or none, one commit and one broadcast
+        with tracing.phase("manager"):
+            result = await write_session(session_manager, "place_bets", session_id, player_name,
+                                         message.get("bets"))
+
+        if not result["success"]:
+            return result.get("error", "Failed to place bets")
+        with tracing.phase("state"):
+            state = session_manager.get_session_state(session_id)
+        await manager.broadcast_to_session(session_id, {
+            "type": "state_sync",
+            "data": state
+        })
 
     elif msg_type == "remove_bet":
         # Remove a bet
         spot_key = message.get("spot_key")
-        result = session_manager.remove_bet(session_id, player_name, spot_key)
+        with tracing.phase("manager"):
+            result = await write_session(session_manager, "remove_bet", session_id, player_name, spot_key)
 
         if result["success"]:
             # Get updated state
-            state = session_manager.get_session_state(session_id)
+            with tracing.phase("state"):
+                state = session_manager.get_session_state(session_id)
 
             # Broadcast to all players
             await manager.broadcast_to_session(session_id, {
@@ -210,33 +611,48 @@ async def handle_message(
                 "data": state
             })
         else:
-            await manager.send_personal_message({
-                "type": "error",
-                "message": result.get("error", "Failed to remove bet")
-            }, websocket)
+            return result.get("error", "Failed to remove bet")
 
     elif msg_type == "start_race":
         # Start the race
-        success = session_manager.start_race(session_id)
+        with tracing.phase("manager"):
+            success = session_manager.start_race(session_id, BETTING_WINDOW_SECONDS)
 
         if success:
-            state = session_manager.get_session_state(session_id)
+            scheduler.cancel(("auto_next", session_id))
+            with tracing.phase("state"):
+                state = session_manager.get_session_state(session_id)
+            race_started = {
+                "type": "race_started",
+                "race_number": state["current_race"]
+            }
+            if BETTING_WINDOW_SECONDS > 0:
+                scheduler.schedule(("betting_window", session_id), BETTING_WINDOW_SECONDS,
+                                   close_betting_window, session_id)
+                race_started["betting_window_seconds"] = BETTING_WINDOW_SECONDS
+
             await manager.broadcast_to_session(session_id, {
                 "type": "state_sync",
                 "data": state
             })
-            await manager.broadcast_to_session(session_id, {
-                "type": "race_started",
-                "race_number": state["current_race"]
-            })
+            await manager.broadcast_to_session(session_id, race_started)
+        else:
+            return "Race cannot be started"
 
     elif msg_type == "end_race":
         # End the race and process results
         results = message.get("data")
-        success = session_manager.end_race(session_id, results)
+        with tracing.phase("manager"):
+            success = session_manager.end_race(session_id, results)
 
         if success:
-            state = session_manager.get_session_state(session_id)
+            scheduler.cancel(("betting_window", session_id))
+            if AUTO_NEXT_RACE_SECONDS > 0:
+                scheduler.schedule(("auto_next", session_id), AUTO_NEXT_RACE_SECONDS,
+                                   auto_next_race, session_id)
+
+            with tracing.phase("state"):
+                state = session_manager.get_session_state(session_id)
             await manager.broadcast_to_session(session_id, {
                 "type": "state_sync",
                 "data": state
@@ -246,38 +662,38 @@ async def handle_message(
                 "race_number": state["current_race"],
                 "results": results
             })
+        else:
+            return "Race cannot be ended"
 
     elif msg_type == "next_race":
         # Advance to next race
-        success = session_manager.next_race(session_id)
+        with tracing.phase("manager"):
+            success = session_manager.next_race(session_id)
 
         if success:
-            state = session_manager.get_session_state(session_id)
-            await manager.broadcast_to_session(session_id, {
-                "type": "state_sync",
-                "data": state
-            })
-
-            if state["status"] == "completed":
-                await manager.broadcast_to_session(session_id, {
-                    "type": "game_completed"
-                })
+            scheduler.cancel(("auto_next", session_id))
+            with tracing.phase("state"):
+                state = session_manager.get_session_state(session_id)
+            await broadcast_next_race(session_id, state)
+        else:
+            return "Cannot advance to the next race"
 
     elif msg_type == "request_state":
         # Client requesting full state sync
-        state = session_manager.get_session_state(session_id)
+        with tracing.phase("state"):
+            state = session_manager.get_session_state(session_id)
         await manager.send_personal_message({
             "type": "state_sync",
             "data": state
         }, websocket)
 
     else:
-        await manager.send_personal_message({
-            "type": "error",
-            "message": f"Unknown message type: {msg_type}"
-        }, websocket)
+        return f"Unknown message type: {msg_type}"
+    return None
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from .ws_protocol import DeflateWebSocketProtocol
+    uvicorn.run(app, host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", "8000")),
+                ws=DeflateWebSocketProtocol)
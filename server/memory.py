@@ -0,0 +1,199 @@
+"""
+Memory accounting for the multiplayer server
+Two views of where memory goes:
+
+- tracemalloc (when enabled) attributes every Python allocation to the file
+  that made it, grouped into ORM, connection, server and game categories.
+- A per-session estimate sums the objects each session keeps alive: its
+  ConnectionManager bookkeeping, scheduler timers and the ORM objects in the
+  identity maps of the database sessions held by its connections.
+
+Allocations made inside C libraries (SQLite pages, socket buffers in the
+kernel) are not Python allocations and do not show up in either view.
+"""
+import gc
+import sys
+import tracemalloc
+import types
+import weakref
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+# Allocation categories by path component of the allocating file
+CATEGORIES = (
+    ("orm", ("sqlalchemy",)),
+    ("connections", ("websockets", "uvicorn", "starlette", "h11", "httptools", "wsproto", "asyncio")),
+    ("server", ("server",)),
+    ("game", ("src",)),
+)
+
+# Objects shared by everything; sizing never follows references into these
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+           types.MethodType, types.CodeType, types.FrameType, weakref.ref)
+
+# Database sessions held open by WebSocket connections
+_db_sessions = weakref.WeakSet()
+
+
+def start(frames: int = 1):
+    """Start tracing allocations (frames of traceback kept per allocation)"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(max(1, frames))
+
+
+def stop():
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def track_db_session(db):
+    """Include a connection's database session in identity map accounting"""
+    _db_sessions.add(db)
+
+
+def reachable(obj, skip: Iterable[int] = ()) -> Tuple[int, int]:
+    """Objects and approximate bytes reachable from obj, not counting shared objects"""
+    seen = set(skip)
+    stack = [obj]
+    objects = total = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _OPAQUE):
+            continue
+        seen.add(id(current))
+        objects += 1
+        total += sys.getsizeof(current)
+        stack.extend(gc.get_referents(current))
+    return objects, total
+
+
+def deep_sizeof(obj, skip: Iterable[int] = ()) -> int:
+    """Approximate bytes reachable from obj, not counting shared objects"""
+    return reachable(obj, skip)[1]
+
+
+def category_of(filename: str) -> str:
+    parts = filename.replace("\\", "/").split("/")
+    for category, names in CATEGORIES:
+        if any(name in parts for name in names):
+            return category
+    return "other"
+
+
+def allocations(top: int = 10) -> Optional[Dict]:
+    """Traced memory by category and the largest allocation sites"""
+    if not tracemalloc.is_tracing():
+        return None
+
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    by_category = defaultdict(int)
+    for stat in snapshot.statistics("filename"):
+        by_category[category_of(stat.traceback[0].filename)] += stat.size
+
+    return {
+        "current_bytes": current,
+        "peak_bytes": peak,
+        "by_category": dict(sorted(by_category.items(), key=lambda item: -item[1])),
+        "top_sites": [
+            {"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+             "bytes": stat.size, "blocks": stat.count}
+            for stat in snapshot.statistics("lineno")[:top]
+        ]
+    }
+
+
+def _orm_session_id(instance, state) -> Optional[str]:
+    """Game session an ORM object belongs to, without loading expired attributes"""
+    if type(instance).__name__ == "GameSession":
+        return state.identity[0] if state.identity else None
+    return state.dict.get("session_id")
+
+
+def _timer_session_id(key) -> Optional[str]:
+    """Session id in a scheduler key such as ("betting_window", session_id)"""
+    if isinstance(key, tuple) and len(key) > 1 and isinstance(key[1], str):
+        return key[1]
+    return None
+
+
+def identity_maps() -> Dict[str, Dict]:
+    """ORM objects and their approximate bytes per game session"""
+    sessions = defaultdict(lambda: {"orm_objects": 0, "orm_bytes": 0})
+    for db in list(_db_sessions):
+        for instance in list(db.identity_map.values()):
+            state = instance._sa_instance_state
+            session_id = _orm_session_id(instance, state)
+            if session_id is None:
+                continue
+            entry = sessions[session_id]
+            entry["orm_objects"] += 1
+            # The instance, its attribute values and its (unfollowed) InstanceState
+            entry["orm_bytes"] += deep_sizeof(instance, skip=(id(state),)) + sys.getsizeof(state)
+    return sessions
+
+
+def connections(manager) -> Dict[str, Dict]:
+    """ConnectionManager bookkeeping per session (not the sockets themselves)"""
+    sessions = {}
+    per_entry = sys.getsizeof(manager.connection_info) // max(len(manager.connection_info), 1)
+    for session_id, sockets in manager.active_connections.items():
+        size = sys.getsizeof(sockets)
+        for socket in sockets:
+            info = manager.connection_info.get(socket)
+            if info is not None:
+                size += per_entry + sys.getsizeof(info) + sum(sys.getsizeof(field) for field in info)
+        sessions[session_id] = {"connections": len(sockets), "connection_bytes": size}
+    return sessions
+
+
+def timers(scheduler) -> Dict[str, Dict]:
+    """Scheduler timers per session (keys are tuples ending in the session id)"""
+    sessions = defaultdict(lambda: {"timers": 0, "timer_bytes": 0})
+    for key, timer in list(scheduler._timers.items()):
+        session_id = _timer_session_id(key)
+        if session_id is None:
+            continue
+        sessions[session_id]["timers"] += 1
+        sessions[session_id]["timer_bytes"] += sys.getsizeof(timer) + deep_sizeof(key) + deep_sizeof(timer.args)
+    return sessions
+
+
+def session_footprints(manager, scheduler) -> Dict[str, Dict]:
+    """Estimated bytes each session keeps alive, by component"""
+    footprints = defaultdict(lambda: {
+        "connections": 0, "connection_bytes": 0,
+        "timers": 0, "timer_bytes": 0,
+        "orm_objects": 0, "orm_bytes": 0
+    })
+    for part in (connections(manager), timers(scheduler), identity_maps()):
+        for session_id, values in part.items():
+            footprints[session_id].update(values)
+    for entry in footprints.values():
+        entry["total_bytes"] = entry["connection_bytes"] + entry["timer_bytes"] + entry["orm_bytes"]
+    return dict(footprints)
+
+
+def report(manager, scheduler, top: int = 10) -> Dict:
+    """Full memory report for the admin endpoint"""
+    sessions = session_footprints(manager, scheduler)
+    totals = {
+        "sessions": len(sessions),
+        "connections": len(manager.connection_info),
+        "db_sessions": len(_db_sessions),
+        "session_bytes": sum(entry["total_bytes"] for entry in sessions.values()),
+    }
+    totals["bytes_per_session"] = totals["session_bytes"] // max(totals["sessions"], 1)
+
+    traced = allocations(top)
+    if traced and totals["sessions"]:
+        totals["traced_bytes_per_session"] = traced["current_bytes"] // totals["sessions"]
+
+    return {
+        "tracemalloc": traced,
+        "totals": totals,
+        "sessions": sessions
+    }
@@ -0,0 +1,227 @@
+"""
+Prometheus-style metrics for the Ready Set Bet server
+A small dependency-free registry rendered in the text exposition format at
+/metrics. Everything runs on the event loop thread, so updates are plain
+dict operations and cheap enough to leave on in production.
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from . import tracing
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class for a metric family with optional labels"""
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+    def _samples(self):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def _samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """Value that can go up and down, or be read from a callback at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        self.values: Dict[Tuple, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def _samples(self):
+        if self.callback:
+            yield f"{self.name} {_format_value(self.callback())}"
+            return
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: Tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Histogram(Metric):
+    """Fixed-bucket histogram of observed values (seconds by convention)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., +Inf count, sum]
+        self.values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, *labels) -> _Timer:
+        """Context manager observing elapsed wall time"""
+        return _Timer(self, labels)
+
+    def _samples(self):
+        for labels, series in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, callback))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+MESSAGES = REGISTRY.counter(
+    "rsb_messages_total", "WebSocket messages handled, by message type", ("type",))
+COMMAND_DURATION = REGISTRY.histogram(
+    "rsb_command_duration_seconds", "Time to handle a WebSocket message, by message type", ("type",))
+BROADCAST_DURATION = REGISTRY.histogram(
+    "rsb_broadcast_duration_seconds", "Time to fan a message out to every connection in a session")
+BROADCAST_RECIPIENTS = REGISTRY.counter(
+    "rsb_broadcast_messages_total", "Messages sent to individual connections by broadcasts")
+DUPLICATE_COMMANDS = REGISTRY.counter(
+    "rsb_duplicate_commands_total", "Retried commands answered from the reply cache")
+STATE_ENCODES = REGISTRY.counter(
+    "rsb_state_encodes_total", "State payloads encoded for sending, by cache result", ("result",))
+BITSET_FALLBACKS = REGISTRY.counter(
+    "rsb_board_bitset_fallbacks_total", "States sent with full bet lists because the bitset board cannot hold them")
+DB_COMMIT_DURATION = REGISTRY.histogram(
+    "rsb_db_commit_duration_seconds", "Time spent in database commits")
+GROUP_COMMIT_WRITES = REGISTRY.histogram(
+    "rsb_group_commit_writes", "Command writes committed together by each group commit",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200))
+DB_STATEMENTS = REGISTRY.histogram(
+    "rsb_db_statements", "SQL statements executed per message or HTTP request", ("handler",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200))
+OUTBOUND_IN_FLIGHT = REGISTRY.gauge(
+    "rsb_outbound_queue_depth", "Outbound WebSocket sends awaiting completion")
+LOOP_LAG = REGISTRY.gauge(
+    "rsb_event_loop_lag_seconds", "Most recent event loop scheduling lag")
+LOOP_LAG_HISTOGRAM = REGISTRY.histogram(
+    "rsb_event_loop_lag_distribution_seconds", "Event loop scheduling lag samples")
+
+
+def instrument_db(session_factory):
+    """Time every commit made through a sessionmaker"""
+    from sqlalchemy import event
+
+    @event.listens_for(session_factory, "before_commit")
+    def _before_commit(session):
+        if session.in_nested_transaction():
+            # Savepoint releases are not commits
+            return
+        session.info["commit_started"] = time.perf_counter()
+
+    @event.listens_for(session_factory, "after_commit")
+    def _after_commit(session):
+        started = session.info.pop("commit_started", None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            DB_COMMIT_DURATION.observe(elapsed)
+            tracing.record("commit", elapsed)
+
+
+def instrument_connections(manager):
+    """Expose session and connection counts from a ConnectionManager"""
+    REGISTRY.gauge("rsb_active_sessions", "Sessions with at least one open connection",
+                   callback=lambda: len(manager.active_connections))
+    REGISTRY.gauge("rsb_active_connections", "Open WebSocket connections",
+                   callback=lambda: len(manager.connection_info))
+
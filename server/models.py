@@ -2,7 +2,7 @@
 Database models for Ready Set Bet multiplayer
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, JSON, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey, JSON, Text
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -18,6 +18,8 @@ class GameSession(Base):
     current_race = Column(Integer, default=1)
     max_races = Column(Integer, default=4)
     race_active = Column(Boolean, default=False)
+    betting_open = Column(Boolean, default=True)  # False once the betting window has closed
+    betting_closes_at = Column(Float, nullable=True)  # Unix time the betting window closes
     max_players = Column(Integer, default=9)
 
     # Game state stored as JSON
@@ -0,0 +1,88 @@
+"""
+On-demand sampling profiler
+A background thread samples the event loop thread's stack at a fixed rate
+and aggregates the samples as collapsed stacks, one line per distinct stack:
+
+    main (server/main.py:160);handle_message (server/main.py:330);... 42
+
+which flamegraph.pl, speedscope or inferno render directly. The sampled
+thread is not interrupted; each sample costs one sys._current_frames() call
+in the sampler thread.
+"""
+import sys
+import time
+from collections import Counter
+from typing import Optional
+
+from . import tracing
+
+MAX_DEPTH = 128
+MAX_HZ = 1000.0
+
+
+def frame_label(code) -> str:
+    """Readable, stable label for a function: name and shortened path"""
+    parts = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_name} ({'/'.join(parts[-2:])}:{code.co_firstlineno})"
+
+
+def is_idle(frame) -> bool:
+    """True when the thread is waiting in the event loop's selector"""
+    return frame.f_code.co_name == "select" and frame.f_code.co_filename.endswith("selectors.py")
+
+
+class SamplingProfiler:
+    """Statistical profiler for one thread"""
+
+    def __init__(self, thread_id: int, hz: float = 100.0):
+        self.thread_id = thread_id
+        self.interval = 1.0 / min(max(hz, 1.0), MAX_HZ)
+        self.samples = 0
+        self.stacks = Counter()
+
+    def run(self, seconds: float, session_id: Optional[str] = None, include_idle: bool = False) -> Counter:
+        """
+        Sample for the given time, blocking the calling thread
+        With session_id, only samples taken while that session's message
+        handler is on the stack are kept.
+        """
+        deadline = time.monotonic() + seconds
+        next_sample = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if now < next_sample:
+                time.sleep(next_sample - now)
+            next_sample += self.interval
+            self.sample(session_id, include_idle)
+        return self.stacks
+
+    def sample(self, session_id: Optional[str] = None, include_idle: bool = False):
+        frame = sys._current_frames().get(self.thread_id)
+        self.samples += 1
+        if frame is None or (not include_idle and is_idle(frame)):
+            return
+        if session_id is not None:
+            trace = tracing.find_trace(frame)
+            if trace is None or trace.session_id != session_id:
+                return
+
+        labels = []
+        while frame is not None and len(labels) < MAX_DEPTH:
+            labels.append(frame_label(frame.f_code))
+            frame = frame.f_back
+        self.stacks[";".join(reversed(labels))] += 1
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format, most frequent first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profile_thread(thread_id: int, seconds: float, hz: float = 100.0,
+                   session_id: Optional[str] = None, include_idle: bool = False) -> SamplingProfiler:
+    """Profile another thread; blocks the caller, so run it in an executor"""
+    profiler = SamplingProfiler(thread_id, hz)
+    profiler.run(seconds, session_id, include_idle)
+    return profiler
+
@@ -0,0 +1,54 @@
+"""
+Per-session LRU of command replies, keyed by the client's request_id
+Clients retry a command with the same request_id when they cannot tell
+whether it arrived (e.g. the connection dropped before the ack). The first
+copy runs; later copies get the original ack or nack without running the
+command again, so a retried place_bet cannot spend a token twice or fail
+with "Spot already taken" against its own bet. A copy that arrives while
+the original is still running waits for its reply.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+DEFAULT_SIZE = 512
+# Longer ids are not cached (the commands still run)
+MAX_REQUEST_ID_LENGTH = 64
+
+
+def valid_request_id(request_id) -> bool:
+    return isinstance(request_id, str) and 0 < len(request_id) <= MAX_REQUEST_ID_LENGTH
+
+
+class RequestCache:
+    """Replies to the latest commands of one session, by (player_name, request_id)"""
+
+    __slots__ = ("replies", "size")
+
+    def __init__(self, size: int = DEFAULT_SIZE):
+        # key -> future of the reply message (done once the command has run)
+        self.replies: "OrderedDict[Tuple[str, str], asyncio.Future]" = OrderedDict()
+        self.size = size
+
+    def claim(self, player_name: str, request_id: str) -> Tuple[asyncio.Future, bool]:
+        """
+        Future of the command's reply, and whether this copy is the first
+        The first copy runs the command and must resolve() the future, also
+        when it fails, so copies waiting on it are not stuck.
+        """
+        key = (player_name, request_id)
+        earlier = self.replies.get(key)
+        if earlier is not None:
+            self.replies.move_to_end(key)
+            return earlier, False
+        reply = self.replies[key] = asyncio.get_running_loop().create_future()
+        while len(self.replies) > self.size:
+            self.replies.popitem(last=False)
+        return reply, True
+
+    def resolve(self, player_name: str, request_id: str, future: asyncio.Future, reply: Optional[dict]):
+        """Complete a claimed command (reply None: it failed, a later copy runs it again)"""
+        if reply is None and self.replies.get((player_name, request_id)) is future:
+            del self.replies[(player_name, request_id)]
+        if not future.done():
+            future.set_result(reply)
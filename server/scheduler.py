@@ -0,0 +1,190 @@
+"""
+Timer scheduler for Ready Set Bet multiplayer
+One heap-backed scheduler drives every server-side timer (betting windows,
+auto-advance, idle timeouts, disconnect grace periods) from a single
+event-loop handle instead of one task or sleep per timer.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set
+
+from src.log import get_logger
+
+log = get_logger(__name__)
+
+
+class _Timer:
+    """A single scheduled callback (heap entry)"""
+
+    __slots__ = ("deadline", "seq", "key", "callback", "args", "cancelled")
+
+    def __init__(self, deadline: float, seq: int, key: Hashable, callback: Callable, args: tuple):
+        self.deadline = deadline
+        self.seq = seq
+        self.key = key
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def __lt__(self, other: "_Timer") -> bool:
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+
+class TimerScheduler:
+    """
+    Keyed timer scheduler backed by a binary heap.
+
+    Timers are identified by a hashable key such as ("betting_window", session_id);
+    scheduling an existing key replaces the previous timer. Cancelled timers are
+    dropped lazily and the heap is compacted once they make up half of it.
+    While attached to an event loop exactly one TimerHandle is armed, for the
+    earliest deadline.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._heap: List[_Timer] = []
+        self._timers: Dict[Hashable, _Timer] = {}
+        self._seq = itertools.count()
+        self._cancelled = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._armed_deadline: Optional[float] = None
+        self._tasks: Set[asyncio.Future] = set()
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._timers
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Attach to an event loop and start firing timers"""
+        self._loop = loop or asyncio.get_running_loop()
+        self._clock = self._loop.time
+        self._arm()
+
+    def stop(self):
+        """Detach from the event loop; pending timers are kept"""
+        if self._handle:
+            self._handle.cancel()
+        self._handle = None
+        self._armed_deadline = None
+        self._loop = None
+
+    def now(self) -> float:
+        """Current scheduler time"""
+        return self._clock()
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable, *args: Any) -> float:
+        """
+        Schedule callback(*args) to run after delay seconds
+        Returns the absolute deadline
+        """
+        existing = self._timers.get(key)
+        if existing:
+            self._discard(existing)
+
+        timer = _Timer(self._clock() + max(0.0, delay), next(self._seq), key, callback, args)
+        self._timers[key] = timer
+        heapq.heappush(self._heap, timer)
+
+        if self._armed_deadline is None or timer.deadline < self._armed_deadline:
+            self._arm()
+        return timer.deadline
+
+    def cancel(self, key: Hashable) -> bool:
+        """Cancel a timer. Returns True if one was pending"""
+        timer = self._timers.get(key)
+        if not timer:
+            return False
+        self._discard(timer)
+        return True
+
+    def remaining(self, key: Hashable) -> Optional[float]:
+        """Seconds until a timer fires, or None if it is not scheduled"""
+        timer = self._timers.get(key)
+        if not timer:
+            return None
+        return max(0.0, timer.deadline - self._clock())
+
+    def next_deadline(self) -> Optional[float]:
+        """Deadline of the earliest pending timer"""
+        self._drop_cancelled_head()
+        return self._heap[0].deadline if self._heap else None
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """
+        Fire every timer whose deadline has passed
+        Returns the number of callbacks run
+        """
+        if now is None:
+            now = self._clock()
+
+        fired = 0
+        # Callbacks may cancel timers and compact the heap: re-read it each time
+        while self._heap and self._heap[0].deadline <= now:
+            timer = heapq.heappop(self._heap)
+            if timer.cancelled:
+                self._cancelled -= 1
+                continue
+            del self._timers[timer.key]
+            self._invoke(timer)
+            fired += 1
+        return fired
+
+    def _invoke(self, timer: _Timer):
+        """Run a callback, scheduling it on the loop if it is a coroutine"""
+        try:
+            result = timer.callback(*timer.args)
+            if asyncio.iscoroutine(result):
+                task = asyncio.ensure_future(result, loop=self._loop)
+                self._tasks.add(task)
+                task.add_done_callback(self._task_done)
+        except Exception as e:
+            log.exception("Error in timer %r: %s", timer.key, e)
+
+    def _task_done(self, task: asyncio.Future):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            log.error("Error in timer task: %s", task.exception(), exc_info=task.exception())
+
+    def _discard(self, timer: _Timer):
+        timer.cancelled = True
+        del self._timers[timer.key]
+        self._cancelled += 1
+        if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+            self._heap = [t for t in self._heap if not t.cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def _drop_cancelled_head(self):
+        heap = self._heap
+        while heap and heap[0].cancelled:
+            heapq.heappop(heap)
+            self._cancelled -= 1
+
+    def _arm(self):
+        """Point the single loop handle at the earliest deadline"""
+        if self._loop is None:
+            return
+
+        deadline = self.next_deadline()
+        if deadline == self._armed_deadline:
+            return
+
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+        self._armed_deadline = deadline
+        if deadline is not None:
+            self._handle = self._loop.call_at(deadline, self._on_tick)
+
+    def _on_tick(self):
+        self._handle = None
+        self._armed_deadline = None
+        self.run_due()
+        self._arm()
@@ -3,12 +3,18 @@ Session management for Ready Set Bet multiplayer
 """
 import random
 import string
+import time
 import uuid
 from typing import Optional, Dict, List
 from datetime import datetime
 from sqlalchemy.orm import Session
 
 from .models import GameSession, Player, Bet, GameEvent
+from .state_cache import versions
+
+
+# Most bets one place_bets command may carry
+MAX_BATCH_BETS = 16
 
 
 def generate_session_id() -> str:
@@ -24,8 +30,16 @@ def generate_player_token() -> str:
 class SessionManager:
     """Manages game sessions and state"""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, defer_commit: bool = False):
         self.db = db
+        # Only flush, leaving the commit to the caller (see server.group_commit)
+        self.defer_commit = defer_commit
+
+    def _commit(self):
+        if self.defer_commit:
+            self.db.flush()
+        else:
+            self.db.commit()
 
     def create_session(self) -> GameSession:
         """Create a new game session"""
@@ -67,7 +81,7 @@ class SessionManager:
         )
 
         self.db.add(session)
-        self.db.commit()
+        self._commit()
         self.db.refresh(session)
 
         # Log event
@@ -115,7 +129,7 @@ class SessionManager:
         )
 
         self.db.add(player)
-        self.db.commit()
+        self._commit()
         self.db.refresh(player)
 
         # Log event
@@ -140,7 +154,7 @@ class SessionManager:
         # Update connection status
         player.is_connected = True
         player.last_seen = datetime.utcnow()
-        self.db.commit()
+        self._commit()
 
         # Log event
         self._log_event(player.session_id, "player_reconnected", {"player_name": player.name})
@@ -154,12 +168,14 @@ class SessionManager:
 
     def get_session_state(self, session_id: str) -> Optional[Dict]:
         """Get complete session state for synchronization"""
+        version = versions.current(self.db, session_id)
         session = self.get_session(session_id)
         if not session:
             return None
 
         # Get all players
         players = self.db.query(Player).filter_by(session_id=session_id).all()
+        player_names = {p.id: p.name for p in players}
         players_data = []
         for p in players:
             players_data.append({
@@ -178,9 +194,8 @@ class SessionManager:
         ).all()
         bets_data = []
         for b in current_bets:
-            player = self.db.query(Player).filter_by(id=b.player_id).first()
             bets_data.append({
-                "player": player.name if player else "Unknown",
+                "player": player_names.get(b.player_id, "Unknown"),
                 "horse": b.horse,
                 "bet_type": b.bet_type,
                 "multiplier": b.multiplier,
@@ -199,12 +214,15 @@ class SessionManager:
             "current_race": session.current_race,
             "max_races": session.max_races,
             "race_active": session.race_active,
+            "betting_open": session.betting_open,
+            "betting_closes_at": session.betting_closes_at,
             "locked_spots": session.locked_spots,
             "current_prop_bets": session.current_prop_bets,
             "current_exotic_finishes": session.current_exotic_finishes,
             "game_log": session.game_log,
             "players": players_data,
-            "current_bets": bets_data
+            "current_bets": bets_data,
+            "state_version": version
         }
 
     def place_bet(self, session_id: str, player_name: str, bet_data: Dict) -> Optional[Dict]:
@@ -212,6 +230,19 @@ class SessionManager:
         Place a bet for a player
         Returns success status and updated state
         """
+        return self.place_bets(session_id, player_name, [bet_data])
+
+    def place_bets(self, session_id: str, player_name: str, bets: List[Dict]) -> Dict:
+        """
+        Place several bets for a player: all of them or none
+        Spots and tokens are checked against each other as well as the board,
+        and everything is committed at once.
+        """
+        if not isinstance(bets, list) or not bets or not all(isinstance(bet_data, dict) for bet_data in bets):
+            return {"success": False, "error": "No bets"}
+        if len(bets) > MAX_BATCH_BETS:
+            return {"success": False, "error": "Too many bets"}
+
         session = self.get_session(session_id)
         if not session or not session.race_active:
             return {"success": False, "error": "Race not active"}
@@ -223,51 +254,53 @@ class SessionManager:
         if not player:
             return {"success": False, "error": "Player not found"}
 
-        # Check if spot is locked
-        spot_key = bet_data["spot_key"]
-        if spot_key in session.locked_spots:
-            return {"success": False, "error": "Spot already taken"}
-
-        # Check if player has token
-        token_value = str(bet_data["token_value"])
-        available = player.tokens.get(token_value, 0) - player.used_tokens.get(token_value, 0)
-        if available <= 0:
-            return {"success": False, "error": "Token not available"}
-
-        # Create bet
-        bet = Bet(
-            session_id=session_id,
-            player_id=player.id,
-            race_number=session.current_race,
-            horse=bet_data["horse"],
-            bet_type=bet_data["bet_type"],
-            multiplier=bet_data["multiplier"],
-            penalty=bet_data["penalty"],
-            token_value=bet_data["token_value"],
-            spot_key=spot_key,
-            row=bet_data.get("row"),
-            col=bet_data.get("col"),
-            prop_bet_id=bet_data.get("prop_bet_id"),
-            exotic_finish_id=bet_data.get("exotic_finish_id")
-        )
-
-        # Update player used tokens
-        player.used_tokens[token_value] = player.used_tokens.get(token_value, 0) + 1
+        if not session.betting_open:
+            return {"success": False, "error": "Betting is closed"}
 
-        # Lock spot
         locked_spots = session.locked_spots.copy()
-        locked_spots[spot_key] = player_name
+        used_tokens = player.used_tokens.copy()
+        new_bets = []
+        for bet_data in bets:
+            # Check if spot is locked
+            spot_key = bet_data["spot_key"]
+            if spot_key in locked_spots:
+                return {"success": False, "error": "Spot already taken"}
+
+            # Check if player has token
+            token_value = str(bet_data["token_value"])
+            available = player.tokens.get(token_value, 0) - used_tokens.get(token_value, 0)
+            if available <= 0:
+                return {"success": False, "error": "Token not available"}
+
+            new_bets.append(Bet(
+                session_id=session_id,
+                player_id=player.id,
+                race_number=session.current_race,
+                horse=bet_data["horse"],
+                bet_type=bet_data["bet_type"],
+                multiplier=bet_data["multiplier"],
+                penalty=bet_data["penalty"],
+                token_value=bet_data["token_value"],
+                spot_key=spot_key,
+                row=bet_data.get("row"),
+                col=bet_data.get("col"),
+                prop_bet_id=bet_data.get("prop_bet_id"),
+                exotic_finish_id=bet_data.get("exotic_finish_id")
+            ))
+            used_tokens[token_value] = used_tokens.get(token_value, 0) + 1
+            locked_spots[spot_key] = player_name
+
+        # Update used tokens and lock spots (reassign so the JSON columns are marked dirty)
+        player.used_tokens = used_tokens
         session.locked_spots = locked_spots
 
-        self.db.add(bet)
-        self.db.commit()
-
-        # Log event
-        self._log_event(session_id, "bet_placed", {
-            "player_name": player_name,
-            "spot_key": spot_key,
-            "token_value": bet_data["token_value"]
-        })
+        self.db.add_all(new_bets)
+        # Log events in the same commit
+        for bet in new_bets:
+            self.db.add(GameEvent(session_id=session_id, event_type="bet_placed", player_name=player_name,
+                                  event_data={"player_name": player_name, "spot_key": bet.spot_key,
+                                              "token_value": bet.token_value}))
+        self._commit()
 
         return {"success": True}
 
@@ -277,6 +310,9 @@ class SessionManager:
         if not session:
             return {"success": False, "error": "Session not found"}
 
+        if not session.betting_open:
+            return {"success": False, "error": "Betting is closed"}
+
         player = self.db.query(Player).filter_by(
             session_id=session_id,
             name=player_name
@@ -297,7 +333,9 @@ class SessionManager:
 
         # Return token
         token_value = str(bet.token_value)
-        player.used_tokens[token_value] = max(0, player.used_tokens.get(token_value, 0) - 1)
+        used_tokens = player.used_tokens.copy()
+        used_tokens[token_value] = max(0, used_tokens.get(token_value, 0) - 1)
+        player.used_tokens = used_tokens
 
         # Unlock spot
         locked_spots = session.locked_spots.copy()
@@ -306,7 +344,7 @@ class SessionManager:
         session.locked_spots = locked_spots
 
         self.db.delete(bet)
-        self.db.commit()
+        self._commit()
 
         # Log event
         self._log_event(session_id, "bet_removed", {
@@ -316,19 +354,62 @@ class SessionManager:
 
         return {"success": True}
 
-    def start_race(self, session_id: str) -> bool:
-        """Start a race (enable betting)"""
+    def start_race(self, session_id: str, betting_window: float = 0) -> bool:
+        """Start a race (enable betting, for betting_window seconds if set)"""
         session = self.get_session(session_id)
         if not session or session.race_active:
             return False
 
         session.race_active = True
         session.status = "active"
-        self.db.commit()
+        session.betting_open = True
+        session.betting_closes_at = time.time() + betting_window if betting_window > 0 else None
+        self._commit()
 
         self._log_event(session_id, "race_started", {"race_number": session.current_race})
         return True
 
+    def close_betting(self, session_id: str) -> bool:
+        """Close the betting window; the race stays active until results are in"""
+        session = self.get_session(session_id)
+        if not session or not session.race_active or not session.betting_open:
+            return False
+
+        session.betting_open = False
+        session.betting_closes_at = None
+        self._commit()
+
+        self._log_event(session_id, "betting_closed", {"race_number": session.current_race})
+        return True
+
+    def mark_disconnected(self, session_id: str, player_name: str) -> bool:
+        """Mark a player as disconnected once their grace period has expired"""
+        player = self.db.query(Player).filter_by(
+            session_id=session_id,
+            name=player_name
+        ).first()
+        if not player:
+            return False
+
+        player.is_connected = False
+        self._commit()
+
+        self._log_event(session_id, "player_disconnected", {"player_name": player_name})
+        return True
+
+    def expire_session(self, session_id: str) -> bool:
+        """Expire an idle session"""
+        session = self.get_session(session_id)
+        if not session or session.status in ("completed", "expired"):
+            return False
+
+        session.status = "expired"
+        session.race_active = False
+        self._commit()
+
+        self._log_event(session_id, "session_expired", {})
+        return True
+
     def end_race(self, session_id: str, results: Dict) -> bool:
         """
         End a race and process results
@@ -345,39 +426,40 @@ class SessionManager:
             return False
 
         session.race_active = False
-        self.db.commit()
+        self._commit()
 
         # Process results using game logic
         import sys
         import os
         sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
         from src.game_logic import GameLogic
-        from src.models import Bet as ClientBet, Player as ClientPlayer, GameState
+        from src.models import Bet as ClientBet, BetStore, Player as ClientPlayer, GameState
 
         # Build temporary game state for processing
         players_dict = {}
         db_players = self.db.query(Player).filter_by(session_id=session_id).all()
+        player_names = {db_player.id: db_player.name for db_player in db_players}
         for db_player in db_players:
             client_player = ClientPlayer(
                 name=db_player.name,
                 money=db_player.money,
-                vip_cards=db_player.vip_cards,
+                vip_cards=list(db_player.vip_cards),
                 tokens=db_player.tokens,
                 used_tokens=db_player.used_tokens
             )
             players_dict[db_player.name] = client_player
 
-        # Build bets dict
-        bets_dict = {}
+        # Build bet store
+        bet_store = BetStore()
         db_bets = self.db.query(Bet).filter_by(
             session_id=session_id,
             race_number=session.current_race
         ).all()
         for db_bet in db_bets:
-            player = self.db.query(Player).filter_by(id=db_bet.player_id).first()
-            if player:
+            player_name = player_names.get(db_bet.player_id)
+            if player_name:
                 client_bet = ClientBet(
-                    player=player.name,
+                    player=player_name,
                     horse=db_bet.horse,
                     bet_type=db_bet.bet_type,
                     multiplier=db_bet.multiplier,
@@ -389,7 +471,7 @@ class SessionManager:
                     prop_bet_id=db_bet.prop_bet_id,
                     exotic_finish_id=db_bet.exotic_finish_id
                 )
-                bets_dict[db_bet.spot_key] = client_bet
+                bet_store.add(client_bet)
 
         # Create temporary game state
         temp_state = GameState(
@@ -397,8 +479,7 @@ class SessionManager:
             max_races=session.max_races,
             race_active=session.race_active,
             players=players_dict,
-            current_bets=bets_dict,
-            locked_spots=session.locked_spots,
+            current_bets=bet_store,
             current_prop_bets=session.current_prop_bets,
             current_exotic_finishes=session.current_exotic_finishes,
             used_prop_bets=session.used_prop_bets,
@@ -421,7 +502,7 @@ class SessionManager:
             db_player.money = client_player.money
             db_player.vip_cards = client_player.vip_cards
 
-        self.db.commit()
+        self._commit()
 
         # Log event
         self._log_event(session_id, "race_ended", {
@@ -466,7 +547,7 @@ class SessionManager:
         # Check if game is complete
         if session.current_race > session.max_races:
             session.status = "completed"
-            self.db.commit()
+            self._commit()
             self._log_event(session_id, "game_completed", {})
             return True
 
@@ -491,7 +572,7 @@ class SessionManager:
             session.used_exotic_finishes = session.used_exotic_finishes + [new_exotic_id]
             session.current_exotic_finishes = session.current_exotic_finishes + [EXOTIC_FINISHES[new_exotic_id]]
 
-        self.db.commit()
+        self._commit()
 
         # Log event
         self._log_event(session_id, "next_race", {"race_number": session.current_race})
@@ -507,4 +588,4 @@ class SessionManager:
             player_name=event_data.get("player_name")
         )
         self.db.add(event)
-        self.db.commit()
+        self._commit()
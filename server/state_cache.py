@@ -0,0 +1,134 @@
+"""
+State versions and encoded-state caching
+Every commit that writes rows of a game session bumps that session's state
+version. get_session_state reports the version it was built at, so a state
+payload can be encoded once per version and wire format and reused for
+every state_sync and REST response until the session changes again.
+
+Versions are tracked by listening to every SQLAlchemy Session in this
+process, which assumes a single server process owns the database.
+"""
+import itertools
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src import protocol
+from src.board import compact_state
+
+from . import metrics
+
+# Pending session ids a transaction has written ("*" for bulk statements)
+_TOUCHED = "rsb_touched_sessions"
+_ALL = "*"
+
+
+def _session_id_of(instance) -> Optional[str]:
+    """Game session a mapped row belongs to"""
+    session_id = getattr(instance, "session_id", None)
+    if session_id is None and getattr(instance, "__tablename__", None) == "game_sessions":
+        session_id = instance.id
+    return session_id
+
+
+class StateVersions:
+    """Per-session counters bumped by committed writes"""
+
+    def __init__(self):
+        # Start from the clock so versions keep increasing across restarts
+        self._counter = itertools.count(time.time_ns() // 1000)
+        self._versions: Dict[str, int] = {}
+        self._epoch = next(self._counter)
+
+    def get(self, session_id: str) -> int:
+        return self._versions.get(session_id, self._epoch)
+
+    def current(self, db: Session, session_id: str) -> Optional[int]:
+        """Version of a session as db sees it (None while db has uncommitted writes to it)"""
+        touched = db.info.get(_TOUCHED, ())
+        if session_id in touched or _ALL in touched or db.new or db.dirty or db.deleted:
+            return None
+        return self.get(session_id)
+
+    def bump(self, session_ids: Set[str]):
+        if _ALL in session_ids:
+            self._versions.clear()
+            self._epoch = next(self._counter)
+            return
+        for session_id in session_ids:
+            self._versions[session_id] = next(self._counter)
+
+    def install(self, target=Session):
+        """Track writes made through target (every Session by default)"""
+
+        @event.listens_for(target, "after_flush")
+        def _after_flush(db, flush_context):
+            touched = db.info.setdefault(_TOUCHED, set())
+            for instance in itertools.chain(db.new, db.dirty, db.deleted):
+                session_id = _session_id_of(instance)
+                touched.add(_ALL if session_id is None else session_id)
+
+        @event.listens_for(target, "do_orm_execute")
+        def _bulk_write(state):
+            # Query.update()/delete() bypass the flush
+            if state.is_update or state.is_delete:
+                state.session.info.setdefault(_TOUCHED, set()).add(_ALL)
+
+        @event.listens_for(target, "after_commit")
+        def _after_commit(db):
+            if db.in_nested_transaction():
+                # A savepoint release (see server.group_commit): nothing is committed yet
+                return
+            touched = db.info.pop(_TOUCHED, None)
+            if touched:
+                self.bump(touched)
+
+        @event.listens_for(target, "after_rollback")
+        def _after_rollback(db):
+            if db.in_nested_transaction():
+                return
+            db.info.pop(_TOUCHED, None)
+
+
+versions = StateVersions()
+versions.install()
+
+
+def compact_board_state(state: dict) -> dict:
+    """compact_state for board.bitset connections, counting states it leaves unchanged"""
+    compact = compact_state(state)
+    if compact is state and "current_bets" in state:
+        metrics.BITSET_FALLBACKS.inc()
+    return compact
+
+
+class EncodedStates:
+    """Encoded state payloads of the latest version of each session"""
+
+    def __init__(self):
+        # session_id -> (version, {(codec name, compact board): fragment})
+        self._entries: Dict[str, Tuple[int, dict]] = {}
+
+    def encode(self, state: dict, codec=protocol.JSON, compact_board: bool = False):
+        """Encoded state, reused while its session stays at the same version"""
+        version = state.get("state_version")
+        if version is None:
+            return codec.encode(compact_board_state(state) if compact_board else state)
+
+        session_id = state["session_id"]
+        entry = self._entries.get(session_id)
+        if entry is None or entry[0] != version:
+            entry = self._entries[session_id] = (version, {})
+        variant = (codec.name, compact_board)
+        fragment = entry[1].get(variant)
+        if fragment is None:
+            metrics.STATE_ENCODES.inc("miss")
+            fragment = entry[1][variant] = codec.encode(compact_board_state(state) if compact_board else state)
+        else:
+            metrics.STATE_ENCODES.inc("hit")
+        return fragment
+
+    def discard(self, session_id: str):
+        self._entries.pop(session_id, None)
@@ -0,0 +1,180 @@
+"""
+Per-message latency tracing
+Every inbound WebSocket message gets a trace id and a breakdown of where its
+time went. Phases (microseconds):
+
+    parse    decoding the inbound JSON frame
+    manager  SessionManager calls (includes commit)
+    commit   database commits
+    state    building the session state for broadcast
+    encode   encoding outbound JSON
+    send     writing frames to sockets
+
+With TRACE_FILE set, each finished trace is one tab-separated line in a
+rotating trace file, written by a background thread (see src.log.queued):
+
+    <unix ms> <trace id> <session> <type> <total us> parse=.. manager=.. commit=.. ...
+
+Traces slower than SLOW_REQUEST_MS are also logged. The trace id is echoed
+as "trace_id" in messages sent while handling the command, and clients may
+supply their own (letters, digits, "_" and "-") so they can compute
+end-to-end latency.
+"""
+import itertools
+import logging
+import os
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Optional
+
+from src.log import get_logger, queued
+
+log = get_logger(__name__)
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(5 * 1024 * 1024)))
+TRACE_BACKUPS = int(os.getenv("TRACE_BACKUPS", "3"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "250"))
+
+MAX_CLIENT_TRACE_ID = 64
+# Client ids are written into tab-separated lines: no separators or newlines
+_CLIENT_TRACE_ID = re.compile(r"[A-Za-z0-9_-]{1,%d}" % MAX_CLIENT_TRACE_ID)
+
+_prefix = uuid.uuid4().hex[:6]
+_counter = itertools.count(1)
+_current: ContextVar[Optional["Trace"]] = ContextVar("rsb_trace", default=None)
+
+
+class _Phase:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: "Trace", name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, time.perf_counter() - self.start)
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+class Trace:
+    """Timings for one inbound message"""
+
+    __slots__ = ("trace_id", "session_id", "msg_type", "started", "phases")
+
+    def __init__(self, session_id: str):
+        self.trace_id = f"{_prefix}-{next(_counter):x}"
+        self.session_id = session_id
+        self.msg_type = "unknown"
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def use_client_id(self, trace_id):
+        """Adopt a trace id supplied by the client, if it is usable"""
+        if isinstance(trace_id, str) and _CLIENT_TRACE_ID.fullmatch(trace_id):
+            self.trace_id = trace_id
+
+    def format(self, total: float) -> str:
+        phases = " ".join(f"{name}={seconds * 1e6:.0f}" for name, seconds in self.phases.items())
+        return "\t".join((
+            str(int(time.time() * 1000)),
+            self.trace_id,
+            self.session_id,
+            self.msg_type,
+            f"{total * 1e6:.0f}",
+            phases
+        ))
+
+
+def _make_writer() -> Optional[logging.Logger]:
+    if not TRACE_FILE:
+        return None
+    writer = logging.getLogger("rsb.trace")
+    writer.propagate = False
+    writer.setLevel(logging.INFO)
+    if not writer.handlers:
+        handler = RotatingFileHandler(TRACE_FILE, maxBytes=TRACE_MAX_BYTES,
+                                      backupCount=TRACE_BACKUPS, delay=True)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        queued(writer, handler)
+    return writer
+
+
+_writer = _make_writer()
+
+
+def find_trace(frame) -> Optional[Trace]:
+    """Find the trace of the message being handled in a stack of frames"""
+    while frame is not None:
+        for value in list(frame.f_locals.values()):
+            if isinstance(value, Trace):
+                return value
+        frame = frame.f_back
+    return None
+
+
+def start(session_id: str) -> Trace:
+    """Begin tracing a message; it becomes the current trace"""
+    trace = Trace(session_id)
+    _current.set(trace)
+    return trace
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+def phase(name: str):
+    """Time a phase of the current trace (no-op outside a trace)"""
+    trace = _current.get()
+    if trace is None:
+        return _NO_PHASE
+    return _Phase(trace, name)
+
+
+def record(name: str, seconds: float):
+    """Add time to a phase of the current trace"""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+def finish(trace: Trace) -> float:
+    """End a trace, write it out and return its total duration in seconds"""
+    total = time.perf_counter() - trace.started
+    _current.set(None)
+
+    line = trace.format(total)
+    if _writer:
+        _writer.info(line)
+    if total * 1000 >= SLOW_REQUEST_MS:
+        log.warning("Slow request: %s", line, extra={
+            "trace_id": trace.trace_id, "session_id": trace.session_id,
+            "message_type": trace.msg_type, "total_ms": round(total * 1000, 3)
+        })
+    return total
@@ -1,30 +1,101 @@
 """
 WebSocket connection manager for real-time communication
 """
-from typing import Dict, List, Set
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
 from fastapi import WebSocket
-import json
 import asyncio
+import time
+
+from src import protocol
+from src.log import get_logger
+
+from . import metrics, tracing
+from . import event_buffer, request_cache
+from .event_buffer import EventBuffer
+from .request_cache import RequestCache
+from .state_cache import EncodedStates, compact_board_state
+
+log = get_logger(__name__)
+
+
+def encode_message(message: dict, compact_board: bool = False, codec=protocol.JSON,
+                   states: EncodedStates = None) -> Union[str, bytes]:
+    """
+    Encode an outbound message, tagging it with the current trace id
+    With compact_board, state_sync payloads carry the board as a bitset
+    instead of current_bets and locked_spots. State payloads are encoded
+    through states, which reuses them while the session is unchanged.
+    """
+    trace = tracing.current()
+    if trace is not None and "trace_id" not in message:
+        message = {**message, "trace_id": trace.trace_id}
+    with tracing.phase("encode"):
+        state = message.get("data") if message.get("type") == "state_sync" else None
+        if state and states is not None:
+            return codec.splice(message, "data", states.encode(state, codec, compact_board))
+        if state and compact_board:
+            message = {**message, "data": compact_board_state(state)}
+        return codec.encode(message)
+
+
+async def send_frame(websocket: WebSocket, frame: Union[str, bytes]):
+    if isinstance(frame, bytes):
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame)
 
 
 class ConnectionManager:
     """Manages WebSocket connections for game sessions"""
 
-    def __init__(self):
+    def __init__(self, event_buffer_size: int = event_buffer.DEFAULT_SIZE,
+                 request_cache_size: int = request_cache.DEFAULT_SIZE):
         # session_id -> set of WebSocket connections
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         # websocket -> (session_id, player_name, player_token)
         self.connection_info: Dict[WebSocket, tuple] = {}
+        # Connections that asked for the board as a bitset
+        self.compact_boards: Set[WebSocket] = set()
+        # websocket -> codec negotiated at connect (JSON when absent)
+        self.codecs: Dict[WebSocket, object] = {}
+        # websocket -> capabilities agreed in the protocol 2 handshake
+        self.capabilities: Dict[WebSocket, List[str]] = {}
+        # Encoded state_sync payloads, shared with the REST state endpoint
+        self.states = EncodedStates()
+        # session_id -> recent sequenced broadcasts, for clients that resume
+        self.events: Dict[str, EventBuffer] = {}
+        self.event_buffer_size = event_buffer_size
+        # session_id -> replies to recent commands, for clients that retry them
+        self.requests: Dict[str, RequestCache] = {}
+        self.request_cache_size = request_cache_size
+        # Connections still being sent their initial state -> [(seq, frame)] broadcast meanwhile
+        self.syncing: Dict[WebSocket, list] = {}
 
-    async def connect(self, websocket: WebSocket, session_id: str, player_name: str, player_token: str):
-        """Connect a player to a session"""
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, session_id: str, player_name: str, player_token: str,
+                      compact_board: bool = False):
+        """
+        Connect a player to a session
+        The wire encoding is negotiated from the subprotocols the client offers.
+        """
+        offered = websocket.scope.get("subprotocols") or []
+        codec = protocol.negotiate(offered)
+        await websocket.accept(subprotocol=codec.name if codec.name in offered else None,
+                               headers=[(protocol.PROTOCOL_HEADER.encode(), str(protocol.PROTOCOL_VERSION).encode())])
+        if codec is not protocol.JSON:
+            self.codecs[websocket] = codec
+        if compact_board:
+            self.compact_boards.add(websocket)
 
         if session_id not in self.active_connections:
             self.active_connections[session_id] = set()
 
         self.active_connections[session_id].add(websocket)
         self.connection_info[websocket] = (session_id, player_name, player_token)
+        self.syncing[websocket] = []
+        if session_id not in self.events:
+            self.events[session_id] = EventBuffer(self.event_buffer_size)
+        if session_id not in self.requests:
+            self.requests[session_id] = RequestCache(self.request_cache_size)
 
     def disconnect(self, websocket: WebSocket):
         """Disconnect a player"""
@@ -37,35 +108,178 @@ class ConnectionManager:
                 # Clean up empty session
                 if not self.active_connections[session_id]:
                     del self.active_connections[session_id]
+                    self.states.discard(session_id)
 
             del self.connection_info[websocket]
+        self.compact_boards.discard(websocket)
+        self.codecs.pop(websocket, None)
+        self.capabilities.pop(websocket, None)
+        self.syncing.pop(websocket, None)
+
+    def handshake(self, websocket: WebSocket, hello: dict) -> dict:
+        """
+        Agree on capabilities from a client's hello
+        Returns the welcome message to send back.
+        """
+        codec = self.codec_for(websocket)
+        supported = [protocol.ACKS, protocol.BATCH_BETS, protocol.BITSET_BOARD, protocol.COMPRESSION, protocol.RESUME]
+        if codec.binary:
+            supported.append(protocol.BINARY)
+        agreed = protocol.agree(hello.get("capabilities"), supported)
+        self.capabilities[websocket] = agreed
+        if protocol.BITSET_BOARD in agreed:
+            self.compact_boards.add(websocket)
+        return {
+            "type": "welcome",
+            "protocol": min(protocol.peer_protocol(hello.get("protocol")), protocol.PROTOCOL_VERSION),
+            "capabilities": agreed,
+            "encoding": codec.name
+        }
+
+    def codec_for(self, websocket: WebSocket):
+        """Codec a connection speaks"""
+        return self.codecs.get(websocket, protocol.JSON)
 
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Send message to specific connection"""
+        frame = encode_message(message, websocket in self.compact_boards, self.codec_for(websocket), self.states)
+        metrics.OUTBOUND_IN_FLIGHT.inc()
         try:
-            await websocket.send_json(message)
+            with tracing.phase("send"):
+                await send_frame(websocket, frame)
         except Exception as e:
-            print(f"Error sending personal message: {e}")
+            log.warning("Error sending personal message: %s", e)
+        finally:
+            metrics.OUTBOUND_IN_FLIGHT.dec()
 
     async def broadcast_to_session(self, session_id: str, message: dict, exclude: WebSocket = None):
-        """Broadcast message to all players in a session"""
+        """
+        Broadcast message to all players in a session
+        Broadcasts to everyone are numbered and kept for resuming clients,
+        including while nobody is connected.
+        """
+        events = self.events.get(session_id)
+        if events is not None and exclude is None:
+            message = events.append(message)
         if session_id not in self.active_connections:
             return
 
+        started = time.perf_counter()
+        # Encoded once per encoding and board format, on first use
+        frames = {}
         disconnected = []
-        for connection in self.active_connections[session_id]:
+        send_phase = tracing.phase("send")
+        for connection in list(self.active_connections[session_id]):
             if connection == exclude:
                 continue
+            codec = self.codec_for(connection)
+            variant = (codec.name, connection in self.compact_boards)
+            frame = frames.get(variant)
+            if frame is None:
+                frame = frames[variant] = encode_message(message, variant[1], codec, self.states)
+            pending = self.syncing.get(connection)
+            if pending is not None:
+                pending.append((message.get("seq"), frame))
+                continue
+            metrics.OUTBOUND_IN_FLIGHT.inc()
             try:
-                await connection.send_json(message)
+                with send_phase:
+                    await send_frame(connection, frame)
+                metrics.BROADCAST_RECIPIENTS.inc()
             except Exception as e:
-                print(f"Error broadcasting to session: {e}")
+                log.warning("Error broadcasting to session: %s", e, extra={"session_id": session_id})
                 disconnected.append(connection)
+            finally:
+                metrics.OUTBOUND_IN_FLIGHT.dec()
+        metrics.BROADCAST_DURATION.observe(time.perf_counter() - started)
 
         # Clean up disconnected clients
         for conn in disconnected:
             self.disconnect(conn)
 
+    def last_seq(self, session_id: str) -> Optional[int]:
+        """Seq of the latest broadcast to a session"""
+        events = self.events.get(session_id)
+        return events.last_seq if events is not None else None
+
+    def missed_events(self, session_id: str, seq) -> Tuple[Optional[List[dict]], Optional[int]]:
+        """
+        Broadcasts after seq (None when the client needs a snapshot) and the
+        seq they end at, read together so no broadcast falls between them
+        """
+        events = self.events.get(session_id)
+        if events is None or not isinstance(seq, int) or isinstance(seq, bool):
+            return None, self.last_seq(session_id)
+        return events.since(seq), events.last_seq
+
+    async def sync(self, websocket: WebSocket, session_id: str, hello: Optional[dict],
+                   snapshot: Callable[[], dict]):
+        """
+        Bring a new connection up to date: welcome it (protocol 2 clients, which
+        send a hello), then replay the broadcasts it missed or send a snapshot
+        from snapshot(). Broadcasts arriving meanwhile are held until finish_sync.
+        """
+        missed, synced_seq = None, None
+        if hello is not None:
+            welcome = self.handshake(websocket, hello)
+            if protocol.RESUME in welcome["capabilities"]:
+                missed, synced_seq = self.missed_events(session_id, hello.get("last_seq"))
+                welcome["resumed"] = missed is not None
+            await self.send_personal_message(welcome, websocket)
+
+        if missed is not None:
+            # Resume: replay what the client missed instead of a snapshot
+            for message in missed:
+                await self.send_personal_message(message, websocket)
+        else:
+            synced_seq = self.last_seq(session_id)
+            await self.send_personal_message({
+                "type": "state_sync",
+                "data": snapshot(),
+                "seq": synced_seq
+            }, websocket)
+        await self.finish_sync(websocket, synced_seq)
+
+    async def finish_sync(self, websocket: WebSocket, seq: Optional[int]):
+        """
+        Initial state sent (up to seq): deliver what was broadcast meanwhile
+        Until then broadcasts to the connection are held back so they cannot
+        overtake the snapshot or replayed events.
+        """
+        pending = self.syncing.get(websocket)
+        while pending:
+            event_seq, frame = pending.pop(0)
+            if seq is not None and event_seq is not None and event_seq <= seq:
+                continue
+            try:
+                await send_frame(websocket, frame)
+            except Exception as e:
+                log.warning("Error sending to syncing connection: %s", e)
+                break
+        self.syncing.pop(websocket, None)
+
+    def drop_events(self, session_id: str):
+        """Forget a session's broadcasts and command replies once nobody can resume it"""
+        self.events.pop(session_id, None)
+        self.requests.pop(session_id, None)
+
+    async def close_session(self, session_id: str, code: int = 1000, reason: str = ""):
+        """Close every connection in a session"""
+        for connection in list(self.active_connections.get(session_id, ())):
+            try:
+                await connection.close(code=code, reason=reason)
+            except Exception as e:
+                log.warning("Error closing connection: %s", e, extra={"session_id": session_id})
+            self.disconnect(connection)
+        self.drop_events(session_id)
+
+    def is_player_connected(self, session_id: str, player_name: str) -> bool:
+        """Check whether a player has any open connection to a session"""
+        for connection in self.active_connections.get(session_id, ()):
+            if self.connection_info[connection][1] == player_name:
+                return True
+        return False
+
     def get_session_connections(self, session_id: str) -> int:
         """Get number of active connections in a session"""
         if session_id in self.active_connections:
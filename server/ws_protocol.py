@@ -0,0 +1,28 @@
+"""
+uvicorn WebSocket protocol with tuned permessage-deflate
+uvicorn always offers websockets' default compression; this protocol uses
+the settings below instead, including a size threshold under which
+messages are sent uncompressed (see src.compression). Pass it as
+uvicorn.run(..., ws=DeflateWebSocketProtocol); `python -m server.main` does.
+"""
+import os
+
+from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+
+from src import compression
+
+# Compression level 1-9 (0 disables compression)
+WS_DEFLATE_LEVEL = int(os.getenv("WS_DEFLATE_LEVEL", str(compression.DEFAULT_LEVEL)))
+# Messages smaller than this many bytes are sent uncompressed
+WS_DEFLATE_MIN_SIZE = int(os.getenv("WS_DEFLATE_MIN_SIZE", str(compression.DEFAULT_MIN_SIZE)))
+# Compression window (8-15); a window larger than a state_sync lets the next one reference it
+WS_DEFLATE_WINDOW_BITS = int(os.getenv("WS_DEFLATE_WINDOW_BITS", str(compression.DEFAULT_WINDOW_BITS)))
+WS_DEFLATE_MEM_LEVEL = int(os.getenv("WS_DEFLATE_MEM_LEVEL", str(compression.DEFAULT_MEM_LEVEL)))
+
+
+class DeflateWebSocketProtocol(WebSocketProtocol):
+    def __init__(self, config, *args, **kwargs):
+        super().__init__(config, *args, **kwargs)
+        if config.ws_per_message_deflate:
+            self.available_extensions = compression.server_extensions(
+                WS_DEFLATE_LEVEL, WS_DEFLATE_MIN_SIZE, WS_DEFLATE_WINDOW_BITS, WS_DEFLATE_MEM_LEVEL)
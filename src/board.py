@@ -0,0 +1,373 @@
+"""Betting board layout for Ready Set Bet."""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .constants import HORSES, BETTING_GRID, SPECIAL_BETS, MAX_EXOTIC_BETS
+from .log import get_logger
+from .models import Bet, GameState
+
+log = get_logger(__name__)
+
+
+@dataclass
+class BoardSpot:
+    """A spot on the betting board that a token can be placed on."""
+    spot_key: str
+    horse: str
+    bet_type: str
+    multiplier: int
+    penalty: int
+    row: Optional[int] = None
+    col: Optional[int] = None
+    prop_bet_id: Optional[int] = None
+    exotic_finish_id: Optional[int] = None
+
+    def is_exotic(self) -> bool:
+        """Exotic finishes take one bet per player, up to MAX_EXOTIC_BETS players."""
+        return self.exotic_finish_id is not None
+
+    def key_for(self, player: str) -> str:
+        """Get the spot key a bet by this player would lock."""
+        if self.is_exotic():
+            return f"{self.spot_key}_{player}"
+        return self.spot_key
+
+    def make_bet(self, player: str, token_value: int) -> Bet:
+        """Create a bet on this spot."""
+        return Bet(
+            player=player,
+            horse=self.horse,
+            bet_type=self.bet_type,
+            multiplier=self.multiplier,
+            penalty=self.penalty,
+            token_value=token_value,
+            spot_key=self.key_for(player),
+            row=self.row,
+            col=self.col,
+            prop_bet_id=self.prop_bet_id,
+            exotic_finish_id=self.exotic_finish_id
+        )
+
+    def bet_data(self, player: str, token_value: int) -> Dict:
+        """Build the place_bet payload the multiplayer server expects."""
+        data = {
+            "horse": self.horse,
+            "bet_type": self.bet_type,
+            "multiplier": self.multiplier,
+            "penalty": self.penalty,
+            "token_value": token_value,
+            "spot_key": self.key_for(player)
+        }
+        if self.row is not None:
+            data["row"] = self.row
+            data["col"] = self.col
+        if self.prop_bet_id is not None:
+            data["bet_type"] = "prop"
+            data["prop_bet_id"] = self.prop_bet_id
+        if self.exotic_finish_id is not None:
+            data["bet_type"] = "exotic"
+            data["exotic_finish_id"] = self.exotic_finish_id
+        return data
+
+
+def grid_bet_type(col: int) -> str:
+    """Get the bet type for a betting grid column."""
+    return "show" if col < 2 else "place" if col < 4 else "win"
+
+
+def _grid_spots() -> List[BoardSpot]:
+    spots = []
+    for horse_idx, horse in enumerate(HORSES):
+        row = horse_idx + 1  # Grid rows start below the header row
+        for col, (multiplier, penalty) in enumerate(BETTING_GRID[horse_idx]):
+            bet_type = grid_bet_type(col)
+            spots.append(BoardSpot(
+                spot_key=f"{horse}_{bet_type}_{row}_{col}",
+                horse=horse,
+                bet_type=bet_type,
+                multiplier=multiplier,
+                penalty=penalty,
+                row=row,
+                col=col
+            ))
+    return spots
+
+
+def _special_spots() -> List[BoardSpot]:
+    return [
+        BoardSpot(
+            spot_key=f"special_{name}",
+            horse="Special",
+            bet_type=name,
+            multiplier=int(payout.replace("x", "")),
+            penalty=0 if name == "7 Finishes 5th or Worse" else 1
+        )
+        for name, payout, color in SPECIAL_BETS
+    ]
+
+
+GRID_SPOTS = _grid_spots()
+SPECIAL_SPOTS = _special_spots()
+
+
+def prop_spot(prop_bet: Dict) -> BoardSpot:
+    """Get the board spot for a prop bet."""
+    return BoardSpot(
+        spot_key=f"prop_{prop_bet['id']}",
+        horse="Prop",
+        bet_type=prop_bet["description"],
+        multiplier=prop_bet["multiplier"],
+        penalty=prop_bet["penalty"],
+        prop_bet_id=prop_bet["id"]
+    )
+
+
+def exotic_spot(exotic_finish: Dict) -> BoardSpot:
+    """Get the board spot for an exotic finish."""
+    return BoardSpot(
+        spot_key=f"exotic_{exotic_finish['id']}",
+        horse="Exotic",
+        bet_type=exotic_finish["name"],
+        multiplier=exotic_finish["multiplier"],
+        penalty=exotic_finish["penalty"],
+        exotic_finish_id=exotic_finish["id"]
+    )
+
+
+def board_spots(game_state: GameState) -> List[BoardSpot]:
+    """Get every spot on the board for the current race."""
+    return (
+        GRID_SPOTS
+        + SPECIAL_SPOTS
+        + [prop_spot(prop) for prop in game_state.current_prop_bets]
+        + [exotic_spot(exotic) for exotic in game_state.current_exotic_finishes]
+    )
+
+
+def open_spots(game_state: GameState, player: str) -> List[BoardSpot]:
+    """Get the spots a player could still bet on."""
+    bets = game_state.current_bets
+    spots = []
+    for spot in board_spots(game_state):
+        if spot.key_for(player) in bets:
+            continue
+        if spot.is_exotic() and len(bets.on_exotic(spot.exotic_finish_id)) >= MAX_EXOTIC_BETS:
+            continue
+        spots.append(spot)
+    return spots
+
+
+# --- Spot ids and occupancy -------------------------------------------------------
+
+# Owners are packed with token values into one byte per bet on the wire
+MAX_SEATS = 15
+_LAYOUT_CACHE_SIZE = 64
+_layouts: Dict[tuple, "SpotLayout"] = {}
+
+
+class SpotLayout:
+    """Dense integer ids for every spot on the board in one race.
+
+    Ids run over the grid, the special bets, the current prop bets (in the
+    order of current_prop_bets) and MAX_EXOTIC_BETS slots per current exotic
+    finish. Grid and special ids never change between races.
+    """
+    __slots__ = ("spots", "_ids", "_exotic_base")
+
+    def __init__(self, prop_bets: List[Dict], exotic_finishes: List[Dict]):
+        self.spots: List[BoardSpot] = GRID_SPOTS + SPECIAL_SPOTS + [prop_spot(prop) for prop in prop_bets]
+        self._exotic_base: Dict[int, int] = {}
+        for exotic in exotic_finishes:
+            self._exotic_base[exotic["id"]] = len(self.spots)
+            self.spots.extend([exotic_spot(exotic)] * MAX_EXOTIC_BETS)
+        self._ids = {spot.spot_key: spot_id for spot_id, spot in enumerate(self.spots) if not spot.is_exotic()}
+
+    def __len__(self) -> int:
+        return len(self.spots)
+
+    def spot_id(self, spot_key: str) -> Optional[int]:
+        """Id of a grid, special or prop spot."""
+        return self._ids.get(spot_key)
+
+    def exotic_ids(self, exotic_finish_id: int) -> range:
+        """Ids of the bet slots on an exotic finish."""
+        base = self._exotic_base.get(exotic_finish_id)
+        if base is None:
+            return range(0)
+        return range(base, base + MAX_EXOTIC_BETS)
+
+
+def spot_layout(prop_bets: List[Dict], exotic_finishes: List[Dict]) -> SpotLayout:
+    """Get the (cached) layout for a race's prop bets and exotic finishes."""
+    key = (tuple(prop["id"] for prop in prop_bets), tuple(exotic["id"] for exotic in exotic_finishes))
+    layout = _layouts.get(key)
+    if layout is None:
+        if len(_layouts) >= _LAYOUT_CACHE_SIZE:
+            _layouts.clear()
+        layout = _layouts[key] = SpotLayout(prop_bets, exotic_finishes)
+    return layout
+
+
+class Occupancy:
+    """Taken spots as a bitset of spot ids, with each spot's owner seat and token."""
+    __slots__ = ("layout", "bits", "owners", "tokens")
+
+    def __init__(self, layout: SpotLayout):
+        self.layout = layout
+        self.bits = 0
+        # Owner seat + 1 (0 when free) and token value, indexed by spot id
+        self.owners = bytearray(len(layout))
+        self.tokens = bytearray(len(layout))
+
+    def is_free(self, spot_id: int) -> bool:
+        return not (self.bits >> spot_id) & 1
+
+    def take(self, spot_id: int, seat: int, token_value: int):
+        self.bits |= 1 << spot_id
+        self.owners[spot_id] = seat + 1
+        self.tokens[spot_id] = token_value
+
+    def release(self, spot_id: int):
+        self.bits &= ~(1 << spot_id)
+        self.owners[spot_id] = 0
+        self.tokens[spot_id] = 0
+
+    def taken(self) -> List[int]:
+        """Ids of taken spots, in id order."""
+        ids = []
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            ids.append(low.bit_length() - 1)
+            bits ^= low
+        return ids
+
+    def place(self, bet: Bet, seat: int) -> Optional[int]:
+        """Take the spot for a bet; returns its id, or None if it is not free."""
+        if bet.exotic_finish_id is None:
+            spot_id = self.layout.spot_id(bet.spot_key)
+            if spot_id is None or not self.is_free(spot_id):
+                return None
+        else:
+            slots = self.layout.exotic_ids(bet.exotic_finish_id)
+            if any(self.owners[slot] == seat + 1 for slot in slots):
+                return None
+            spot_id = next((slot for slot in slots if self.is_free(slot)), None)
+            if spot_id is None:
+                return None
+        self.take(spot_id, seat, bet.token_value)
+        return spot_id
+
+    def changed(self, other: "Occupancy") -> int:
+        """Bitset of the spot ids whose occupancy differs from another version."""
+        changed = self.bits ^ other.bits
+        both = self.bits & other.bits
+        while both:
+            low = both & -both
+            spot_id = low.bit_length() - 1
+            if self.owners[spot_id] != other.owners[spot_id] or self.tokens[spot_id] != other.tokens[spot_id]:
+                changed |= low
+            both ^= low
+        return changed
+
+    def copy(self) -> "Occupancy":
+        occupancy = Occupancy(self.layout)
+        occupancy.bits = self.bits
+        occupancy.owners[:] = self.owners
+        occupancy.tokens[:] = self.tokens
+        return occupancy
+
+    def bets(self, players: List[str]) -> List[Bet]:
+        """Rebuild the bets; players are indexed by seat."""
+        bets = []
+        for spot_id in self.taken():
+            player = players[self.owners[spot_id] - 1]
+            bets.append(self.layout.spots[spot_id].make_bet(player, self.tokens[spot_id]))
+        return bets
+
+    def encode(self) -> Dict[str, str]:
+        """Wire form: the bitset, then one byte (seat << 4 | token) per taken spot, as hex."""
+        packed = bytes((self.owners[spot_id] - 1) << 4 | self.tokens[spot_id] for spot_id in self.taken())
+        return {"spots": format(self.bits, "x"), "bets": packed.hex()}
+
+    @classmethod
+    def decode(cls, layout: SpotLayout, data: Dict[str, str]) -> "Occupancy":
+        occupancy = cls(layout)
+        occupancy.bits = int(data["spots"], 16)
+        packed = bytes.fromhex(data["bets"])
+        taken = occupancy.taken()
+        if len(packed) != len(taken) or (taken and taken[-1] >= len(layout)):
+            raise ValueError("Board does not match the spot layout")
+        for spot_id, value in zip(taken, packed):
+            occupancy.owners[spot_id] = (value >> 4) + 1
+            occupancy.tokens[spot_id] = value & 0xF
+        return occupancy
+
+    @classmethod
+    def from_bets(cls, layout: SpotLayout, players: List[str], bets: List[Bet]) -> "Occupancy":
+        """Build occupancy from bets; raises ValueError if they do not fit the layout."""
+        if len(players) > MAX_SEATS:
+            raise ValueError(f"More than {MAX_SEATS} players")
+        seats = {player: seat for seat, player in enumerate(players)}
+        occupancy = cls(layout)
+        for bet in bets:
+            seat = seats.get(bet.player)
+            if seat is None or not 0 < bet.token_value <= 0xF or occupancy.place(bet, seat) is None:
+                raise ValueError(f"Bet on {bet.spot_key} does not fit the board")
+        return occupancy
+
+
+def _state_layout(state: Dict) -> SpotLayout:
+    return spot_layout(state["current_prop_bets"], state["current_exotic_finishes"])
+
+
+def _bet_dict(bet: Bet) -> Dict:
+    return {field: getattr(bet, field) for field in Bet._fields}
+
+
+def compact_state(state: Dict) -> Dict:
+    """Replace a state_sync payload's current_bets and locked_spots with a board bitset.
+
+    Seats are positions in state["players"]. Bet fields that differ from the
+    spot's layout (e.g. bet_type "prop" or a penalty sent by the client) are
+    carried in board["fields"] by spot key, so expand_state returns the bets
+    exactly as stored. States the bitset cannot describe are returned unchanged.
+    """
+    if "current_bets" not in state:
+        return state
+    players = [player["name"] for player in state["players"]]
+    bets = [Bet(**bet) for bet in state["current_bets"]]
+    try:
+        occupancy = Occupancy.from_bets(_state_layout(state), players, bets)
+    except ValueError as e:
+        log.debug("State sent without a bitset board: %s", e, extra={"session_id": state.get("session_id")})
+        return state
+    compact = {key: value for key, value in state.items() if key not in ("current_bets", "locked_spots")}
+    compact["board"] = occupancy.encode()
+
+    rebuilt = {bet.spot_key: _bet_dict(bet) for bet in occupancy.bets(players)}
+    fields = {}
+    for bet in bets:
+        expected = rebuilt[bet.spot_key]
+        changed = {field: value for field, value in _bet_dict(bet).items() if expected[field] != value}
+        if changed:
+            fields[bet.spot_key] = changed
+    if fields:
+        compact["board"]["fields"] = fields
+    return compact
+
+
+def expand_state(state: Dict) -> Dict:
+    """Inverse of compact_state: restore current_bets and locked_spots."""
+    if "board" not in state:
+        return state
+    players = [player["name"] for player in state["players"]]
+    occupancy = Occupancy.decode(_state_layout(state), state["board"])
+    fields = state["board"].get("fields", {})
+    expanded = {key: value for key, value in state.items() if key != "board"}
+    expanded["current_bets"] = [
+        {**_bet_dict(bet), **fields.get(bet.spot_key, {})} for bet in occupancy.bets(players)
+    ]
+    expanded["locked_spots"] = {bet["spot_key"]: bet["player"] for bet in expanded["current_bets"]}
+    return expanded
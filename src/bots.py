@@ -0,0 +1,379 @@
+"""
+Bot players for Ready Set Bet.
+
+Bots rank open board spots by expected value and place tokens through
+GameState.place_bet, so they follow the same token rules as human players.
+A NetworkBot drives a NetworkClient headlessly, which doubles as a load
+generator for the multiplayer server:
+
+    python -m src.bots --server ws://localhost:8000 --create --bots 4
+"""
+
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from .board import BoardSpot, GRID_SPOTS, SPECIAL_SPOTS, open_spots, prop_spot, exotic_spot
+from .constants import PROP_BETS, EXOTIC_FINISHES
+from .game_logic import GameLogic
+from .models import Bet, GameState
+from .race_model import simulate_race
+
+TOKEN_VALUES = ["5", "3", "2", "1"]
+
+
+def outcome_key(bet) -> Tuple:
+    """Key identifying what a bet or spot pays out on, independent of its spot."""
+    if bet.prop_bet_id is not None:
+        return ("prop", bet.prop_bet_id)
+    if bet.exotic_finish_id is not None:
+        return ("exotic", bet.exotic_finish_id)
+    return (bet.horse, bet.bet_type)
+
+
+class RaceOdds:
+    """Win probability for every kind of bet, estimated by simulating races."""
+
+    def __init__(self, probabilities: Dict[Tuple, float]):
+        self.probabilities = probabilities
+
+    @classmethod
+    def estimate(cls, samples: int = 4000, seed: Optional[int] = None) -> "RaceOdds":
+        """Estimate odds from simulated races, settled with GameLogic."""
+        rng = random.Random(seed)
+        logic = GameLogic(GameState())
+
+        templates: Dict[Tuple, Bet] = {}
+        spots = GRID_SPOTS + SPECIAL_SPOTS + [prop_spot(p) for p in PROP_BETS] + [exotic_spot(e) for e in EXOTIC_FINISHES]
+        for spot in spots:
+            templates.setdefault(outcome_key(spot), spot.make_bet("", 1))
+
+        wins = {key: 0 for key in templates}
+        for _ in range(samples):
+            results = simulate_race(rng)
+            for key, bet in templates.items():
+                if logic.bet_wins(bet, results):
+                    wins[key] += 1
+
+        return cls({key: count / samples for key, count in wins.items()})
+
+    def probability(self, spot) -> float:
+        """Probability that a bet on this spot pays out."""
+        return self.probabilities.get(outcome_key(spot), 0.0)
+
+
+@lru_cache(maxsize=1)
+def default_odds() -> RaceOdds:
+    """Shared odds table, estimated once per process with a fixed seed."""
+    return RaceOdds.estimate(seed=0)
+
+
+class SpotOption:
+    """A candidate placement: one token on one open spot."""
+
+    __slots__ = ("spot", "token_value", "probability", "expected_value")
+
+    def __init__(self, spot: BoardSpot, token_value: int, probability: float):
+        self.spot = spot
+        self.token_value = token_value
+        self.probability = probability
+        self.expected_value = probability * token_value * spot.multiplier - (1 - probability) * spot.penalty
+
+    @property
+    def variance(self) -> float:
+        win = self.token_value * self.spot.multiplier
+        loss = -self.spot.penalty
+        ev = self.expected_value
+        return self.probability * (win - ev) ** 2 + (1 - self.probability) * (loss - ev) ** 2
+
+
+class Strategy:
+    """Picks the next placement from the available options."""
+    name = "base"
+
+    def choose(self, options: List[SpotOption], rng: random.Random) -> Optional[SpotOption]:
+        raise NotImplementedError
+
+
+class GreedyEVStrategy(Strategy):
+    """Always takes the highest expected value placement, if it is positive."""
+    name = "greedy"
+
+    def choose(self, options: List[SpotOption], rng: random.Random) -> Optional[SpotOption]:
+        best = max(options, key=lambda o: o.expected_value, default=None)
+        if best and best.expected_value > 0:
+            return best
+        return None
+
+
+class RiskAverseStrategy(Strategy):
+    """Trades expected value against variance, so penalties weigh heavily."""
+    name = "risk_averse"
+
+    def __init__(self, risk_aversion: float = 0.5):
+        self.risk_aversion = risk_aversion
+
+    def score(self, option: SpotOption) -> float:
+        return option.expected_value - self.risk_aversion * option.variance ** 0.5
+
+    def choose(self, options: List[SpotOption], rng: random.Random) -> Optional[SpotOption]:
+        best = max(options, key=self.score, default=None)
+        if best and self.score(best) > 0:
+            return best
+        return None
+
+
+class RandomStrategy(Strategy):
+    """Places each token on a random open spot."""
+    name = "random"
+
+    def choose(self, options: List[SpotOption], rng: random.Random) -> Optional[SpotOption]:
+        if not options:
+            return None
+        return rng.choice(options)
+
+
+STRATEGIES = {
+    GreedyEVStrategy.name: GreedyEVStrategy,
+    RiskAverseStrategy.name: RiskAverseStrategy,
+    RandomStrategy.name: RandomStrategy
+}
+
+
+def make_strategy(name: str) -> Strategy:
+    """Create a strategy by name."""
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {name} (choose from {', '.join(STRATEGIES)})")
+    return STRATEGIES[name]()
+
+
+class Bot:
+    """A computer player that places one token per turn."""
+
+    def __init__(self, name: str, strategy: Strategy, odds: Optional[RaceOdds] = None,
+                 rng: Optional[random.Random] = None):
+        self.name = name
+        self.strategy = strategy
+        self.odds = odds or default_odds()
+        self.rng = rng or random.Random()
+        self._probabilities: Dict[str, float] = {}
+
+    def options(self, game_state: GameState) -> List[SpotOption]:
+        """Every placement this bot could make right now."""
+        player = game_state.players.get(self.name)
+        if not player:
+            return []
+
+        tokens = [int(value) for value in TOKEN_VALUES if player.get_available_tokens(value) > 0]
+        if not tokens:
+            return []
+
+        probabilities = self._probabilities
+        options = []
+        for spot in open_spots(game_state, self.name):
+            probability = probabilities.get(spot.spot_key)
+            if probability is None:
+                probability = probabilities[spot.spot_key] = self.odds.probability(spot)
+            for token_value in tokens:
+                options.append(SpotOption(spot, token_value, probability))
+        return options
+
+    def next_bet(self, game_state: GameState) -> Optional[Bet]:
+        """Choose the next bet, or None when the bot is done for this race."""
+        if not game_state.race_active:
+            return None
+
+        option = self.strategy.choose(self.options(game_state), self.rng)
+        if not option:
+            return None
+        return option.spot.make_bet(self.name, option.token_value)
+
+    def take_turn(self, game_state: GameState) -> Optional[Bet]:
+        """Place the next bet on the local game state. Returns the bet if placed."""
+        bet = self.next_bet(game_state)
+        if bet and game_state.place_bet(bet):
+            return bet
+        return None
+
+    def play_race(self, game_state: GameState) -> List[Bet]:
+        """Place bets until the strategy passes or tokens run out."""
+        placed = []
+        while True:
+            bet = self.take_turn(game_state)
+            if not bet:
+                return placed
+            placed.append(bet)
+
+
+def take_turns(bots: List[Bot], game_state: GameState) -> List[Bet]:
+    """Let bots take turns placing one bet each until none of them bets."""
+    placed = []
+    active = list(bots)
+    while active:
+        for bot in list(active):
+            bet = bot.take_turn(game_state)
+            if bet:
+                placed.append(bet)
+            else:
+                active.remove(bot)
+    return placed
+
+
+class NetworkBot:
+    """
+    Drives a NetworkClient with a Bot, without any UI.
+    A hosting bot also starts, settles and advances races with simulated results.
+    """
+
+    def __init__(self, bot: Bot, client, is_host: bool = False,
+                 think_time: Tuple[float, float] = (0.2, 1.0), betting_time: float = 5.0):
+        self.bot = bot
+        self.client = client
+        self.is_host = is_host
+        self.think_time = think_time
+        self.betting_time = betting_time
+        self.game_state = GameState()
+        self.finished = threading.Event()
+        self._waiting = False
+        self._turn_scheduled = False
+        self._started_races = set()
+        self._ended_races = set()
+
+        client.register_callback("connected", self._on_connected)
+        client.register_callback("connection_state", self._on_connection_state)
+        client.register_callback("state_sync", self._on_state_sync)
+        client.register_callback("error", self._on_error)
+        client.register_callback("betting_closed", self._on_betting_closed)
+        client.register_callback("race_ended", self._on_race_ended)
+        client.register_callback("game_completed", self._on_game_completed)
+
+    def _later(self, delay: float, callback, *args):
+        self.client.loop.call_later(delay, callback, *args)
+
+    def _think(self) -> float:
+        return self.bot.rng.uniform(*self.think_time)
+
+    def _on_connected(self):
+        self.client.request_state()
+
+    def _on_connection_state(self, state: str):
+        # Dropped connections are retried by the client; stop once it gives up
+        if state == "closed":
+            self.finished.set()
+
+    def _on_state_sync(self, message: dict):
+        self.game_state.load_server_state(message["data"])
+        self._waiting = False
+
+        race = self.game_state.current_race
+        if self.game_state.status in ("completed", "expired"):
+            self.finished.set()
+            return
+
+        if self.game_state.race_active:
+            self._schedule_turn()
+            if self.is_host and race not in self._ended_races:
+                self._ended_races.add(race)
+                self._later(self.betting_time, self._end_race)
+        elif self.is_host and race not in self._started_races:
+            self._started_races.add(race)
+            self._later(self._think(), self.client.start_race)
+
+    def _on_error(self, message: dict):
+        # Refused bets come back as errors; only try again while betting is open
+        self._waiting = False
+        self._schedule_turn()
+
+    def _on_betting_closed(self, message: dict):
+        self.game_state.betting_open = False
+
+    def _can_bet(self) -> bool:
+        return self.game_state.race_active and self.game_state.betting_open
+
+    def _schedule_turn(self):
+        if not self._turn_scheduled and self._can_bet():
+            self._turn_scheduled = True
+            self._later(self._think(), self._place_next)
+
+    def _place_next(self):
+        self._turn_scheduled = False
+        if self._waiting or not self._can_bet():
+            return
+
+        option = self.bot.strategy.choose(self.bot.options(self.game_state), self.bot.rng)
+        if not option:
+            return
+
+        self._waiting = True
+        self.client.place_bet(option.spot.bet_data(self.bot.name, option.token_value))
+
+    def _end_race(self):
+        results = simulate_race(self.bot.rng, self.game_state.current_prop_bets,
+                                self.game_state.current_exotic_finishes)
+        self.client.end_race({
+            "win_horses": results.win_horses,
+            "place_horses": results.place_horses,
+            "show_horses": results.show_horses,
+            "prop_bet_results": results.prop_bet_results,
+            "exotic_finish_results": results.exotic_finish_results
+        })
+
+    def _on_race_ended(self, message: dict):
+        if self.is_host:
+            self._later(self._think(), self.client.next_race)
+
+    def _on_game_completed(self, message: dict):
+        self.finished.set()
+
+
+def main():
+    """Run headless network bots against a server."""
+    import argparse
+    from .log import configure as configure_logging
+    from .network_client import NetworkClient
+
+    parser = argparse.ArgumentParser(description="Run Ready Set Bet bots against a server")
+    parser.add_argument("--server", default="ws://localhost:8000")
+    parser.add_argument("--session", help="Session code to join")
+    parser.add_argument("--create", action="store_true", help="Create a session hosted by the first bot")
+    parser.add_argument("--bots", type=int, default=3)
+    parser.add_argument("--strategy", default="greedy", choices=sorted(STRATEGIES))
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--betting-time", type=float, default=5.0)
+    args = parser.parse_args()
+    configure_logging()
+
+    session_id = args.session
+    if args.create:
+        session_id = NetworkClient(args.server).create_session()
+    if not session_id:
+        parser.error("Pass --session or --create")
+
+    print(f"Session {session_id}: starting {args.bots} {args.strategy} bots")
+    rng = random.Random(args.seed)
+    network_bots = []
+    for i in range(args.bots):
+        client = NetworkClient(args.server)
+        name = f"Bot{i + 1}"
+        if not client.join_session(session_id, name):
+            print(f"{name} could not join session {session_id}")
+            continue
+        bot = Bot(name, make_strategy(args.strategy), rng=random.Random(rng.random()))
+        network_bots.append(NetworkBot(bot, client, is_host=args.create and i == 0,
+                                       betting_time=args.betting_time))
+        client.start_connection()
+
+    try:
+        while not all(nb.finished.is_set() for nb in network_bots):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for nb in network_bots:
+            nb.client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+permessage-deflate (RFC 7692) settings shared by the server and NetworkClient
+state_sync payloads repeat the same keys for every bet and player and
+change little between messages, so they compress well, especially when the
+window keeps the previous message (context takeover). Small messages are
+sent uncompressed: RFC 7692 lets a sender leave any message uncompressed,
+so peers with stock permessage-deflate read them as usual.
+
+Each connection keeps a compressor of about 2**(window_bits + 2) +
+2**(mem_level + 9) bytes and a decompressor of 2**window_bits bytes.
+"""
+from typing import List
+
+from websockets import frames
+from websockets.extensions.permessage_deflate import (
+    ClientPerMessageDeflateFactory, PerMessageDeflate, ServerPerMessageDeflateFactory
+)
+
+# Defaults chosen with benchmarks/compression.py (0 level disables compression)
+DEFAULT_LEVEL = 3
+DEFAULT_MIN_SIZE = 512
+DEFAULT_WINDOW_BITS = 15
+DEFAULT_MEM_LEVEL = 5
+
+_DATA_OPCODES = (frames.OP_TEXT, frames.OP_BINARY)
+
+
+class ThresholdDeflate(PerMessageDeflate):
+    """PerMessageDeflate that leaves messages under min_size uncompressed"""
+
+    def __init__(self, *args, min_size: int = DEFAULT_MIN_SIZE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+
+    @classmethod
+    def from_extension(cls, extension: PerMessageDeflate, min_size: int) -> "ThresholdDeflate":
+        return cls(extension.remote_no_context_takeover, extension.local_no_context_takeover,
+                   extension.remote_max_window_bits, extension.local_max_window_bits,
+                   extension.compress_settings, min_size=min_size)
+
+    def encode(self, frame: frames.Frame) -> frames.Frame:
+        # Only whole messages: continuation frames follow their first frame
+        if frame.fin and frame.opcode in _DATA_OPCODES and len(frame.data) < self.min_size:
+            return frame
+        return super().encode(frame)
+
+
+class ServerDeflateFactory(ServerPerMessageDeflateFactory):
+    def __init__(self, min_size: int = DEFAULT_MIN_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.min_size = min_size
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        return response_params, ThresholdDeflate.from_extension(extension, self.min_size)
+
+
+class ClientDeflateFactory(ClientPerMessageDeflateFactory):
+    def __init__(self, min_size: int = DEFAULT_MIN_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.min_size = min_size
+
+    def process_response_params(self, params, accepted_extensions):
+        extension = super().process_response_params(params, accepted_extensions)
+        return ThresholdDeflate.from_extension(extension, self.min_size)
+
+
+def _compress_settings(level: int, mem_level: int) -> dict:
+    return {"level": level, "memLevel": mem_level}
+
+
+def server_extensions(level: int = DEFAULT_LEVEL, min_size: int = DEFAULT_MIN_SIZE,
+                      window_bits: int = DEFAULT_WINDOW_BITS, mem_level: int = DEFAULT_MEM_LEVEL) -> List:
+    """Extension factories for a websockets server"""
+    if level == 0:
+        return []
+    return [ServerDeflateFactory(min_size, server_max_window_bits=window_bits,
+                                 compress_settings=_compress_settings(level, mem_level))]
+
+
+def client_extensions(level: int = DEFAULT_LEVEL, min_size: int = DEFAULT_MIN_SIZE,
+                      window_bits: int = DEFAULT_WINDOW_BITS, mem_level: int = DEFAULT_MEM_LEVEL) -> List:
+    """Extension factories for websockets.connect (pass with compression=None)"""
+    if level == 0:
+        return []
+    return [ClientDeflateFactory(min_size, client_max_window_bits=window_bits,
+                                 compress_settings=_compress_settings(level, mem_level))]
@@ -26,6 +26,28 @@ PLAYER_TOKENS = {
 # Horse configuration
 HORSES = ["2/3", "4", "5", "6", "7", "8", "9", "10", "11/12"]
 
+# Race simulation - which 2d6 totals move each horse. Every roll moves the
+# horse one space (see src.race_model). Used by bots and the balance
+# simulator; the physical game is still settled by hand.
+HORSE_ROLLS = {
+    "2/3": (2, 3),
+    "4": (4,),
+    "5": (5,),
+    "6": (6,),
+    "7": (7,),
+    "8": (8,),
+    "9": (9,),
+    "10": (10,),
+    "11/12": (11, 12)
+}
+TRACK_LENGTH = 15
+
+# Maximum number of players betting on one exotic finish
+MAX_EXOTIC_BETS = 3
+
+# Delay between bot bets in single player mode (milliseconds)
+BOT_TURN_DELAY_MS = 1500
+
 # UI Theme Colors - Centralized color management
 class Theme:
     # Main colors
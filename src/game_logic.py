@@ -1,6 +1,6 @@
 """Game logic and business rules for Ready Set Bet."""
 
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from .models import GameState, Player, Bet, RaceResults
 from .constants import VIP_CARDS, PROP_BETS
 import random
@@ -9,8 +9,9 @@ import random
 class GameLogic:
     """Handles the core game logic and business rules."""
 
-    def __init__(self, game_state: GameState):
+    def __init__(self, game_state: GameState, rng: Optional[random.Random] = None):
         self.game_state = game_state
+        self.rng = rng or random
 
     def process_race_results(self, win_horses: List[str], place_horses: List[str], show_horses: List[str],
                              prop_results: Dict[int, bool], exotic_results: Dict[int, bool]) -> Tuple[
@@ -23,16 +24,7 @@ class GameLogic:
 
         for bet in self.game_state.current_bets.values():
             player = self.game_state.players[bet.player]
-
-            if bet.is_prop_bet():
-                # Handle prop bet
-                won = self._is_winning_prop_bet(bet, prop_results)
-            elif bet.is_exotic_bet():
-                # Handle exotic finish bet
-                won = self._is_winning_exotic_bet(bet, exotic_results)
-            else:
-                # Handle standard and special bets
-                won = self._is_winning_bet(bet, win_horses, place_horses, show_horses)
+            won = self.bet_wins(bet, self.game_state.race_results)
 
             if won:
                 payout = bet.potential_payout
@@ -50,6 +42,17 @@ class GameLogic:
 
         return winners, losers
 
+    def bet_wins(self, bet: Bet, results: RaceResults) -> bool:
+        """Check whether a bet pays out for the given race results."""
+        if bet.is_prop_bet():
+            # Handle prop bet
+            return self._is_winning_prop_bet(bet, results.prop_bet_results)
+        elif bet.is_exotic_bet():
+            # Handle exotic finish bet
+            return self._is_winning_exotic_bet(bet, results.exotic_finish_results)
+        # Handle standard and special bets
+        return self._is_winning_bet(bet, results)
+
     def _get_bet_description(self, bet: Bet) -> str:
         """Get a description of the bet for display purposes."""
         if bet.is_prop_bet():
@@ -70,10 +73,13 @@ class GameLogic:
         """Check if an exotic finish bet is a winning bet based on manual results."""
         return exotic_results.get(bet.exotic_finish_id, False)
 
-    def _is_winning_bet(self, bet: Bet, win_horses: List[str], place_horses: List[str], show_horses: List[str]) -> bool:
+    def _is_winning_bet(self, bet: Bet, results: RaceResults) -> bool:
         """Check if a bet is a winning bet."""
         if bet.bet_type in ["win", "place", "show"]:
-            return self.game_state.race_results.is_winner(bet.horse, bet.bet_type)
+            return results.is_winner(bet.horse, bet.bet_type)
+
+        win_horses = results.win_horses
+        show_horses = results.show_horses
 
         # Special bets
         if bet.bet_type == "Blue Wins":
@@ -94,7 +100,7 @@ class GameLogic:
         """Distribute VIP cards to players."""
         for player in self.game_state.players.values():
             if len(player.vip_cards) < 4:  # Max 4 VIP cards
-                card = random.choice(VIP_CARDS)
+                card = self.rng.choice(VIP_CARDS)
                 player.vip_cards.append(card)
 
     def get_final_standings(self) -> List[Tuple[str, int]]:
@@ -0,0 +1,183 @@
+"""
+Structured logging for Ready Set Bet (server and clients)
+Loggers hand records to a QueueHandler, so the event loop and the Tk thread
+never wait on stream or file I/O; a QueueListener thread formats and writes
+them. Output is one JSON object per line by default. Repeated records from
+the same call site are rate limited, and the next record let through reports
+how many were suppressed.
+
+Configured from the environment by configure():
+
+    LOG_LEVEL=INFO
+    LOG_LEVELS=server.websocket_manager=DEBUG,src.network_client=WARNING
+    LOG_FORMAT=json            # or text
+    LOG_FILE=                  # also append to this file
+    LOG_RATE_LIMIT=10          # records per call site per window, 0 disables
+    LOG_RATE_WINDOW=60         # seconds
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a module; pass __name__"""
+    return logging.getLogger(name)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including fields passed via extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with extra fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(f"{key}={value}" for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        return f"{line} {fields}" if fields else line
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `limit` records per call site through per window
+    Call sites are keyed by logger and unformatted message, so log with
+    %-style arguments rather than f-strings for this to group records.
+    """
+
+    MAX_SITES = 1000
+
+    def __init__(self, limit: int = 10, window: float = 60.0):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        # key -> [window start, count in window, suppressed]
+        self._sites: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                if site is None and len(self._sites) >= self.MAX_SITES:
+                    self._sites.clear()
+                suppressed = site[2] if site else 0
+                self._sites[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if site[1] < self.limit:
+                site[1] += 1
+                return True
+            site[2] += 1
+            return False
+
+
+class _QueueHandler(QueueHandler):
+    """QueueHandler that keeps extra fields and the traceback separate from the message"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def queued(logger: logging.Logger, *handlers: logging.Handler) -> Tuple[QueueHandler, QueueListener]:
+    """Send a logger's records to handlers through a background writer thread"""
+    records = queue.SimpleQueue()
+    queue_handler = _QueueHandler(records)
+    logger.addHandler(queue_handler)
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return queue_handler, listener
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Parse 'module=LEVEL,module=LEVEL' into a dict"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure(level: Optional[str] = None, levels: Optional[Dict[str, str]] = None,
+              fmt: Optional[str] = None, log_file: Optional[str] = None,
+              rate_limit: Optional[int] = None, rate_window: Optional[float] = None):
+    """
+    Route all logging through a background writer thread
+    Arguments override the LOG_* environment variables. Safe to call more
+    than once; later calls only adjust levels.
+    """
+    global _listener
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    levels = levels if levels is not None else parse_levels(os.getenv("LOG_LEVELS", ""))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    with _lock:
+        if _listener is not None:
+            return
+
+        fmt = fmt or os.getenv("LOG_FORMAT", "json")
+        formatter = JsonFormatter() if fmt == "json" else TextFormatter()
+        handlers = [logging.StreamHandler(sys.stderr)]
+        log_file = log_file if log_file is not None else os.getenv("LOG_FILE", "")
+        if log_file:
+            handlers.append(logging.FileHandler(log_file, encoding="utf-8"))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        queue_handler, _listener = queued(root, *handlers)
+        queue_handler.addFilter(RateLimitFilter(
+            rate_limit if rate_limit is not None else int(os.getenv("LOG_RATE_LIMIT", "10")),
+            rate_window if rate_window is not None else float(os.getenv("LOG_RATE_WINDOW", "60"))
+        ))
@@ -1,38 +1,129 @@
-"""Data models for the Ready Set Bet application."""
+"""Data models for the Ready Set Bet application.
 
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+The models use __slots__ rather than per-instance dicts: a game state is
+rebuilt from every server update and the server builds one for each race
+result, so they are kept small. Token counts live in one small int array per
+player, indexed by denomination, behind dict-like views.
+"""
+
+from array import array
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterable, List, Optional, Tuple
 from .constants import PLAYER_TOKENS, STARTING_MONEY, PROP_BETS, EXOTIC_FINISHES
 import random
 
-@dataclass
-class Player:
+# Token denominations, in the order they are stored
+DENOMINATIONS = ("5", "3", "2", "1")
+_INDEX = {value: index for index, value in enumerate(DENOMINATIONS)}
+_USED = len(DENOMINATIONS)
+
+
+class _Record:
+    """Dataclass-style __repr__ and __eq__ over _fields."""
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self._fields)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._values() == other._values()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+
+class TokenCounts(Mapping):
+    """Dict-like view of a player's token counts, keyed by denomination."""
+    __slots__ = ("_counts", "_offset")
+
+    def __init__(self, counts: array, offset: int):
+        self._counts = counts
+        self._offset = offset
+
+    def __getitem__(self, token_value: str) -> int:
+        return self._counts[self._offset + _INDEX[token_value]]
+
+    def __setitem__(self, token_value: str, count: int):
+        self._counts[self._offset + _INDEX[token_value]] = count
+
+    def __iter__(self):
+        return iter(DENOMINATIONS)
+
+    def __len__(self) -> int:
+        return len(DENOMINATIONS)
+
+    def copy(self) -> Dict[str, int]:
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class Player(_Record):
     """Represents a player in the game."""
-    name: str
-    money: int = STARTING_MONEY
-    vip_cards: List[Dict] = field(default_factory=list)
-    tokens: Dict[str, int] = field(default_factory=lambda: PLAYER_TOKENS.copy())
-    used_tokens: Dict[str, int] = field(default_factory=lambda: {"5": 0, "3": 0, "2": 0, "1": 0})
+    __slots__ = ("name", "money", "vip_cards", "_counts")
+    _fields = ("name", "money", "vip_cards", "tokens", "used_tokens")
+
+    def __init__(self, name: str, money: int = STARTING_MONEY, vip_cards: Optional[List[Dict]] = None,
+                 tokens: Optional[Dict[str, int]] = None, used_tokens: Optional[Dict[str, int]] = None):
+        self.name = name
+        self.money = money
+        self.vip_cards = vip_cards if vip_cards is not None else []
+        # Owned tokens followed by used tokens, one entry per denomination
+        self._counts = array("B", bytes(2 * _USED))
+        self.tokens = tokens if tokens is not None else PLAYER_TOKENS
+        if used_tokens is not None:
+            self.used_tokens = used_tokens
+
+    @property
+    def tokens(self) -> TokenCounts:
+        return TokenCounts(self._counts, 0)
+
+    @tokens.setter
+    def tokens(self, tokens: Dict[str, int]):
+        self._set_counts(0, tokens)
+
+    @property
+    def used_tokens(self) -> TokenCounts:
+        return TokenCounts(self._counts, _USED)
+
+    @used_tokens.setter
+    def used_tokens(self, used_tokens: Dict[str, int]):
+        self._set_counts(_USED, used_tokens)
+
+    def _set_counts(self, offset: int, counts: Dict[str, int]):
+        for index, value in enumerate(DENOMINATIONS):
+            self._counts[offset + index] = counts.get(value, 0)
 
     def reset_tokens(self):
         """Reset all tokens for a new round."""
-        self.used_tokens = {"5": 0, "3": 0, "2": 0, "1": 0}
+        for index in range(_USED, 2 * _USED):
+            self._counts[index] = 0
 
     def get_available_tokens(self, token_value: str) -> int:
         """Get the number of available tokens of a specific value."""
-        return self.tokens[token_value] - self.used_tokens[token_value]
+        index = _INDEX[token_value]
+        return self._counts[index] - self._counts[_USED + index]
 
     def use_token(self, token_value: str) -> bool:
         """Use a token if available. Returns True if successful."""
-        if self.get_available_tokens(token_value) > 0:
-            self.used_tokens[token_value] += 1
+        index = _INDEX[token_value]
+        if self._counts[index] > self._counts[_USED + index]:
+            self._counts[_USED + index] += 1
             return True
         return False
 
     def return_token(self, token_value: str):
         """Return a token to the available pool."""
-        if self.used_tokens[token_value] > 0:
-            self.used_tokens[token_value] -= 1
+        index = _USED + _INDEX[token_value]
+        if self._counts[index] > 0:
+            self._counts[index] -= 1
 
     def add_money(self, amount: int):
         """Add money to the player."""
@@ -42,20 +133,26 @@ class Player:
         """Subtract money from the player, minimum 0."""
         self.money = max(0, self.money - amount)
 
-@dataclass
-class Bet:
+
+class Bet(_Record):
     """Represents a bet placed by a player."""
-    player: str
-    horse: str
-    bet_type: str
-    multiplier: int
-    penalty: int
-    token_value: int
-    spot_key: str
-    row: Optional[int] = None
-    col: Optional[int] = None
-    prop_bet_id: Optional[int] = None
-    exotic_finish_id: Optional[int] = None
+    __slots__ = _fields = ("player", "horse", "bet_type", "multiplier", "penalty", "token_value", "spot_key",
+                           "row", "col", "prop_bet_id", "exotic_finish_id")
+
+    def __init__(self, player: str, horse: str, bet_type: str, multiplier: int, penalty: int,
+                 token_value: int, spot_key: str, row: Optional[int] = None, col: Optional[int] = None,
+                 prop_bet_id: Optional[int] = None, exotic_finish_id: Optional[int] = None):
+        self.player = player
+        self.horse = horse
+        self.bet_type = bet_type
+        self.multiplier = multiplier
+        self.penalty = penalty
+        self.token_value = token_value
+        self.spot_key = spot_key
+        self.row = row
+        self.col = col
+        self.prop_bet_id = prop_bet_id
+        self.exotic_finish_id = exotic_finish_id
 
     @property
     def potential_payout(self) -> int:
@@ -79,14 +176,20 @@ class Bet:
         """Check if this is an exotic finish bet."""
         return self.exotic_finish_id is not None
 
-@dataclass
-class RaceResults:
+
+class RaceResults(_Record):
     """Represents the results of a race."""
-    win_horses: List[str]
-    place_horses: List[str]
-    show_horses: List[str]
-    prop_bet_results: Dict[int, bool] = field(default_factory=dict)
-    exotic_finish_results: Dict[int, bool] = field(default_factory=dict)
+    __slots__ = _fields = ("win_horses", "place_horses", "show_horses", "prop_bet_results",
+                           "exotic_finish_results")
+
+    def __init__(self, win_horses: List[str], place_horses: List[str], show_horses: List[str],
+                 prop_bet_results: Optional[Dict[int, bool]] = None,
+                 exotic_finish_results: Optional[Dict[int, bool]] = None):
+        self.win_horses = win_horses
+        self.place_horses = place_horses
+        self.show_horses = show_horses
+        self.prop_bet_results = prop_bet_results if prop_bet_results is not None else {}
+        self.exotic_finish_results = exotic_finish_results if exotic_finish_results is not None else {}
 
     def is_winner(self, horse: str, bet_type: str) -> bool:
         """Check if a horse won for a specific bet type."""
@@ -98,21 +201,156 @@ class RaceResults:
             return horse in self.show_horses
         return False
 
-@dataclass
-class GameState:
+
+class BetStore(MutableMapping):
+    """Current bets keyed by spot, with indexes by player and exotic finish.
+
+    Each spot holds at most one bet; exotic finish spot keys include the
+    player, so several players can bet on the same finish. Iterating gives
+    spot keys, like the dict it replaces. Token accounting is GameState's
+    job; use its place_bet/remove_bet so spots and tokens stay consistent.
+    """
+    __slots__ = ("_bets", "_by_player", "_by_exotic")
+
+    def __init__(self, bets: Iterable[Bet] = ()):
+        self._bets: Dict[str, Bet] = {}
+        self._by_player: Dict[str, Dict[str, Bet]] = {}
+        self._by_exotic: Dict[int, Dict[str, Bet]] = {}
+        for bet in bets:
+            self.add(bet)
+
+    def __getitem__(self, spot_key: str) -> Bet:
+        return self._bets[spot_key]
+
+    def __iter__(self):
+        return iter(self._bets)
+
+    def __len__(self) -> int:
+        return len(self._bets)
+
+    def __contains__(self, spot_key) -> bool:
+        return spot_key in self._bets
+
+    def get(self, spot_key: str, default=None) -> Optional[Bet]:
+        return self._bets.get(spot_key, default)
+
+    def __repr__(self) -> str:
+        return f"BetStore({list(self._bets.values())!r})"
+
+    def __setitem__(self, spot_key: str, bet: Bet):
+        self.remove(spot_key)
+        self._insert(spot_key, bet)
+
+    def _insert(self, spot_key: str, bet: Bet):
+        self._bets[spot_key] = bet
+        self._by_player.setdefault(bet.player, {})[spot_key] = bet
+        if bet.exotic_finish_id is not None:
+            self._by_exotic.setdefault(bet.exotic_finish_id, {})[spot_key] = bet
+
+    def __delitem__(self, spot_key: str):
+        if self.remove(spot_key) is None:
+            raise KeyError(spot_key)
+
+    def add(self, bet: Bet) -> bool:
+        """Add a bet. Returns False if its spot is already taken."""
+        if bet.spot_key in self._bets:
+            return False
+        self._insert(bet.spot_key, bet)
+        return True
+
+    def remove(self, spot_key: str) -> Optional[Bet]:
+        """Remove and return the bet on a spot, if any."""
+        bet = self._bets.pop(spot_key, None)
+        if bet is None:
+            return None
+        player_bets = self._by_player[bet.player]
+        del player_bets[spot_key]
+        if not player_bets:
+            del self._by_player[bet.player]
+        if bet.exotic_finish_id is not None:
+            exotic_bets = self._by_exotic[bet.exotic_finish_id]
+            del exotic_bets[spot_key]
+            if not exotic_bets:
+                del self._by_exotic[bet.exotic_finish_id]
+        return bet
+
+    def clear(self):
+        self._bets.clear()
+        self._by_player.clear()
+        self._by_exotic.clear()
+
+    def owner(self, spot_key: str) -> Optional[str]:
+        """Name of the player whose bet holds a spot."""
+        bet = self._bets.get(spot_key)
+        return bet.player if bet else None
+
+    def for_player(self, player: str) -> List[Bet]:
+        """A player's bets, in the order they were placed."""
+        return list(self._by_player.get(player, {}).values())
+
+    def on_exotic(self, exotic_finish_id: int) -> List[Bet]:
+        """Bets on an exotic finish, in the order they were placed."""
+        return list(self._by_exotic.get(exotic_finish_id, {}).values())
+
+
+class LockedSpots(Mapping):
+    """Read-only view of a BetStore as spot key -> player name."""
+    __slots__ = ("_bets",)
+
+    def __init__(self, bets: BetStore):
+        self._bets = bets
+
+    def __getitem__(self, spot_key: str) -> str:
+        return self._bets[spot_key].player
+
+    def __iter__(self):
+        return iter(self._bets)
+
+    def __len__(self) -> int:
+        return len(self._bets)
+
+    def __contains__(self, spot_key) -> bool:
+        return spot_key in self._bets
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class GameState(_Record):
     """Represents the current state of the game."""
-    current_race: int = 1
-    max_races: int = 4
-    race_active: bool = False
-    players: Dict[str, Player] = field(default_factory=dict)
-    current_bets: Dict[str, Bet] = field(default_factory=dict)
-    locked_spots: Dict[str, str] = field(default_factory=dict)
-    race_results: Optional[RaceResults] = None
-    game_log: List[str] = field(default_factory=list)
-    used_prop_bets: List[int] = field(default_factory=list)
-    current_prop_bets: List[Dict] = field(default_factory=list)
-    used_exotic_finishes: List[int] = field(default_factory=list)
-    current_exotic_finishes: List[Dict] = field(default_factory=list)
+    __slots__ = _fields = ("current_race", "max_races", "race_active", "status", "players", "current_bets",
+                           "race_results", "game_log", "used_prop_bets", "current_prop_bets",
+                           "used_exotic_finishes", "current_exotic_finishes", "betting_open",
+                           "betting_closes_at")
+
+    def __init__(self, current_race: int = 1, max_races: int = 4, race_active: bool = False,
+                 status: str = "waiting", players: Optional[Dict[str, Player]] = None,
+                 current_bets: Optional[Iterable[Bet]] = None,
+                 race_results: Optional[RaceResults] = None, game_log: Optional[List[str]] = None,
+                 used_prop_bets: Optional[List[int]] = None, current_prop_bets: Optional[List[Dict]] = None,
+                 used_exotic_finishes: Optional[List[int]] = None,
+                 current_exotic_finishes: Optional[List[Dict]] = None, betting_open: bool = True,
+                 betting_closes_at: Optional[float] = None):
+        self.current_race = current_race
+        self.max_races = max_races
+        self.race_active = race_active
+        self.status = status
+        self.players = players if players is not None else {}
+        self.current_bets = current_bets if isinstance(current_bets, BetStore) else BetStore(current_bets or ())
+        self.race_results = race_results
+        self.game_log = game_log if game_log is not None else []
+        self.used_prop_bets = used_prop_bets if used_prop_bets is not None else []
+        self.current_prop_bets = current_prop_bets if current_prop_bets is not None else []
+        self.used_exotic_finishes = used_exotic_finishes if used_exotic_finishes is not None else []
+        self.current_exotic_finishes = current_exotic_finishes if current_exotic_finishes is not None else []
+        # Multiplayer betting window (Unix time it closes; None when untimed)
+        self.betting_open = betting_open
+        self.betting_closes_at = betting_closes_at
+
+    @property
+    def locked_spots(self) -> LockedSpots:
+        """Taken spots as spot key -> player name."""
+        return LockedSpots(self.current_bets)
 
     def add_player(self, name: str) -> bool:
         """Add a new player. Returns True if successful."""
@@ -123,38 +361,28 @@ class GameState:
 
     def place_bet(self, bet: Bet) -> bool:
         """Place a bet. Returns True if successful."""
-        if not self.race_active:
+        if not self.race_active or not self.betting_open:
             return False
 
-        if bet.spot_key in self.locked_spots:
+        if bet.spot_key in self.current_bets:
             return False
 
         player = self.players[bet.player]
         if not player.use_token(str(bet.token_value)):
             return False
 
-        bet_id = f"{bet.player}_{bet.horse}_{bet.bet_type}_{bet.token_value}_{len(self.current_bets)}"
-        self.current_bets[bet_id] = bet
-        self.locked_spots[bet.spot_key] = bet.player
+        self.current_bets.add(bet)
         return True
 
-    def remove_bet(self, bet_id: str) -> bool:
-        """Remove a bet. Returns True if successful."""
-        if bet_id not in self.current_bets:
+    def remove_bet(self, spot_key: str) -> bool:
+        """Remove the bet on a spot and return its token. Returns True if successful."""
+        bet = self.current_bets.remove(spot_key)
+        if bet is None:
             return False
 
-        bet = self.current_bets[bet_id]
-        player = self.players[bet.player]
-
-        # Return token
-        player.return_token(str(bet.token_value))
-
-        # Unlock spot
-        if bet.spot_key in self.locked_spots:
-            del self.locked_spots[bet.spot_key]
-
-        # Remove bet
-        del self.current_bets[bet_id]
+        player = self.players.get(bet.player)
+        if player:
+            player.return_token(str(bet.token_value))
         return True
 
     def clear_all_bets(self):
@@ -164,10 +392,10 @@ class GameState:
             player.return_token(str(bet.token_value))
 
         self.current_bets.clear()
-        self.locked_spots.clear()
 
-    def generate_prop_bets_for_race(self):
+    def generate_prop_bets_for_race(self, rng: Optional[random.Random] = None):
         """Generate 5 random prop bets for the current race, excluding used ones."""
+        rng = rng or random
         available_props = [prop for prop in PROP_BETS if prop["id"] not in self.used_prop_bets]
 
         if len(available_props) < 5:
@@ -175,7 +403,7 @@ class GameState:
             self.used_prop_bets.clear()
             available_props = PROP_BETS.copy()
 
-        selected_props = random.sample(available_props, min(5, len(available_props)))
+        selected_props = rng.sample(available_props, min(5, len(available_props)))
         self.current_prop_bets = selected_props.copy()
 
         # Mark these prop bets as used
@@ -183,8 +411,9 @@ class GameState:
             if prop["id"] not in self.used_prop_bets:
                 self.used_prop_bets.append(prop["id"])
 
-    def generate_exotic_finish_for_race(self):
+    def generate_exotic_finish_for_race(self, rng: Optional[random.Random] = None):
         """Generate 1 random exotic finish for the current race, excluding used ones."""
+        rng = rng or random
         # Don't add exotic finishes beyond the final race (race 4)
         if self.current_race > self.max_races:
             return
@@ -192,16 +421,15 @@ class GameState:
         available_exotics = [exotic for exotic in EXOTIC_FINISHES if exotic["id"] not in self.used_exotic_finishes]
 
         if available_exotics:
-            selected_exotic = random.choice(available_exotics)
+            selected_exotic = rng.choice(available_exotics)
             self.current_exotic_finishes.append(selected_exotic)
             self.used_exotic_finishes.append(selected_exotic["id"])
 
-    def next_race(self):
+    def next_race(self, rng: Optional[random.Random] = None):
         """Advance to the next race."""
         self.current_race += 1
         self.race_active = False
         self.current_bets.clear()
-        self.locked_spots.clear()
         self.race_results = None
 
         # Reset all player tokens for the new race
@@ -209,18 +437,70 @@ class GameState:
             player.reset_tokens()
 
         # Generate new prop bets for the next race
-        self.generate_prop_bets_for_race()
+        self.generate_prop_bets_for_race(rng)
 
         # Generate new exotic finish for the next race (including final race)
         # Race 1->2: add 1 exotic (total: 2)
         # Race 2->3: add 1 exotic (total: 3)
         # Race 3->4: add 1 exotic (total: 4)
         if self.current_race <= self.max_races:
-            self.generate_exotic_finish_for_race()
+            self.generate_exotic_finish_for_race(rng)
+
+    def load_server_state(self, state_data: Dict):
+        """Replace race, player and bet state with a server state_sync payload."""
+        if "board" in state_data:
+            from .board import expand_state  # board imports this module
+            state_data = expand_state(state_data)
+
+        self.current_race = state_data["current_race"]
+        self.max_races = state_data["max_races"]
+        self.race_active = state_data["race_active"]
+        self.status = state_data["status"]
+        self.betting_open = state_data.get("betting_open", True)
+        self.betting_closes_at = state_data.get("betting_closes_at")
+
+        # Update players and unchanged bets in place rather than rebuilding them
+        players = {}
+        for player_data in state_data["players"]:
+            player = self.players.get(player_data["name"]) or Player(player_data["name"])
+            player.money = player_data["money"]
+            player.vip_cards = player_data["vip_cards"]
+            player.tokens = player_data["tokens"]
+            player.used_tokens = player_data["used_tokens"]
+            players[player.name] = player
+        self.players.clear()
+        self.players.update(players)
+
+        bets = []
+        for bet_data in state_data["current_bets"]:
+            bet = self.current_bets.get(bet_data["spot_key"])
+            if (bet is None or bet.player != bet_data["player"] or bet.token_value != bet_data["token_value"]
+                    or bet.horse != bet_data["horse"] or bet.bet_type != bet_data["bet_type"]):
+                bet = Bet(
+                    player=bet_data["player"],
+                    horse=bet_data["horse"],
+                    bet_type=bet_data["bet_type"],
+                    multiplier=bet_data["multiplier"],
+                    penalty=bet_data["penalty"],
+                    token_value=bet_data["token_value"],
+                    spot_key=bet_data["spot_key"],
+                    row=bet_data.get("row"),
+                    col=bet_data.get("col"),
+                    prop_bet_id=bet_data.get("prop_bet_id"),
+                    exotic_finish_id=bet_data.get("exotic_finish_id")
+                )
+            bets.append(bet)
+        self.current_bets.clear()
+        for bet in bets:
+            self.current_bets.add(bet)
+
+        self.current_prop_bets = state_data["current_prop_bets"]
+        self.current_exotic_finishes = state_data["current_exotic_finishes"]
 
     def start_race(self):
         """Start the current race - enable betting."""
         self.race_active = True
+        self.betting_open = True
 
     def end_race(self):
         """End the current race - disable betting."""
@@ -232,7 +512,6 @@ class GameState:
         self.race_active = False
         self.players.clear()
         self.current_bets.clear()
-        self.locked_spots.clear()
         self.race_results = None
         self.game_log.clear()
         self.used_prop_bets.clear()
@@ -13,7 +13,11 @@ from .modern_dialogs import (
     ModernStandardBetDialog, ModernSpecialBetDialog, ModernPropBetDialog,
     ModernExoticFinishDialog, ModernAddPlayerDialog, ModernRaceResultsDialog
 )
-from .constants import Theme, HORSES, MAX_RACES
+from .bots import Bot, make_strategy
+from .constants import Theme, HORSES, MAX_RACES, BOT_TURN_DELAY_MS
+from .log import get_logger
+
+log = get_logger(__name__)
 
 
 class ModernReadySetBetApp:
@@ -27,6 +31,10 @@ class ModernReadySetBetApp:
         self.game_state = GameState()
         self.game_logic = GameLogic(self.game_state)
 
+        # Computer opponents for single player mode
+        self.bots: List[Bot] = []
+        self._next_bot = 0
+
         # Generate initial content
         self.game_state.generate_prop_bets_for_race()
         self.game_state.generate_exotic_finish_for_race()
@@ -309,10 +317,7 @@ class ModernReadySetBetApp:
             return
 
         # Check how many players have already bet on this exotic finish
-        current_bets_on_exotic = [bet for bet in self.game_state.current_bets.values()
-                                  if bet.is_exotic_bet() and bet.exotic_finish_id == exotic_finish['id']]
-
-        if len(current_bets_on_exotic) >= 3:
+        if len(self.game_state.current_bets.on_exotic(exotic_finish['id'])) >= 3:
             messagebox.showerror("Error", "This exotic finish already has 3 players betting on it!")
             return
 
@@ -334,8 +339,7 @@ class ModernReadySetBetApp:
             )
 
             if self.game_state.place_bet(bet):
-                all_players_on_exotic = [bet.player for bet in self.game_state.current_bets.values()
-                                       if bet.is_exotic_bet() and bet.exotic_finish_id == exotic_finish['id']]
+                all_players_on_exotic = [bet.player for bet in self.game_state.current_bets.on_exotic(exotic_finish['id'])]
                 self.betting_board.update_exotic_finish_appearance(exotic_finish["id"], all_players_on_exotic)
                 self._update_displays()
                 self._update_button_states()
@@ -349,31 +353,40 @@ class ModernReadySetBetApp:
         if not self.game_state.race_active:
             messagebox.showerror("Error", "Race must be started before placing bets!")
             return False
+        if not self.game_state.betting_open:
+            messagebox.showerror("Error", "Betting is closed for this race!")
+            return False
         return True
 
     # Game control methods
     def add_player(self):
         """Add a new player using modern dialog."""
-        print("DEBUG: add_player called")  # Debug print
         try:
             dialog = ModernAddPlayerDialog(self.root, list(self.game_state.players.keys()))
-            print("DEBUG: Dialog created")  # Debug print
             result = dialog.show()
-            print(f"DEBUG: Dialog result: {result}")  # Debug print
+            log.debug("Add player dialog result: %s", result)
 
             if result:
                 success = self.game_state.add_player(result)
-                print(f"DEBUG: Player added: {success}")  # Debug print
                 if success:
                     self._update_player_display()
                     self._update_button_states()
                     self.status_var.set(f"✅ Added player: {result}")
                 else:
-                    print("DEBUG: Failed to add player to game state")
+                    log.warning("Failed to add player %s to game state", result)
         except Exception as e:
-            print(f"DEBUG: Error in add_player: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error in add_player: %s", e)
+
+    def add_bot(self, name: str, strategy: str = "greedy") -> bool:
+        """Add a computer player with the given strategy."""
+        if not self.game_state.add_player(name):
+            return False
+
+        self.bots.append(Bot(name, make_strategy(strategy)))
+        self._update_player_display()
+        self._update_button_states()
+        self.status_var.set(f"🤖 Added {strategy} bot: {name}")
+        return True
 
     def start_race(self):
         """Start a race."""
@@ -387,6 +400,39 @@ class ModernReadySetBetApp:
         self.status_var.set("🏁 Race in progress - Place your bets!")
         self._log_message("🚦 Race started - Betting is now open!")
 
+        if self.bots:
+            self.root.after(BOT_TURN_DELAY_MS, self._bot_turn)
+
+    def _bot_turn(self):
+        """Let the next bot place one bet, then schedule the following turn."""
+        if not self.game_state.race_active:
+            return
+
+        for _ in range(len(self.bots)):
+            bot = self.bots[self._next_bot % len(self.bots)]
+            self._next_bot += 1
+
+            bet = bot.take_turn(self.game_state)
+            if bet:
+                self._show_bet_on_board(bet)
+                self._update_displays()
+                self._update_button_states()
+                self.status_var.set(f"🤖 {bet.player} placed ${bet.token_value} token on {bet.horse} {bet.bet_type}")
+                self.root.after(BOT_TURN_DELAY_MS, self._bot_turn)
+                return
+
+    def _show_bet_on_board(self, bet: Bet):
+        """Mark a placed bet's spot on the betting board."""
+        if bet.is_prop_bet():
+            self.betting_board.update_prop_bet_appearance(bet.prop_bet_id, bet.player)
+        elif bet.is_exotic_bet():
+            players = [b.player for b in self.game_state.current_bets.on_exotic(bet.exotic_finish_id)]
+            self.betting_board.update_exotic_finish_appearance(bet.exotic_finish_id, players)
+        elif bet.is_special_bet():
+            self.betting_board.update_special_bet_appearance(bet.bet_type, bet.player)
+        else:
+            self.betting_board.update_button_appearance(bet.horse, bet.bet_type, bet.row, bet.col, bet.player)
+
     def end_race(self):
         """End the current race."""
         if not self.game_state.current_bets:
@@ -398,7 +444,6 @@ class ModernReadySetBetApp:
 
         try:
             # Show race results dialog
-            print("DEBUG: Opening race results dialog")  # Debug print
             dialog = ModernRaceResultsDialog(
                 self.root,
                 HORSES,
@@ -408,10 +453,9 @@ class ModernReadySetBetApp:
             )
 
             result = dialog.show()
-            print(f"DEBUG: Dialog returned result: {result}")  # Debug print
+            log.debug("Race results dialog returned: %s", result)
 
             if result:
-                print("DEBUG: Processing race results")  # Debug print
                 winners, losers = self.game_logic.process_race_results(
                     result["win"],
                     result["place"],
@@ -432,7 +476,6 @@ class ModernReadySetBetApp:
 
                 # Clear bets and reset board
                 self.game_state.current_bets.clear()
-                self.game_state.locked_spots.clear()
                 self.betting_board.reset_all_buttons()
                 self.betting_board.reset_prop_buttons_to_purple(self.game_state.current_prop_bets)
                 self.betting_board.reset_exotic_finishes_to_orange(self.game_state.current_exotic_finishes)
@@ -442,7 +485,7 @@ class ModernReadySetBetApp:
                 self._update_button_states()
                 self.status_var.set(f"🏁 Race {self.game_state.current_race} completed - Click 'Next Race' to continue!")
             else:
-                print("DEBUG: Dialog was cancelled, re-enabling betting")  # Debug print
+                log.debug("Race results dialog cancelled, re-enabling betting")
                 # User cancelled - re-enable betting
                 self.game_state.race_active = True  # Reset race state
                 self.betting_board.set_betting_enabled(True)
@@ -450,9 +493,7 @@ class ModernReadySetBetApp:
                 self.status_var.set("🏁 Race still in progress - Enter results to complete!")
 
         except Exception as e:
-            print(f"DEBUG: Error in end_race: {e}")  # Debug print
-            import traceback
-            traceback.print_exc()
+            log.exception("Error in end_race: %s", e)
             # On error, re-enable betting
             self.game_state.race_active = True
             self.betting_board.set_betting_enabled(True)
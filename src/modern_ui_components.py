@@ -1,7 +1,7 @@
 """Modern UI components for the Ready Set Bet application using CustomTkinter."""
 
 import customtkinter as ctk
-from typing import Dict, List, Callable
+from typing import Callable, Container, Dict, List
 from .constants import Theme, HORSES, BETTING_GRID, SPECIAL_BETS, HORSE_COLORS
 
 
@@ -582,6 +582,32 @@ class ModernBettingBoard:
         for exotic_finish in exotic_finishes:
             self.exotic_section.reset_button(exotic_finish["id"], exotic_finish)
 
+    def refresh_all_buttons(self, pending: Container[str] = ()):
+        """Redraw every bet button from the game state, marking pending spot keys with ⏳."""
+        if not self.game_state:
+            return
+
+        self.reset_all_buttons()
+        self.reset_prop_buttons_to_purple(self.game_state.current_prop_bets)
+        self.reset_exotic_finishes_to_orange(self.game_state.current_exotic_finishes)
+
+        exotic_players = {}
+        for bet in self.game_state.current_bets.values():
+            player = f"⏳{bet.player}" if bet.spot_key in pending else bet.player
+            if bet.is_prop_bet():
+                self.update_prop_bet_appearance(bet.prop_bet_id, player)
+            elif bet.is_exotic_bet():
+                exotic_players.setdefault(bet.exotic_finish_id, []).append(player)
+            elif bet.is_special_bet():
+                self.update_special_bet_appearance(bet.bet_type, player)
+            elif bet.row is not None and bet.col is not None:
+                self.update_button_appearance(bet.horse, bet.bet_type, bet.row, bet.col, player)
+        for exotic_id, players in exotic_players.items():
+            self.update_exotic_finish_appearance(exotic_id, players)
+
+        self.set_betting_enabled(self.game_state.race_active)
+        self.update_bets_display(self.game_state.current_bets)
+
     def update_bets_display(self, bets: Dict):
         """Update the current bets display."""
         # Clear existing bet cards
@@ -711,8 +737,8 @@ class ModernBettingBoard:
             if exotic_finish:
                 # Get remaining players
                 remaining_players = [
-                    b.player for b in self.game_state.current_bets.values()
-                    if b.is_exotic_bet() and b.exotic_finish_id == bet.exotic_finish_id and b.player != bet.player
+                    b.player for b in self.game_state.current_bets.on_exotic(bet.exotic_finish_id)
+                    if b.player != bet.player
                 ]
                 if remaining_players:
                     self.exotic_section.update_button_appearance(bet.exotic_finish_id, remaining_players)
@@ -1,16 +1,25 @@
 """
 Multiplayer extension for Ready Set Bet
 Wraps ModernReadySetBetApp with network functionality
+
+Your own bets show on the board as soon as you place them (marked ⏳ until
+the server acks them) and are rolled back if it refuses them; see
+src.pending_bets. Servers that don't agree to acks never confirm a bet, so
+there bets wait for the next state_sync instead.
 """
 import customtkinter as ctk
 from tkinter import messagebox
 from typing import Optional, Dict
+import math
 import os
+import time
 
+from . import protocol
 from .modern_app import ModernReadySetBetApp
-from .network_client import NetworkClient
+from .network_client import CLOSED, RECONNECTING, NetworkClient
 from .lobby_dialog import LobbyDialog
-from .models import GameState, Player, Bet
+from .models import Bet, GameState
+from .pending_bets import PendingBets
 
 
 class MultiplayerReadySetBetApp(ModernReadySetBetApp):
@@ -67,6 +76,10 @@ class MultiplayerReadySetBetApp(ModernReadySetBetApp):
         self.network_client = NetworkClient(server_url)
         self.my_player_name = player_name
         self.is_connected = False
+        # Own bets shown before the server confirms them
+        self.pending_bets = PendingBets()
+        # Pending tick of the betting window countdown
+        self._countdown_job = None
 
         # Initialize parent (creates game state and UI)
         super().__init__(root)
@@ -122,13 +135,17 @@ class MultiplayerReadySetBetApp(ModernReadySetBetApp):
         """Register callbacks for network messages"""
         self.network_client.register_callback("connected", self._on_connected)
         self.network_client.register_callback("disconnected", self._on_disconnected)
+        self.network_client.register_callback("connection_state", self._on_connection_state)
         self.network_client.register_callback("state_sync", self._on_state_sync)
         self.network_client.register_callback("player_connected", self._on_player_event)
         self.network_client.register_callback("player_disconnected", self._on_player_event)
         self.network_client.register_callback("race_started", self._on_race_started)
         self.network_client.register_callback("race_ended", self._on_race_ended)
+        self.network_client.register_callback("betting_closed", self._on_betting_closed)
         self.network_client.register_callback("game_completed", self._on_game_completed)
         self.network_client.register_callback("error", self._on_error)
+        self.network_client.register_callback("ack", self._on_ack)
+        self.network_client.register_callback("nack", self._on_nack)
 
     def _create_and_join_session(self):
         """Create a new session and join it"""
@@ -287,70 +304,59 @@ class MultiplayerReadySetBetApp(ModernReadySetBetApp):
         self._update_connection_status(False)
         self.status_var.set("⚠️ Connection lost. Attempting to reconnect...")
 
+    def _on_connection_state(self, state: str):
+        """Called when the client starts reconnecting or gives up"""
+        if state == RECONNECTING:
+            self.connection_label.configure(
+                text=f"🟡 Reconnecting (attempt {self.network_client.reconnect_attempt})...",
+                text_color="orange"
+            )
+        elif state == CLOSED:
+            self._update_connection_status(False)
+            self.status_var.set("❌ Disconnected from server. Restart to rejoin.")
+
     def _on_state_sync(self, message: dict):
         """Called when server sends full state update"""
         state_data = message["data"]
 
-        # Update game state from server
+        # Update game state from server, then put bets still in flight back on top
         self._apply_server_state(state_data)
+        for bet in self.pending_bets.rebase(self.game_state):
+            owner = self.game_state.locked_spots.get(bet.spot_key)
+            self.status_var.set(f"❌ Your ${bet.token_value} bet was not placed"
+                                + (f": {owner} took the spot first" if owner else ""))
 
         # Update UI
-        self._update_displays()
-        self._update_button_states()
-        self.betting_board.refresh_all_buttons()
+        self._refresh_board()
 
     def _apply_server_state(self, state_data: dict):
         """Apply server state to local game state"""
-        # Update race info
-        self.game_state.current_race = state_data["current_race"]
-        self.game_state.max_races = state_data["max_races"]
-        self.game_state.race_active = state_data["race_active"]
-        self.game_state.status = state_data["status"]
-
-        # Update players
-        self.game_state.players.clear()
-        for player_data in state_data["players"]:
-            player = Player(
-                name=player_data["name"],
-                money=player_data["money"],
-                vip_cards=player_data["vip_cards"],
-                tokens=player_data["tokens"],
-                used_tokens=player_data["used_tokens"]
-            )
-            self.game_state.players[player.name] = player
-
-        # Update bets
-        self.game_state.current_bets.clear()
-        for bet_data in state_data["current_bets"]:
-            bet = Bet(
-                player=bet_data["player"],
-                horse=bet_data["horse"],
-                bet_type=bet_data["bet_type"],
-                multiplier=bet_data["multiplier"],
-                penalty=bet_data["penalty"],
-                token_value=bet_data["token_value"],
-                spot_key=bet_data["spot_key"],
-                row=bet_data.get("row"),
-                col=bet_data.get("col"),
-                prop_bet_id=bet_data.get("prop_bet_id"),
-                exotic_finish_id=bet_data.get("exotic_finish_id")
-            )
-            self.game_state.current_bets[bet.spot_key] = bet
-
-        # Update locked spots
-        self.game_state.locked_spots = state_data["locked_spots"]
-
-        # Update prop bets and exotic finishes
-        self.game_state.current_prop_bets = state_data["current_prop_bets"]
-        self.game_state.current_exotic_finishes = state_data["current_exotic_finishes"]
+        self.game_state.load_server_state(state_data)
 
         # Update betting board
         self.betting_board.update_prop_bets(self.game_state.current_prop_bets)
         self.betting_board.update_exotic_finishes(self.game_state.current_exotic_finishes)
-        self.betting_board.set_betting_enabled(self.game_state.race_active)
+        self.betting_board.set_betting_enabled(self.game_state.race_active and self.game_state.betting_open)
 
         # Update race label
-        self.race_label.configure(text=f"Race: {self.game_state.current_race}/{self.game_state.max_races}")
+        self._update_race_display()
+
+    def _update_race_display(self):
+        """Show the race and, while a betting window runs, the seconds left to bet"""
+        if self._countdown_job is not None:
+            self.root.after_cancel(self._countdown_job)
+            self._countdown_job = None
+
+        text = f"Race: {self.game_state.current_race}/{self.game_state.max_races}"
+        closes_at = self.game_state.betting_closes_at
+        if self.game_state.race_active and not self.game_state.betting_open:
+            text += "  🔒 Betting closed"
+        elif self.game_state.race_active and closes_at is not None:
+            remaining = max(0, math.ceil(closes_at - time.time()))
+            text += f"  ⏱ {remaining}s to bet"
+            if remaining > 0:
+                self._countdown_job = self.root.after(1000, self._update_race_display)
+        self.race_label.configure(text=text)
 
     def _on_player_event(self, message: dict):
         """Called when a player connects or disconnects"""
@@ -366,6 +372,15 @@ class MultiplayerReadySetBetApp(ModernReadySetBetApp):
         race_number = message.get("race_number", self.game_state.current_race)
         self.status_var.set(f"🚦 Race {race_number} started! Place your bets.")
 
+    def _on_betting_closed(self, message: dict):
+        """Called when the server's betting window runs out"""
+        self.game_state.betting_open = False
+        self.game_state.betting_closes_at = None
+        self.betting_board.set_betting_enabled(False)
+        self._update_race_display()
+        race_number = message.get("race_number", self.game_state.current_race)
+        self.status_var.set(f"🔒 Betting closed for race {race_number}. Waiting for results...")
+
     def _on_race_ended(self, message: dict):
         """Called when race ends"""
         self.status_var.set("🏁 Race ended! Waiting for next race...")
@@ -380,6 +395,53 @@ class MultiplayerReadySetBetApp(ModernReadySetBetApp):
         error_msg = message.get("message", "Unknown error")
         messagebox.showerror("Server Error", error_msg)
 
+    def _on_ack(self, message: dict):
+        """Called when the server accepts a command (or a batch of bets)"""
+        bets = [self.pending_bets.confirm(request_id) for request_id in message["request_ids"]]
+        placed = [bet for bet in bets if bet is not None]
+        if placed:
+            self._refresh_board()
+            self.status_var.set("✅ Placed " + ", ".join(f"${bet.token_value}" for bet in placed) + " token"
+                                + ("s" if len(placed) > 1 else ""))
+
+    def _on_nack(self, message: dict):
+        """Called when the server refuses a command: roll back pending bets"""
+        rejected = [self.pending_bets.reject(self.game_state, request_id) for request_id in message["request_ids"]]
+        if any(bet is not None for bet in rejected):
+            self._refresh_board()
+        self._on_error({"message": message.get("error")})
+
+    def _refresh_board(self):
+        """Redraw the board and displays from the local game state"""
+        self._update_displays()
+        self._update_button_states()
+        self.betting_board.refresh_all_buttons(self.pending_bets.spot_keys())
+
+    def _send_bet(self, bet_data: dict):
+        """Send a bet, showing it straight away if the server will ack or nack it"""
+        bet = Bet(
+            player=self.my_player_name,
+            horse=bet_data["horse"],
+            bet_type=bet_data["bet_type"],
+            multiplier=bet_data["multiplier"],
+            penalty=bet_data["penalty"],
+            token_value=bet_data["token_value"],
+            spot_key=bet_data["spot_key"],
+            row=bet_data.get("row"),
+            col=bet_data.get("col"),
+            prop_bet_id=bet_data.get("prop_bet_id"),
+            exotic_finish_id=bet_data.get("exotic_finish_id")
+        )
+        request_id = self.network_client.new_request_id()
+        # Without acks nothing would confirm or roll back the bet
+        optimistic = protocol.ACKS in self.network_client.capabilities
+        if optimistic and self.pending_bets.place(self.game_state, bet, request_id):
+            self._refresh_board()
+            self.status_var.set(f"⏳ Placing ${bet.token_value} token...")
+        if self.network_client.place_bet(bet_data, request_id) is None:
+            self.pending_bets.reject(self.game_state, request_id)
+            self._refresh_board()
+
     # Override betting methods to send to server
     def on_standard_bet(self, horse: str, bet_type: str, multiplier: int, penalty: int, row: int, col: int):
         """Override to send bet to server"""
@@ -415,7 +477,7 @@ class MultiplayerReadySetBetApp(ModernReadySetBetApp):
                 "row": row,
                 "col": col
             }
-            self.network_client.place_bet(bet_data)
+            self._send_bet(bet_data)
 
     def on_special_bet(self, bet_name: str, multiplier: int):
         """Override to send special bet to server"""
@@ -446,7 +508,7 @@ class MultiplayerReadySetBetApp(ModernReadySetBetApp):
                 "token_value": result["token_value"],
                 "spot_key": spot_key
             }
-            self.network_client.place_bet(bet_data)
+            self._send_bet(bet_data)
 
     def on_prop_bet(self, prop_bet: dict):
         """Override to send prop bet to server"""
@@ -478,7 +540,7 @@ class MultiplayerReadySetBetApp(ModernReadySetBetApp):
                 "spot_key": spot_key,
                 "prop_bet_id": prop_bet["id"]
             }
-            self.network_client.place_bet(bet_data)
+            self._send_bet(bet_data)
 
     def on_exotic_bet(self, exotic_finish: dict):
         """Override to send exotic bet to server"""
@@ -492,8 +554,7 @@ class MultiplayerReadySetBetApp(ModernReadySetBetApp):
         spot_key = f"exotic_{exotic_finish['id']}"
 
         # Exotic finishes allow multiple bets (max 3)
-        exotic_bet_count = sum(1 for bet in self.game_state.current_bets.values()
-                               if bet.exotic_finish_id == exotic_finish['id'])
+        exotic_bet_count = len(self.game_state.current_bets.on_exotic(exotic_finish['id']))
         if exotic_bet_count >= 3:
             messagebox.showerror("Error", "This exotic finish already has 3 bets (maximum reached)!")
             return
@@ -517,7 +578,7 @@ class MultiplayerReadySetBetApp(ModernReadySetBetApp):
                 "spot_key": player_spot_key,
                 "exotic_finish_id": exotic_finish["id"]
             }
-            self.network_client.place_bet(bet_data)
+            self._send_bet(bet_data)
 
     # Override control methods to send to server
     def start_race(self):
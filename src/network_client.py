@@ -1,31 +1,122 @@
 """
 Network client for Ready Set Bet multiplayer
 Handles WebSocket communication with server
+
+The connection is supervised: when it drops, the client checks its player
+token through /api/players/reconnect and reconnects with jittered
+exponential backoff, resuming from the last broadcast it saw. Commands sent
+while disconnected are buffered and flushed once reconnected.
+
+Every command carries a request_id (idempotency key). Servers with the acks
+capability answer each with an ack or nack and run it once per request_id,
+so commands still unanswered when the connection drops are sent again after
+reconnecting. A command is retried at most once.
+
+With servers that take batches, bets placed within bet_batch_window of each
+other go out as one all-or-nothing place_bets command. Its ack or nack is
+passed to callbacks with "request_ids" listing the request_id of each bet.
 """
 import asyncio
-import json
+import itertools
+import random
 import threading
-from typing import Optional, Callable, Dict
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Optional, Callable, Dict, List, Tuple
 import websockets
 import requests
 from datetime import datetime
 
+from . import compression, protocol
+from .log import get_logger
+
+log = get_logger(__name__)
+
+# Traces the server never answered are dropped past this many
+MAX_PENDING_TRACES = 256
+
+# Reconnect backoff in seconds: a random delay up to initial * 2**attempt, capped
+RECONNECT_INITIAL_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+# Commands buffered while disconnected (oldest dropped first)
+MAX_BUFFERED_COMMANDS = 64
+# Sent commands awaiting an ack past this many are no longer retried
+MAX_UNACKED_COMMANDS = 256
+# Bets placed this close together (seconds) are sent as one place_bets command
+BET_BATCH_WINDOW = 0.025
+# Most bets per place_bets command (the server's limit)
+MAX_BATCH_BETS = 16
+# Close codes after which reconnecting cannot help: bad token, protocol error, session expired
+FATAL_CLOSE_CODES = {4002, 4004, 4010}
+
+# Connection states passed to the "connection_state" callback
+CONNECTING = "connecting"
+CONNECTED = "connected"
+RECONNECTING = "reconnecting"
+CLOSED = "closed"
+
+
+def reconnect_delay(attempt: int, initial: float = RECONNECT_INITIAL_DELAY, maximum: float = RECONNECT_MAX_DELAY,
+                    rng: random.Random = random) -> float:
+    """Full-jitter backoff, so clients dropped together do not reconnect together"""
+    return rng.uniform(0, min(maximum, initial * 2 ** attempt))
+
 
 class NetworkClient:
     """Handles client-server communication via WebSocket"""
 
-    def __init__(self, server_url: str = "ws://localhost:8000"):
+    def __init__(self, server_url: str = "ws://localhost:8000", compact_board: bool = True, binary: bool = True,
+                 compression_level: int = compression.DEFAULT_LEVEL,
+                 compression_min_size: int = compression.DEFAULT_MIN_SIZE, auto_reconnect: bool = True,
+                 bet_batch_window: float = BET_BATCH_WINDOW):
         self.server_url = server_url
+        # Ask for state_sync boards as a bitset; servers that predate it ignore this
+        self.compact_board = compact_board
+        # Offer msgpack frames when available; the server picks the encoding at connect
+        self.subprotocols = protocol.preferred_subprotocols(binary)
+        self.codec = protocol.JSON
+        # permessage-deflate for messages of at least compression_min_size bytes (level 0 disables it)
+        self.extensions = compression.client_extensions(compression_level, compression_min_size)
         self.http_url = server_url.replace("ws://", "http://").replace("wss://", "https://")
         self.websocket: Optional[websockets.WebSocketClientProtocol] = None
         self.session_id: Optional[str] = None
         self.player_token: Optional[str] = None
         self.player_name: Optional[str] = None
         self.is_connected: bool = False
+        # Handshake results: 1 for servers without the protocol 2 handshake
+        self.server_protocol = 1
+        self.capabilities: List[str] = []
+        # Seq of the latest broadcast received, so a reconnect can resume from it
+        self.last_seq: Optional[int] = None
+
+        # Supervised connection: reconnect until disconnect() or a fatal close code
+        self.auto_reconnect = auto_reconnect
+        self.connection_state = CLOSED
+        self.reconnect_attempt = 0
+        # (message, retries left) waiting for a connection
+        self._outbox: deque = deque(maxlen=MAX_BUFFERED_COMMANDS)
+        # request_id -> (message, retries left) sent but not acked yet
+        self._unacked: "OrderedDict[str, tuple]" = OrderedDict()
+
+        # Bets waiting for the batch window to close: (request_id, bet_data)
+        self.bet_batch_window = bet_batch_window
+        self._bet_batch: List[Tuple[str, dict]] = []
+        # place_bets request_id -> request_ids of its bets
+        self._batch_members: Dict[str, List[str]] = {}
+        self._request_counter = itertools.count(1)
+        self._closing = False
+        self._stop: Optional[asyncio.Event] = None
 
         # Callbacks for different message types
         self.callbacks: Dict[str, Callable] = {}
 
+        # End-to-end latency: trace_id -> send time, echoed back by the server
+        self._trace_prefix = uuid.uuid4().hex[:6]
+        self._trace_counter = itertools.count(1)
+        self._pending_traces: Dict[str, float] = {}
+        self.latencies = deque(maxlen=256)
+
         # Threading
         self.loop: Optional[asyncio.AbstractEventLoop] = None
         self.thread: Optional[threading.Thread] = None
@@ -41,7 +132,7 @@ class NetworkClient:
                 data = response.json()
                 return data.get("session_id")
         except Exception as e:
-            print(f"Error creating session: {e}")
+            log.error("Error creating session: %s", e)
         return None
 
     def join_session(self, session_id: str, player_name: str) -> bool:
@@ -57,12 +148,14 @@ class NetworkClient:
             )
             if response.status_code == 200:
                 data = response.json()
+                if data["session_id"] != self.session_id:
+                    self.last_seq = None
                 self.session_id = data["session_id"]
                 self.player_token = data["player_token"]
                 self.player_name = data["player_name"]
                 return True
         except Exception as e:
-            print(f"Error joining session: {e}")
+            log.error("Error joining session: %s", e, extra={"session_id": session_id})
         return False
 
     def reconnect(self, player_token: str) -> bool:
@@ -78,12 +171,14 @@ class NetworkClient:
             )
             if response.status_code == 200:
                 data = response.json()
+                if data["session_id"] != self.session_id:
+                    self.last_seq = None
                 self.session_id = data["session_id"]
                 self.player_token = data["player_token"]
                 self.player_name = data["player_name"]
                 return True
         except Exception as e:
-            print(f"Error reconnecting: {e}")
+            log.error("Error reconnecting: %s", e)
         return False
 
     def start_connection(self):
@@ -91,6 +186,7 @@ class NetworkClient:
         if self.thread and self.thread.is_alive():
             return
 
+        self._closing = False
         self.thread = threading.Thread(target=self._run_async_loop, daemon=True)
         self.thread.start()
 
@@ -101,18 +197,64 @@ class NetworkClient:
         self.loop.run_until_complete(self._connect_and_listen())
 
     async def _connect_and_listen(self):
-        """Connect to WebSocket and listen for messages"""
+        """Keep a connection open, reconnecting with backoff until disconnect()"""
         if not self.session_id or not self.player_token:
-            print("Cannot connect: missing session_id or player_token")
+            log.error("Cannot connect: missing session_id or player_token")
             return
 
-        ws_url = f"{self.server_url}/ws/{self.session_id}/{self.player_token}"
+        self._stop = asyncio.Event()
+        self.reconnect_attempt = 0
+        self._set_state(CONNECTING)
+        while not self._closing:
+            opened, close_code = await self._listen()
+            if self._closing or not self.auto_reconnect or close_code in FATAL_CLOSE_CODES:
+                break
+            if opened:
+                self.reconnect_attempt = 0
+            delay = reconnect_delay(self.reconnect_attempt)
+            self.reconnect_attempt += 1
+            self._set_state(RECONNECTING)
+            log.info("Reconnecting in %.1fs (attempt %d)", delay, self.reconnect_attempt,
+                     extra={"session_id": self.session_id})
+            try:
+                await asyncio.wait_for(self._stop.wait(), delay)
+                break
+            except asyncio.TimeoutError:
+                pass
+            # Re-register through the token flow; the socket is tried either way and
+            # a rejected token ends with a fatal close code
+            await self.loop.run_in_executor(None, self.reconnect, self.player_token)
+        self._set_state(CLOSED)
+
+    async def _listen(self) -> Tuple[bool, Optional[int]]:
+        """
+        One connection, until it closes
+        Returns whether it opened and the close code the server sent.
+        """
+        # Older servers ignore both parameters
+        query = f"protocol={protocol.PROTOCOL_VERSION}"
+        if self.compact_board:
+            query += "&board=bitset"
+        ws_url = f"{self.server_url}/ws/{self.session_id}/{self.player_token}?{query}"
 
+        websocket = None
+        opened = False
         try:
-            async with websockets.connect(ws_url) as websocket:
+            async with websockets.connect(ws_url, subprotocols=self.subprotocols, compression=None,
+                                          extensions=self.extensions) as websocket:
                 self.websocket = websocket
-                self.is_connected = True
-                print(f"✅ Connected to session {self.session_id}")
+                self.codec = protocol.negotiate([websocket.subprotocol] if websocket.subprotocol else [])
+                self.server_protocol = protocol.peer_protocol(websocket.response_headers.get(protocol.PROTOCOL_HEADER))
+                self.capabilities = []
+                if self.server_protocol >= 2:
+                    hello = protocol.hello(self._offered_capabilities(), self.last_seq)
+                    await websocket.send(self.codec.encode(hello))
+                await self._flush_outbox(websocket)
+                self.is_connected = opened = True
+                # Commands buffered while the first flush ran
+                await self._flush_outbox(websocket)
+                log.info("Connected to session %s (%s)", self.session_id, self.codec.name)
+                self._set_state(CONNECTED)
 
                 # Trigger connection callback
                 if "connected" in self.callbacks:
@@ -120,21 +262,112 @@ class NetworkClient:
 
                 # Listen for messages
                 async for message in websocket:
-                    data = json.loads(message)
+                    data = self.codec.decode(message)
                     await self._handle_message(data)
 
         except websockets.exceptions.ConnectionClosed:
-            print("❌ Connection closed")
-            self.is_connected = False
-            if "disconnected" in self.callbacks:
-                self.callbacks["disconnected"]()
+            log.info("Connection closed", extra={"session_id": self.session_id})
         except Exception as e:
-            print(f"❌ Connection error: {e}")
-            self.is_connected = False
+            log.error("Connection error: %s", e, extra={"session_id": self.session_id})
+
+        self.is_connected = False
+        self._requeue_unacked()
+        if opened and "disconnected" in self.callbacks:
+            self.callbacks["disconnected"]()
+        return opened, websocket.close_code if websocket is not None else None
+
+    def _set_state(self, state: str):
+        """Record a connection state change and tell the UI"""
+        if state == self.connection_state:
+            return
+        self.connection_state = state
+        if "connection_state" in self.callbacks:
+            self.callbacks["connection_state"](state)
+
+    async def _send(self, message: dict, retries: int):
+        """Send a command, buffering it for the next connection if this one is gone"""
+        try:
+            await self.websocket.send(self.codec.encode(message))
+        except websockets.exceptions.ConnectionClosed:
+            self._buffer(message, retries)
+            return
+        self._track(message, retries)
+
+    def _buffer(self, message: dict, retries: int):
+        if retries <= 0:
+            log.warning("Dropping command after retry", extra={"message_type": message.get("type")})
+            return
+        self._outbox.append((message, retries - 1))
+
+    def _track(self, message: dict, retries: int):
+        """Remember a sent command until the server acks it"""
+        self._unacked[message["request_id"]] = (message, retries)
+        while len(self._unacked) > MAX_UNACKED_COMMANDS:
+            self._unacked.popitem(last=False)
+
+    def _requeue_unacked(self):
+        """Connection lost: send unanswered commands again (the server runs each once)"""
+        if protocol.ACKS in self.capabilities:
+            for message, retries in reversed(list(self._unacked.values())):
+                if retries > 0:
+                    self._outbox.appendleft((message, retries - 1))
+                else:
+                    log.warning("Dropping command after retry", extra={"message_type": message.get("type")})
+        self._unacked.clear()
+
+    async def _flush_outbox(self, websocket):
+        """Send commands buffered while disconnected, oldest first"""
+        while self._outbox:
+            message, retries = self._outbox[0]
+            try:
+                await websocket.send(self.codec.encode(message))
+            except websockets.exceptions.ConnectionClosed:
+                if retries <= 0:
+                    self._outbox.popleft()
+                    log.warning("Dropping command after retry", extra={"message_type": message.get("type")})
+                else:
+                    self._outbox[0] = (message, retries - 1)
+                raise
+            self._outbox.popleft()
+            self._track(message, retries)
+
+    def _offered_capabilities(self) -> List[str]:
+        """Capabilities to offer in the handshake"""
+        offered = [protocol.ACKS, protocol.RESUME]
+        if self.bet_batch_window > 0:
+            offered.append(protocol.BATCH_BETS)
+        if self.compact_board:
+            offered.append(protocol.BITSET_BOARD)
+        if self.codec.binary:
+            offered.append(protocol.BINARY)
+        if self.websocket.extensions:
+            offered.append(protocol.COMPRESSION)
+        return offered
 
     async def _handle_message(self, message: dict):
         """Handle incoming messages from server"""
         msg_type = message.get("type")
+        if msg_type == "welcome":
+            self.capabilities = list(message.get("capabilities", []))
+            if protocol.ACKS not in self.capabilities:
+                self._unacked.clear()
+        elif msg_type in ("ack", "nack"):
+            self._unacked.pop(message.get("request_id"), None)
+            members = self._batch_members.pop(message.get("request_id"), None)
+            message = {**message, "request_ids": members or [message.get("request_id")]}
+            if msg_type == "nack" and "nack" not in self.callbacks:
+                # Callers without a nack callback handle failures as errors
+                msg_type, message = "error", {**message, "message": message.get("error")}
+        seq = message.get("seq")
+        if isinstance(seq, int):
+            self.last_seq = seq
+
+        sent = self._pending_traces.pop(message.get("trace_id"), None)
+        if sent is not None:
+            latency = time.perf_counter() - sent
+            self.latencies.append(latency)
+            if "latency" in self.callbacks:
+                self.callbacks["latency"](message["trace_id"], latency)
 
         if msg_type in self.callbacks:
             # Call registered callback
@@ -148,25 +381,67 @@ class NetworkClient:
         """Register a callback for a message type"""
         self.callbacks[message_type] = callback
 
-    def send_message(self, message: dict):
-        """Send a message to the server"""
-        if not self.is_connected or not self.websocket:
-            print("Cannot send message: not connected")
-            return
+    def new_request_id(self) -> str:
+        """A request_id for a command, to know it before sending"""
+        return f"{self._trace_prefix}-r{next(self._request_counter):x}"
 
-        if self.loop:
-            asyncio.run_coroutine_threadsafe(
-                self.websocket.send(json.dumps(message)),
-                self.loop
-            )
+    def send_message(self, message: dict) -> Optional[str]:
+        """
+        Send a message to the server (buffered while reconnecting)
+        Returns its request_id, or None if it could not be sent.
+        """
+        if self.connection_state == CLOSED:
+            log.warning("Cannot send message: not connected", extra={"message_type": message.get("type")})
+            return None
 
-    def place_bet(self, bet_data: dict):
-        """Send place_bet message"""
-        self.send_message({
+        if "trace_id" not in message:
+            message = {**message, "trace_id": f"{self._trace_prefix}-{next(self._trace_counter):x}"}
+        if "request_id" not in message:
+            message = {**message, "request_id": self.new_request_id()}
+        if len(self._pending_traces) >= MAX_PENDING_TRACES:
+            self._pending_traces.clear()
+        self._pending_traces[message["trace_id"]] = time.perf_counter()
+
+        if not self.is_connected or not self.websocket:
+            self._buffer(message, 2)
+        elif self.loop:
+            asyncio.run_coroutine_threadsafe(self._send(message, 1), self.loop)
+        return message["request_id"]
+
+    def place_bet(self, bet_data: dict, request_id: Optional[str] = None) -> Optional[str]:
+        """Send place_bet message (batched with other bets when the server allows it)"""
+        if request_id is None:
+            request_id = self.new_request_id()
+        if (self.bet_batch_window > 0 and protocol.BATCH_BETS in self.capabilities and self.loop
+                and self.connection_state != CLOSED):
+            self.loop.call_soon_threadsafe(self._queue_bet, request_id, bet_data)
+            return request_id
+        return self.send_message({
             "type": "place_bet",
-            "data": bet_data
+            "data": bet_data,
+            "request_id": request_id
         })
 
+    def _queue_bet(self, request_id: str, bet_data: dict):
+        self._bet_batch.append((request_id, bet_data))
+        if len(self._bet_batch) == 1:
+            self.loop.call_later(self.bet_batch_window, self._send_bets)
+
+    def _send_bets(self):
+        """Batch window closed: send the bets placed during it"""
+        batch, self._bet_batch = self._bet_batch, []
+        for start in range(0, len(batch), MAX_BATCH_BETS):
+            chunk = batch[start:start + MAX_BATCH_BETS]
+            if len(chunk) == 1:
+                request_id, bet_data = chunk[0]
+                self.send_message({"type": "place_bet", "data": bet_data, "request_id": request_id})
+                continue
+            batch_id = self.send_message({"type": "place_bets", "bets": [bet_data for _, bet_data in chunk]})
+            if batch_id is not None:
+                self._batch_members[batch_id] = [request_id for request_id, _ in chunk]
+                while len(self._batch_members) > MAX_UNACKED_COMMANDS:
+                    del self._batch_members[next(iter(self._batch_members))]
+
     def remove_bet(self, spot_key: str):
         """Send remove_bet message"""
         self.send_message({
@@ -195,7 +470,10 @@ class NetworkClient:
 
     def disconnect(self):
         """Close connection"""
+        self._closing = True
         self.is_connected = False
+        if self.loop and self._stop:
+            self.loop.call_soon_threadsafe(self._stop.set)
         if self.websocket:
             if self.loop:
                 asyncio.run_coroutine_threadsafe(self.websocket.close(), self.loop)
@@ -0,0 +1,66 @@
+"""
+Bets shown on the client before the server confirms them
+The multiplayer client applies its own bets to the local GameState as soon
+as they are sent and keeps them here, by request_id, until the server acks
+or nacks them. Each state_sync replaces the local state with the server's,
+after which the bets still in flight are applied on top again.
+
+The server settles conflicts: it runs commands one at a time, so when a
+state_sync shows a pending spot taken by another player, that player got
+there first. The pending bet is dropped (its nack follows) whatever order
+the clients clicked in, and every client ends up showing the same board.
+"""
+from typing import Dict, List, Optional, Set
+
+from .models import Bet, GameState
+
+
+class PendingBets:
+    """A player's bets awaiting the server, by request_id"""
+
+    def __init__(self):
+        self.bets: Dict[str, Bet] = {}
+
+    def __len__(self) -> int:
+        return len(self.bets)
+
+    def spot_keys(self) -> Set[str]:
+        return {bet.spot_key for bet in self.bets.values()}
+
+    def place(self, game_state: GameState, bet: Bet, request_id: str) -> bool:
+        """Apply a bet locally ahead of the server. Returns False if the local state rejects it."""
+        if not game_state.place_bet(bet):
+            return False
+        self.bets[request_id] = bet
+        return True
+
+    def confirm(self, request_id: str) -> Optional[Bet]:
+        """The server accepted the bet"""
+        return self.bets.pop(request_id, None)
+
+    def reject(self, game_state: GameState, request_id: str) -> Optional[Bet]:
+        """The server refused the bet: take it off the local board and return its token"""
+        bet = self.bets.pop(request_id, None)
+        if bet is not None and game_state.current_bets.get(bet.spot_key) is bet:
+            game_state.remove_bet(bet.spot_key)
+        return bet
+
+    def rebase(self, game_state: GameState) -> List[Bet]:
+        """
+        Reapply bets still in flight after loading a server state
+        Returns the bets that can no longer be placed, e.g. because another
+        player took the spot first.
+        """
+        lost = []
+        for request_id, bet in list(self.bets.items()):
+            current = game_state.current_bets.get(bet.spot_key)
+            if current is not None and current.player == bet.player:
+                # Already in the server's state; the ack is on its way
+                del self.bets[request_id]
+            elif current is not None or not game_state.place_bet(bet):
+                del self.bets[request_id]
+                lost.append(bet)
+        return lost
+
+    def clear(self):
+        self.bets.clear()
@@ -0,0 +1,246 @@
+"""
+Wire encodings for the multiplayer WebSocket protocol
+Clients offer encodings as WebSocket subprotocols when they connect, in order
+of preference, and the server accepts the first one it supports:
+
+    rsb.msgpack.2   msgpack binary frames with compact field keys
+    rsb.json        JSON text frames (also used when nothing is offered)
+
+Compact keys replace the field names in FIELDS at every level of a message.
+The table is part of the subprotocol: only append to it, and bump the
+version in the msgpack subprotocol name for any other change. Dict keys
+that are data rather than field names (spot keys, token denominations, ids)
+pass through unchanged, except that a "~" is prepended to those that look
+like a compact key or already start with "~", so they are not expanded
+into field names on the other side.
+
+Protocol version 2 adds a handshake. Clients connect with ?protocol=2 and
+servers that understand it answer the upgrade with an x-rsb-protocol
+header. Only when both sides speak version 2 does the client send
+
+    {"type": "hello", "protocol": 2, "capabilities": [...]}
+
+as its first message; the server replies with a welcome listing the
+capabilities both sides support before sending any state:
+
+    {"type": "welcome", "protocol": 2, "capabilities": [...], "encoding": "rsb.json"}
+
+Broadcasts to a session carry a "seq" that increases by one each time; the
+state_sync sent on connect carries the seq of the latest broadcast. A client that reconnects offers the
+resume capability with the last seq it saw in its hello ("last_seq"); the
+welcome says "resumed": true when the server replays just the broadcasts
+after it, and false when the client gets a fresh state_sync instead.
+
+Commands may carry a "request_id" chosen by the client. The server answers
+each one to the sender with {"type": "ack", "request_id": ...} or
+{"type": "nack", "request_id": ..., "error": ...} (instead of an "error"
+message) and runs a command at most once per request_id: a retried copy
+gets the original reply again. Servers that do this agree the acks
+capability.
+
+With board.bitset, state_sync payloads carry the board as a bitset of
+taken spots plus one byte per bet: the owner's seat in the high nibble and
+the token value in the low one (see src.board.compact_state). A board
+therefore holds at most src.board.MAX_SEATS (15) players and token values
+up to 15. States beyond either limit are sent with full current_bets and
+locked_spots instead, which clients agreeing the capability must accept.
+
+Clients or servers without the handshake see the version 1 behaviour
+(state_sync straight after connecting), so either side can be upgraded
+first. Capabilities are plain strings; unknown ones are ignored, which
+lets features roll out one at a time.
+
+JSON is encoded with orjson when it is installed and with the standard
+library otherwise; both produce the same compact JSON. Payloads that were
+already encoded (see server.state_cache) can be spliced into a message
+with Codec.splice instead of being encoded again.
+"""
+import json
+from typing import Dict, Iterable, List, Optional, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+Frame = Union[str, bytes]
+
+FIELDS = (
+    "type", "data", "trace_id", "session_id", "status", "current_race", "max_races", "race_active",
+    "locked_spots", "current_prop_bets", "current_exotic_finishes", "game_log", "players", "current_bets",
+    "name", "money", "vip_cards", "tokens", "used_tokens", "is_connected", "player", "horse", "bet_type",
+    "multiplier", "penalty", "token_value", "spot_key", "row", "col", "prop_bet_id", "exotic_finish_id",
+    "id", "description", "effect", "amount", "target", "targets", "board", "spots", "bets",
+    "player_name", "message", "race_number", "results", "win_horses", "place_horses", "show_horses",
+    "prop_bet_results", "exotic_finish_results", "winners", "losers", "success", "error",
+    "state_version", "protocol", "capabilities", "encoding", "seq", "last_seq", "resumed",
+    "request_id", "betting_open", "betting_closes_at", "betting_window_seconds",
+)
+
+PROTOCOL_VERSION = 2
+PROTOCOL_HEADER = "x-rsb-protocol"
+
+# Capabilities a peer may offer in the handshake
+BINARY = "binary"                  # msgpack frames (negotiated as a subprotocol)
+COMPRESSION = "compression"        # permessage-deflate (negotiated by the WebSocket handshake)
+BITSET_BOARD = "board.bitset"      # state_sync boards as a bitset, up to MAX_SEATS players (see src.board)
+DELTAS = "deltas"                  # state changes instead of full state_sync (reserved)
+RESUME = "resume"                  # resume from the last broadcast seq the client saw
+ACKS = "acks"                      # ack/nack replies to commands that carry a request_id
+BATCH_BETS = "bets.batch"          # place_bets: several bets in one all-or-nothing command
+
+_ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def _short_key(index: int) -> str:
+    """a, b, ..., Z, aa, ab, ... (never starts with a digit, unlike token keys)"""
+    key = ""
+    index += 1
+    while index:
+        index, digit = divmod(index - 1, len(_ALPHABET))
+        key = _ALPHABET[digit] + key
+    return key
+
+
+SHORT_KEYS: Dict[str, str] = {name: _short_key(index) for index, name in enumerate(FIELDS)}
+LONG_KEYS: Dict[str, str] = {short: name for name, short in SHORT_KEYS.items()}
+# Prefix for data keys that would otherwise read as a compact key
+_ESCAPE = "~"
+
+
+def _short(key):
+    short = SHORT_KEYS.get(key)
+    if short is not None:
+        return short
+    if isinstance(key, str) and (key in LONG_KEYS or key.startswith(_ESCAPE)):
+        return _ESCAPE + key
+    return key
+
+
+def _long(key):
+    name = LONG_KEYS.get(key)
+    if name is not None:
+        return name
+    if isinstance(key, str) and key.startswith(_ESCAPE):
+        return key[1:]
+    return key
+
+
+def _rename(value, rename):
+    if isinstance(value, dict):
+        return {rename(key): _rename(item, rename) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_rename(item, rename) for item in value]
+    return value
+
+
+def shorten_keys(message: dict) -> dict:
+    return _rename(message, _short)
+
+
+def expand_keys(message: dict) -> dict:
+    return _rename(message, _long)
+
+
+class JsonCodec:
+    """JSON text frames, encoded like WebSocket.send_json"""
+
+    name = "rsb.json"
+    binary = False
+
+    def encode_bytes(self, value) -> bytes:
+        if orjson is not None:
+            try:
+                # Results dicts are keyed by prop/exotic id
+                return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                pass  # Types only the standard library handles
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+    def encode(self, message: dict) -> str:
+        return self.encode_bytes(message).decode()
+
+    def splice(self, message: dict, key: str, encoded: str) -> str:
+        """Encode message with message[key] replaced by an already encoded value"""
+        head = self.encode({name: value for name, value in message.items() if name != key})
+        separator = "," if len(head) > 2 else ""
+        return f"{head[:-1]}{separator}{self.encode(key)}:{encoded}}}"
+
+    def decode(self, frame: Frame) -> dict:
+        if orjson is not None:
+            return orjson.loads(frame)
+        return json.loads(frame)
+
+
+class MsgpackCodec:
+    """msgpack binary frames with compact field keys"""
+
+    name = "rsb.msgpack.2"
+    binary = True
+
+    def encode(self, message: dict) -> bytes:
+        return msgpack.packb(shorten_keys(message), use_bin_type=True)
+
+    def splice(self, message: dict, key: str, encoded: bytes) -> bytes:
+        """Encode message with message[key] replaced by an already encoded value"""
+        packer = msgpack.Packer(use_bin_type=True)
+        rest = {name: value for name, value in message.items() if name != key}
+        parts = [packer.pack_map_header(len(rest) + 1)]
+        for name, value in rest.items():
+            parts.append(packer.pack(_short(name)))
+            parts.append(packer.pack(shorten_keys(value)))
+        parts.append(packer.pack(_short(key)))
+        parts.append(encoded)
+        return b"".join(parts)
+
+    def decode(self, frame: Frame) -> dict:
+        # Results dicts are keyed by prop/exotic id, so allow int keys
+        return expand_keys(msgpack.unpackb(frame, raw=False, strict_map_key=False))
+
+
+JSON = JsonCodec()
+CODECS = {JSON.name: JSON}
+if msgpack is not None:
+    CODECS[MsgpackCodec.name] = MsgpackCodec()
+
+
+def negotiate(offered: Iterable[str]):
+    """Codec for the first offered subprotocol we support (JSON if none)"""
+    for name in offered:
+        if name in CODECS:
+            return CODECS[name]
+    return JSON
+
+
+def preferred_subprotocols(binary: bool = True) -> List[str]:
+    """Subprotocols a client offers, best first"""
+    names = [MsgpackCodec.name] if binary and msgpack is not None else []
+    return names + [JSON.name]
+
+
+def hello(capabilities: Iterable[str], last_seq: Optional[int] = None) -> dict:
+    """Client handshake message (last_seq: latest broadcast seen, to resume from)"""
+    message = {"type": "hello", "protocol": PROTOCOL_VERSION, "capabilities": sorted(capabilities)}
+    if last_seq is not None:
+        message["last_seq"] = last_seq
+    return message
+
+
+def agree(offered, supported: Iterable[str]) -> List[str]:
+    """Capabilities both peers support (offered may come from an untrusted client)"""
+    if not isinstance(offered, list):
+        return []
+    return sorted(set(supported).intersection(name for name in offered if isinstance(name, str)))
+
+
+def peer_protocol(value) -> int:
+    """Protocol version from a header or query value (1 when absent or invalid)"""
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
@@ -0,0 +1,97 @@
+"""
+Dice-driven race model for simulating Ready Set Bet races.
+
+A simplification of the physical board: each roll moves the rolled horse one
+space, whatever its number. The board's per-horse movement is not modelled,
+so the long shots (2/3, 4, 10 and 11/12) finish far less often than in the
+real game. Odds, bot expected values and balance statistics built on this
+model rank the middle horses sensibly but understate the long shots.
+"""
+
+import random
+from typing import Dict, List, Optional
+
+from .constants import HORSES, HORSE_ROLLS, TRACK_LENGTH, PROP_BETS, EXOTIC_FINISHES
+from .models import RaceResults
+
+# 2d6 total -> horse that moves
+ROLL_TO_HORSE = {roll: horse for horse, rolls in HORSE_ROLLS.items() for roll in rolls}
+
+
+def run_race(rng: random.Random) -> Dict[str, int]:
+    """Roll 2d6 until a horse reaches the finish line. Returns spaces moved per horse."""
+    positions = {horse: 0 for horse in HORSES}
+    randint = rng.randint
+
+    while True:
+        horse = ROLL_TO_HORSE[randint(1, 6) + randint(1, 6)]
+        position = positions[horse] + 1
+        if position >= TRACK_LENGTH:
+            positions[horse] = TRACK_LENGTH
+            return positions
+        positions[horse] = position
+
+
+def finishing_ranks(positions: Dict[str, int]) -> Dict[str, int]:
+    """Rank horses by position; tied horses share a rank (1 = winner)."""
+    return {
+        horse: 1 + sum(1 for other in positions.values() if other > position)
+        for horse, position in positions.items()
+    }
+
+
+def _parse_prop(description: str):
+    """Split a prop description like ' 8 >  5 & 9' into ('8', ['5', '9'])."""
+    left, right = description.split(">")
+    others = right.replace("&", ",").split(",")
+    return left.strip(), [horse.strip() for horse in others if horse.strip()]
+
+
+_PROP_RULES = {prop["id"]: _parse_prop(prop["description"]) for prop in PROP_BETS}
+
+
+def prop_result(prop_id: int, positions: Dict[str, int]) -> bool:
+    """A prop bet wins when its horse finishes strictly ahead of all the others named."""
+    horse, others = _PROP_RULES[prop_id]
+    return all(positions[horse] > positions[other] for other in others)
+
+
+def exotic_result(exotic_id: int, positions: Dict[str, int]) -> bool:
+    """Evaluate an exotic finish against final positions."""
+    ordered = sorted(positions.values(), reverse=True)
+
+    if exotic_id == 1:  # BY A NOSE
+        return ordered[0] - ordered[1] == 1
+    elif exotic_id == 2:  # BLOW OUT
+        return ordered[0] - ordered[1] > 5
+    elif exotic_id == 3:  # TIGHT RACE
+        return ordered[-1] >= 6
+    elif exotic_id == 4:  # LATE START
+        return sum(1 for position in ordered if position <= 3) >= 2
+    elif exotic_id == 5:  # PHOTO FINISH
+        return ordered[0] - ordered[2] <= 3
+    return False
+
+
+def race_results(positions: Dict[str, int], prop_bets: Optional[List[Dict]] = None,
+                 exotic_finishes: Optional[List[Dict]] = None) -> RaceResults:
+    """Build RaceResults from final positions, covering all props and exotics by default."""
+    if prop_bets is None:
+        prop_bets = PROP_BETS
+    if exotic_finishes is None:
+        exotic_finishes = EXOTIC_FINISHES
+
+    ranks = finishing_ranks(positions)
+    return RaceResults(
+        win_horses=[horse for horse in HORSES if ranks[horse] == 1],
+        place_horses=[horse for horse in HORSES if ranks[horse] <= 2],
+        show_horses=[horse for horse in HORSES if ranks[horse] <= 3],
+        prop_bet_results={prop["id"]: prop_result(prop["id"], positions) for prop in prop_bets},
+        exotic_finish_results={ef["id"]: exotic_result(ef["id"], positions) for ef in exotic_finishes}
+    )
+
+
+def simulate_race(rng: random.Random, prop_bets: Optional[List[Dict]] = None,
+                  exotic_finishes: Optional[List[Dict]] = None) -> RaceResults:
+    """Run one race and return its results."""
+    return race_results(run_race(rng), prop_bets, exotic_finishes)
@@ -0,0 +1,286 @@
+"""
+Whole-game simulation for balance analysis.
+
+Plays complete games with bots (GameState.next_race, prop/exotic generation,
+GameLogic settlement) across a process pool and writes aggregated counts to
+an .npz file:
+
+    python -m src.simulate --games 1000000 --strategies greedy risk_averse random --out balance.npz
+
+Writing the .npz file needs numpy (in requirements.txt); without it the
+summary still prints but --out is refused up front.
+
+Games are split into fixed-size chunks, each with its own RNG stream derived
+from --seed and the chunk index. Every statistic is an integer sum, so
+results are identical for any --workers count.
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from .board import grid_bet_type
+from .bots import Bot, make_strategy, take_turns
+from .constants import HORSES, SPECIAL_BETS, PROP_BETS, EXOTIC_FINISHES, BETTING_GRID
+from .game_logic import GameLogic
+from .models import GameState
+from .race_model import simulate_race
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Only needed to write .npz output
+
+SPECIAL_NAMES = [name for name, payout, color in SPECIAL_BETS]
+PROP_INDEX = {prop["id"]: i for i, prop in enumerate(PROP_BETS)}
+EXOTIC_INDEX = {exotic["id"]: i for i, exotic in enumerate(EXOTIC_FINISHES)}
+
+
+def chunk_seed(seed: int, chunk: int) -> int:
+    """Derive an independent RNG seed for one chunk of games."""
+    digest = hashlib.sha256(f"{seed}:{chunk}".encode()).digest()
+    return int.from_bytes(digest, "big")
+
+
+class BalanceStats:
+    """Integer counters aggregated over simulated games."""
+
+    def __init__(self, seats: int):
+        rows, cols = len(BETTING_GRID), len(BETTING_GRID[0])
+        self.arrays: Dict[str, list] = {}
+        for prefix, shape in (("grid", (rows, cols)), ("special", (len(SPECIAL_NAMES),)),
+                              ("prop", (len(PROP_BETS),)), ("exotic", (len(EXOTIC_FINISHES),))):
+            for stat in ("bets", "wins", "payout", "penalty", "token_sum"):
+                self.arrays[f"{prefix}_{stat}"] = self._zeros(shape)
+        self.arrays["prop_offered"] = self._zeros((len(PROP_BETS),))
+        self.arrays["exotic_offered"] = self._zeros((len(EXOTIC_FINISHES),))
+        self.arrays["seat_money"] = self._zeros((seats,))
+        self.arrays["seat_money_sq"] = self._zeros((seats,))
+        self.arrays["seat_wins"] = self._zeros((seats,))
+        self.arrays["seat_vip_cards"] = self._zeros((seats,))
+        self.games = 0
+
+    @staticmethod
+    def _zeros(shape) -> list:
+        if len(shape) == 1:
+            return [0] * shape[0]
+        return [[0] * shape[1] for _ in range(shape[0])]
+
+    def _cell(self, bet):
+        """Find (prefix, row, col) for a bet; col is None for 1-d arrays."""
+        if bet.prop_bet_id is not None:
+            return "prop", PROP_INDEX[bet.prop_bet_id], None
+        if bet.exotic_finish_id is not None:
+            return "exotic", EXOTIC_INDEX[bet.exotic_finish_id], None
+        if bet.is_special_bet():
+            return "special", SPECIAL_NAMES.index(bet.bet_type), None
+        return "grid", bet.row - 1, bet.col
+
+    def _add(self, name: str, index: int, col: Optional[int], amount: int):
+        if col is None:
+            self.arrays[name][index] += amount
+        else:
+            self.arrays[name][index][col] += amount
+
+    def record_bet(self, bet, won: bool):
+        prefix, index, col = self._cell(bet)
+        self._add(f"{prefix}_bets", index, col, 1)
+        self._add(f"{prefix}_token_sum", index, col, bet.token_value)
+        if won:
+            self._add(f"{prefix}_wins", index, col, 1)
+            self._add(f"{prefix}_payout", index, col, bet.potential_payout)
+        else:
+            self._add(f"{prefix}_penalty", index, col, bet.penalty)
+
+    def record_offered(self, game_state: GameState):
+        for prop in game_state.current_prop_bets:
+            self.arrays["prop_offered"][PROP_INDEX[prop["id"]]] += 1
+        for exotic in game_state.current_exotic_finishes:
+            self.arrays["exotic_offered"][EXOTIC_INDEX[exotic["id"]]] += 1
+
+    def record_game(self, players: List):
+        self.games += 1
+        best = max(player.money for player in players)
+        for seat, player in enumerate(players):
+            self.arrays["seat_money"][seat] += player.money
+            self.arrays["seat_money_sq"][seat] += player.money * player.money
+            self.arrays["seat_vip_cards"][seat] += len(player.vip_cards)
+            if player.money == best:
+                self.arrays["seat_wins"][seat] += 1
+
+    def merge(self, other: "BalanceStats"):
+        for name, values in other.arrays.items():
+            mine = self.arrays[name]
+            if values and isinstance(values[0], list):
+                for row, other_row in zip(mine, values):
+                    for col, value in enumerate(other_row):
+                        row[col] += value
+            else:
+                for index, value in enumerate(values):
+                    mine[index] += value
+        self.games += other.games
+
+
+def play_game(strategies: List[str], rng: random.Random, stats: BalanceStats):
+    """Play one full game with one bot per strategy and record it."""
+    game_state = GameState()
+    game_logic = GameLogic(game_state, rng=rng)
+    bots = []
+    for seat, strategy in enumerate(strategies):
+        name = f"Seat{seat + 1}"
+        game_state.add_player(name)
+        bots.append(Bot(name, make_strategy(strategy), rng=rng))
+
+    game_state.generate_prop_bets_for_race(rng)
+    game_state.generate_exotic_finish_for_race(rng)
+
+    while True:
+        stats.record_offered(game_state)
+        game_state.start_race()
+        take_turns(bots, game_state)
+        game_state.end_race()
+
+        results = simulate_race(rng, game_state.current_prop_bets, game_state.current_exotic_finishes)
+        game_logic.process_race_results(
+            results.win_horses,
+            results.place_horses,
+            results.show_horses,
+            results.prop_bet_results,
+            results.exotic_finish_results
+        )
+        for bet in game_state.current_bets.values():
+            stats.record_bet(bet, game_logic.bet_wins(bet, results))
+
+        if game_state.current_race >= game_state.max_races:
+            break
+        game_state.next_race(rng)
+
+    stats.record_game([game_state.players[bot.name] for bot in bots])
+
+
+def run_chunk(args) -> BalanceStats:
+    """Simulate one chunk of games with its own RNG stream (pool worker)."""
+    seed, chunk, games, strategies = args
+    rng = random.Random(chunk_seed(seed, chunk))
+    stats = BalanceStats(len(strategies))
+    for _ in range(games):
+        play_game(strategies, rng, stats)
+    return stats
+
+
+def simulate(games: int, strategies: List[str], seed: int = 0, workers: Optional[int] = None,
+             chunk_size: int = 1000) -> BalanceStats:
+    """Simulate games over a process pool and return the merged statistics."""
+    chunks = []
+    for chunk, start in enumerate(range(0, games, chunk_size)):
+        chunks.append((seed, chunk, min(chunk_size, games - start), strategies))
+
+    total = BalanceStats(len(strategies))
+    if workers == 1:
+        for args in chunks:
+            total.merge(run_chunk(args))
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for stats in pool.map(run_chunk, chunks):
+            total.merge(stats)
+    return total
+
+
+def write_npz(path: str, stats: BalanceStats, strategies: List[str], seed: int):
+    """Write aggregated results to an .npz file."""
+    if np is None:
+        raise RuntimeError("numpy is required to write .npz output (pip install numpy)")
+
+    np.savez_compressed(
+        path,
+        games=np.int64(stats.games),
+        seed=np.int64(seed),
+        strategies=np.array(strategies),
+        horses=np.array(HORSES),
+        grid_bet_types=np.array([grid_bet_type(col) for col in range(len(BETTING_GRID[0]))]),
+        grid_multiplier=np.array([[m for m, p in row] for row in BETTING_GRID]),
+        grid_penalty=np.array([[p for m, p in row] for row in BETTING_GRID]),
+        special_names=np.array(SPECIAL_NAMES),
+        prop_ids=np.array([prop["id"] for prop in PROP_BETS]),
+        exotic_ids=np.array([exotic["id"] for exotic in EXOTIC_FINISHES]),
+        **{name: np.array(values, dtype=np.int64) for name, values in stats.arrays.items()}
+    )
+
+
+def print_summary(stats: BalanceStats, strategies: List[str], elapsed: float):
+    """Print per-seat results and the best and worst spots by net return."""
+    print(f"Simulated {stats.games} games in {elapsed:.1f}s ({stats.games / max(elapsed, 1e-9):.0f} games/s)")
+
+    print("\nSeat results:")
+    for seat, strategy in enumerate(strategies):
+        money = stats.arrays["seat_money"][seat] / max(stats.games, 1)
+        wins = stats.arrays["seat_wins"][seat] / max(stats.games, 1)
+        print(f"  Seat {seat + 1} ({strategy}): avg ${money:.2f}, win rate {wins:.1%}")
+
+    spots = []
+    for row, horse in enumerate(HORSES):
+        for col in range(len(BETTING_GRID[row])):
+            spots.append((f"{horse} {grid_bet_type(col)} col {col}", "grid", row, col))
+    for i, name in enumerate(SPECIAL_NAMES):
+        spots.append((name, "special", i, None))
+    for i, prop in enumerate(PROP_BETS):
+        spots.append((f"Prop #{prop['id']}", "prop", i, None))
+    for i, exotic in enumerate(EXOTIC_FINISHES):
+        spots.append((exotic["name"], "exotic", i, None))
+
+    def value(prefix, stat, index, col):
+        values = stats.arrays[f"{prefix}_{stat}"][index]
+        return values if col is None else values[col]
+
+    returns = []
+    for label, prefix, index, col in spots:
+        bets = value(prefix, "bets", index, col)
+        if bets:
+            net = value(prefix, "payout", index, col) - value(prefix, "penalty", index, col)
+            returns.append((net / bets, bets, label))
+    returns.sort(reverse=True)
+
+    print("\nBest spots (avg net per bet):")
+    for net, bets, label in returns[:5]:
+        print(f"  {label:<28} {net:+.2f} over {bets} bets")
+    print("Worst spots:")
+    for net, bets, label in returns[-5:]:
+        print(f"  {label:<28} {net:+.2f} over {bets} bets")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate full Ready Set Bet games for balance analysis")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--strategies", nargs="+", default=["greedy", "risk_averse", "random"],
+                        help="One bot per strategy name (up to 9)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Worker processes (1 runs in-process)")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Games per RNG stream; changing it changes the results")
+    parser.add_argument("--out", help="Write aggregated results to this .npz file")
+    args = parser.parse_args()
+
+    if not 1 <= len(args.strategies) <= 9:
+        parser.error("Between 1 and 9 strategies are required")
+    for name in args.strategies:
+        make_strategy(name)
+    if args.out and np is None:
+        parser.error("numpy is required for --out: pip install numpy (or pip install -r requirements.txt)")
+
+    start = time.perf_counter()
+    stats = simulate(args.games, args.strategies, args.seed, args.workers, args.chunk_size)
+    print_summary(stats, args.strategies, time.perf_counter() - start)
+
+    if args.out:
+        write_npz(args.out, stats, args.strategies, args.seed)
+        print(f"\nWrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
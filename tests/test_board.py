@@ -0,0 +1,110 @@
+"""
+Unit tests for board spot ids and occupancy.
+"""
+
+import unittest
+from src.board import GRID_SPOTS, Occupancy, board_spots, compact_state, expand_state, spot_layout
+from src.models import Bet, GameState
+
+
+class TestOccupancy(unittest.TestCase):
+    def setUp(self):
+        self.game_state = GameState()
+        self.game_state.generate_prop_bets_for_race()
+        self.game_state.generate_exotic_finish_for_race()
+        self.layout = spot_layout(self.game_state.current_prop_bets, self.game_state.current_exotic_finishes)
+        self.players = ["Alice", "Bob", "Cara", "Dan"]
+        self.exotic = board_spots(self.game_state)[-1]
+
+    def test_ids_are_dense_and_stable(self):
+        self.assertEqual(self.layout.spot_id(GRID_SPOTS[0].spot_key), 0)
+        self.assertEqual(len(self.layout), len(board_spots(self.game_state)) + 2)
+        self.assertEqual(len(self.layout.exotic_ids(self.exotic.exotic_finish_id)), 3)
+
+    def test_place_and_release(self):
+        occupancy = Occupancy(self.layout)
+        bet = GRID_SPOTS[5].make_bet("Alice", 3)
+        spot_id = occupancy.place(bet, 0)
+        self.assertFalse(occupancy.is_free(spot_id))
+        self.assertIsNone(occupancy.place(GRID_SPOTS[5].make_bet("Bob", 5), 1))
+
+        before = occupancy.copy()
+        occupancy.release(spot_id)
+        self.assertTrue(occupancy.is_free(spot_id))
+        self.assertEqual(occupancy.changed(before), 1 << spot_id)
+
+    def test_exotic_slots(self):
+        occupancy = Occupancy(self.layout)
+        for seat, player in enumerate(self.players[:3]):
+            self.assertIsNotNone(occupancy.place(self.exotic.make_bet(player, 1), seat))
+        self.assertIsNone(occupancy.place(self.exotic.make_bet("Dan", 1), 3))
+        self.assertEqual({bet.spot_key for bet in occupancy.bets(self.players)},
+                         {self.exotic.key_for(player) for player in self.players[:3]})
+
+    def test_changed_owner(self):
+        occupancy = Occupancy(self.layout)
+        occupancy.place(GRID_SPOTS[0].make_bet("Alice", 5), 0)
+        other = Occupancy(self.layout)
+        other.place(GRID_SPOTS[0].make_bet("Bob", 5), 1)
+        self.assertEqual(occupancy.changed(other), 1)
+
+    def test_compact_state_round_trip(self):
+        bets = [GRID_SPOTS[0].make_bet("Alice", 5), self.exotic.make_bet("Bob", 2),
+                board_spots(self.game_state)[-2].make_bet("Cara", 1)]
+        state = {
+            "current_prop_bets": self.game_state.current_prop_bets,
+            "current_exotic_finishes": self.game_state.current_exotic_finishes,
+            "players": [{"name": name} for name in self.players],
+            "current_bets": [{field: getattr(bet, field) for field in bet._fields} for bet in bets],
+            "locked_spots": {bet.spot_key: bet.player for bet in bets}
+        }
+        compact = compact_state(state)
+        self.assertNotIn("current_bets", compact)
+        expanded = expand_state(compact)
+        self.assertEqual(expanded["locked_spots"], state["locked_spots"])
+        self.assertCountEqual(expanded["current_bets"], state["current_bets"])
+
+    def test_round_trip_keeps_client_bet_fields(self):
+        # As sent by MultiplayerApp.on_special_bet, on_prop_bet and on_exotic_bet
+        prop = self.game_state.current_prop_bets[0]
+        exotic = self.game_state.current_exotic_finishes[0]
+        bets = [
+            {"horse": "Special", "bet_type": "7 Finishes 5th or Worse", "multiplier": 4, "penalty": 1,
+             "token_value": 3, "spot_key": "special_7 Finishes 5th or Worse"},
+            {"horse": "Prop", "bet_type": "prop", "multiplier": prop["multiplier"], "penalty": prop["penalty"],
+             "token_value": 2, "spot_key": f"prop_{prop['id']}", "prop_bet_id": prop["id"]},
+            {"horse": "Exotic", "bet_type": "exotic", "multiplier": exotic["multiplier"],
+             "penalty": exotic["penalty"], "token_value": 5, "spot_key": f"exotic_{exotic['id']}_Alice",
+             "exotic_finish_id": exotic["id"]},
+            GRID_SPOTS[0].bet_data("Bob", 1)
+        ]
+        players = ["Alice", "Bob"]
+        current_bets = [{**{field: None for field in Bet._fields}, **bet, "player": players[i // 3]}
+                        for i, bet in enumerate(bets)]
+        state = {
+            "current_prop_bets": self.game_state.current_prop_bets,
+            "current_exotic_finishes": self.game_state.current_exotic_finishes,
+            "players": [{"name": name} for name in players],
+            "current_bets": current_bets,
+            "locked_spots": {bet["spot_key"]: bet["player"] for bet in current_bets}
+        }
+        compact = compact_state(state)
+        self.assertIn("board", compact)
+        # Only the fields that differ from the layout travel in full
+        self.assertNotIn(GRID_SPOTS[0].spot_key, compact["board"]["fields"])
+        self.assertCountEqual(expand_state(compact)["current_bets"], current_bets)
+
+    def test_unknown_spot_is_left_uncompacted(self):
+        state = {
+            "current_prop_bets": [], "current_exotic_finishes": [],
+            "players": [{"name": "Alice"}],
+            "current_bets": [{field: getattr(bet, field) for field in bet._fields}
+                             for bet in [GRID_SPOTS[0].make_bet("Alice", 5)]],
+            "locked_spots": {}
+        }
+        state["current_bets"][0]["spot_key"] = "retired_spot"
+        self.assertIs(compact_state(state), state)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Unit tests for the race model and bot players.
+"""
+
+import random
+import unittest
+from src.bots import Bot, NetworkBot, RaceOdds, make_strategy, take_turns
+from src.constants import HORSES, TRACK_LENGTH, PLAYER_TOKENS
+from src.models import GameState
+from src.race_model import run_race, race_results, prop_result
+from src.simulate import simulate
+
+
+class FakeClient:
+    """Records the bets a NetworkBot sends and runs its timers on demand"""
+
+    def __init__(self):
+        self.callbacks = {}
+        self.bets = []
+        self.timers = []
+        self.loop = self
+
+    def register_callback(self, name, callback):
+        self.callbacks[name] = callback
+
+    def call_later(self, delay, callback, *args):
+        self.timers.append((callback, args))
+
+    def place_bet(self, bet_data):
+        self.bets.append(bet_data)
+
+    def run_timers(self):
+        timers, self.timers = self.timers, []
+        for callback, args in timers:
+            callback(*args)
+
+
+class TestRaceModel(unittest.TestCase):
+    def test_race_has_single_winner(self):
+        rng = random.Random(1)
+        for _ in range(50):
+            positions = run_race(rng)
+            self.assertEqual(sum(1 for p in positions.values() if p == TRACK_LENGTH), 1)
+
+            results = race_results(positions)
+            self.assertEqual(len(results.win_horses), 1)
+            self.assertTrue(set(results.win_horses) <= set(results.place_horses) <= set(results.show_horses))
+
+    def test_prop_result(self):
+        positions = {horse: 0 for horse in HORSES}
+        positions["8"] = 5
+        positions["5"] = 4
+        positions["9"] = 3
+        self.assertTrue(prop_result(1, positions))  # 8 > 5 & 9
+        self.assertFalse(prop_result(5, positions))  # 5 > 8
+
+
+class TestBots(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.odds = RaceOdds.estimate(samples=500, seed=0)
+
+    def setUp(self):
+        self.game_state = GameState()
+        self.game_state.generate_prop_bets_for_race()
+        self.game_state.generate_exotic_finish_for_race()
+
+    def _bot(self, name, strategy):
+        self.game_state.add_player(name)
+        return Bot(name, make_strategy(strategy), odds=self.odds, rng=random.Random(0))
+
+    def test_win_probabilities_sum_to_one(self):
+        total = sum(self.odds.probabilities[(horse, "win")] for horse in HORSES)
+        self.assertAlmostEqual(total, 1.0)
+
+    def test_no_bets_before_race_starts(self):
+        bot = self._bot("Bot", "random")
+        self.assertIsNone(bot.take_turn(self.game_state))
+
+    def test_random_bot_spends_every_token(self):
+        bot = self._bot("Bot", "random")
+        self.game_state.start_race()
+
+        placed = bot.play_race(self.game_state)
+        self.assertEqual(len(placed), sum(PLAYER_TOKENS.values()))
+        for value in PLAYER_TOKENS:
+            self.assertEqual(self.game_state.players["Bot"].get_available_tokens(value), 0)
+
+    def test_bots_never_share_a_spot(self):
+        bots = [self._bot(f"Bot{i}", strategy) for i, strategy in
+                enumerate(["greedy", "risk_averse", "random", "greedy"])]
+        self.game_state.start_race()
+
+        placed = take_turns(bots, self.game_state)
+        spot_keys = [bet.spot_key for bet in placed]
+        self.assertEqual(len(spot_keys), len(set(spot_keys)))
+        self.assertEqual(len(self.game_state.current_bets), len(placed))
+
+    def test_greedy_takes_best_expected_value(self):
+        bot = self._bot("Bot", "greedy")
+        self.game_state.start_race()
+
+        options = bot.options(self.game_state)
+        best = max(option.expected_value for option in options)
+        bet = bot.take_turn(self.game_state)
+        chosen = [o for o in options if o.spot.key_for("Bot") == bet.spot_key and o.token_value == bet.token_value]
+        self.assertAlmostEqual(chosen[0].expected_value, best)
+
+    def test_network_bot_stops_once_betting_closes(self):
+        client = FakeClient()
+        NetworkBot(self._bot("Bot", "random"), client)
+
+        def state_sync(betting_open):
+            client.callbacks["state_sync"]({"data": {
+                "current_race": 1, "max_races": 4, "race_active": True, "status": "active",
+                "betting_open": betting_open, "current_bets": [],
+                "players": [{"name": "Bot", "money": 0, "vip_cards": [], "tokens": dict(PLAYER_TOKENS),
+                             "used_tokens": {value: 0 for value in PLAYER_TOKENS}}],
+                "current_prop_bets": self.game_state.current_prop_bets,
+                "current_exotic_finishes": self.game_state.current_exotic_finishes
+            }})
+
+        state_sync(betting_open=True)
+        client.run_timers()
+        self.assertEqual(len(client.bets), 1)
+
+        # The window closes while the bet is in flight: its refusal starts no new turn
+        state_sync(betting_open=False)
+        client.callbacks["error"]({"message": "Betting is closed"})
+        self.assertEqual(client.timers, [])
+
+        state_sync(betting_open=True)
+        client.run_timers()
+        client.callbacks["betting_closed"]({"race_number": 1})
+        client.callbacks["error"]({"message": "Betting is closed"})
+        client.run_timers()
+        self.assertEqual(len(client.bets), 2)
+
+
+class TestSimulate(unittest.TestCase):
+    def test_results_are_reproducible(self):
+        strategies = ["greedy", "random"]
+        first = simulate(6, strategies, seed=3, workers=1, chunk_size=2)
+        second = simulate(6, strategies, seed=3, workers=1, chunk_size=2)
+
+        self.assertEqual(first.games, 6)
+        self.assertEqual(first.arrays, second.arrays)
+        # Exotic finishes accumulate: 1, 2, 3 then 4 on offer per race
+        self.assertEqual(sum(first.arrays["exotic_offered"]), 6 * (1 + 2 + 3 + 4))
+
+    def test_results_independent_of_worker_count(self):
+        strategies = ["greedy", "random"]
+        serial = simulate(6, strategies, seed=3, workers=1, chunk_size=2)
+        pooled = simulate(6, strategies, seed=3, workers=2, chunk_size=2)
+        self.assertEqual(serial.games, pooled.games)
+        self.assertEqual(serial.arrays, pooled.arrays)
+
+
+if __name__ == "__main__":
+    unittest.main()
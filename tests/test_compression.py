@@ -0,0 +1,47 @@
+"""
+Unit tests for permessage-deflate settings.
+"""
+
+import unittest
+
+try:
+    from websockets import frames
+    from src.compression import ClientDeflateFactory, ServerDeflateFactory, ThresholdDeflate, client_extensions
+except ImportError:
+    frames = None  # websockets not installed
+
+
+@unittest.skipUnless(frames, "websockets not installed")
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self.sender = ThresholdDeflate(False, False, 15, 15, {"level": 3}, min_size=64)
+        self.receiver = ThresholdDeflate(False, False, 15, 15)
+
+    def round_trip(self, data: bytes) -> frames.Frame:
+        encoded = self.sender.encode(frames.Frame(frames.OP_TEXT, data))
+        self.assertEqual(self.receiver.decode(encoded).data, data)
+        return encoded
+
+    def test_small_messages_are_not_compressed(self):
+        encoded = self.round_trip(b'{"type":"pong"}')
+        self.assertFalse(encoded.rsv1)
+
+    def test_context_takeover_across_messages(self):
+        state = b'{"type":"state_sync","data":{"current_bets":[' + b'{"multiplier":2,"penalty":1},' * 40 + b']}}'
+        first = self.round_trip(state)
+        self.assertTrue(first.rsv1)
+        self.round_trip(b'{"type":"pong"}')
+        self.assertLess(len(self.round_trip(state).data), len(first.data))
+
+    def test_negotiation(self):
+        server = ServerDeflateFactory(128, server_max_window_bits=12)
+        client = ClientDeflateFactory(256)
+        response, server_extension = server.process_request_params(client.get_request_params(), [])
+        client_extension = client.process_response_params(response, [])
+        self.assertEqual((server_extension.min_size, client_extension.min_size), (128, 256))
+        self.assertEqual(client_extension.remote_max_window_bits, 12)
+        self.assertEqual(client_extensions(level=0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
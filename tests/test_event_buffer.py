@@ -0,0 +1,124 @@
+"""
+Unit tests for resuming sessions from a broadcast sequence number.
+"""
+
+import asyncio
+import unittest
+
+from server.event_buffer import EventBuffer
+from src import protocol
+
+try:
+    from server.websocket_manager import ConnectionManager
+except ImportError:
+    ConnectionManager = None  # Server dependencies not installed
+
+from tests.test_protocol import FakeWebSocket
+
+
+def notice(name):
+    return {"type": "player_connected", "player_name": name}
+
+
+class BroadcastingWebSocket(FakeWebSocket):
+    """Another command broadcasts while the first frame sent (the welcome) is in flight"""
+
+    def __init__(self, manager, message):
+        super().__init__()
+        self.manager = manager
+        self.message = message
+
+    async def send_text(self, data):
+        await super().send_text(data)
+        if self.message is not None:
+            message, self.message = self.message, None
+            await self.manager.broadcast_to_session("ABCD1234", message)
+
+
+class TestEventBuffer(unittest.TestCase):
+    def test_since(self):
+        events = EventBuffer(size=4)
+        start = events.last_seq
+        sent = [events.append(notice(f"P{i}")) for i in range(3)]
+        self.assertEqual([message["seq"] for message in sent], [start + 1, start + 2, start + 3])
+        self.assertEqual(events.since(start + 1), sent[1:])
+        self.assertEqual(events.since(start + 3), [])
+        self.assertEqual(events.since(start), sent)
+
+    def test_gap_needs_snapshot(self):
+        events = EventBuffer(size=2)
+        start = events.last_seq
+        for i in range(3):
+            events.append(notice(f"P{i}"))
+        self.assertIsNone(events.since(start))
+        self.assertIsNotNone(events.since(start + 1))
+        # Seqs from the future or from another buffer
+        self.assertIsNone(events.since(start + 4))
+        self.assertIsNone(events.since(0))
+
+    def test_only_latest_state_replayed(self):
+        events = EventBuffer()
+        start = events.last_seq
+        events.append({"type": "state_sync", "data": {"current_race": 1}})
+        events.append(notice("P1"))
+        latest = events.append({"type": "state_sync", "data": {"current_race": 2}})
+        self.assertEqual([message["type"] for message in events.since(start)], ["player_connected", "state_sync"])
+        self.assertEqual(events.since(start)[-1], latest)
+
+
+@unittest.skipUnless(ConnectionManager, "server dependencies not installed")
+class TestResume(unittest.TestCase):
+    def test_broadcasts_held_until_synced(self):
+        manager = ConnectionManager()
+        socket = FakeWebSocket()
+
+        async def run():
+            await manager.connect(socket, "ABCD1234", "P0", "token0")
+            await manager.broadcast_to_session("ABCD1234", notice("P1"))
+            synced = manager.last_seq("ABCD1234")
+            await manager.broadcast_to_session("ABCD1234", notice("P2"))
+            self.assertEqual(socket.frames, [])
+            await manager.finish_sync(socket, synced)
+            await manager.broadcast_to_session("ABCD1234", notice("P3"))
+            return synced
+
+        synced = asyncio.run(run())
+        received = [manager.codec_for(socket).decode(frame) for frame in socket.frames]
+        self.assertEqual([message["player_name"] for message in received], ["P2", "P3"])
+        self.assertEqual([message["seq"] for message in received], [synced + 1, synced + 2])
+
+    def test_missed_events(self):
+        manager = ConnectionManager(event_buffer_size=8)
+
+        async def run():
+            await manager.connect(FakeWebSocket(), "ABCD1234", "P0", "token0")
+            seq = manager.last_seq("ABCD1234")
+            await manager.broadcast_to_session("ABCD1234", notice("P1"))
+            return seq
+
+        seq = asyncio.run(run())
+        missed, last_seq = manager.missed_events("ABCD1234", seq)
+        self.assertEqual([message["player_name"] for message in missed], ["P1"])
+        self.assertEqual(last_seq, seq + 1)
+        self.assertEqual(manager.missed_events("ABCD1234", "12"), (None, seq + 1))
+        manager.drop_events("ABCD1234")
+        self.assertEqual(manager.missed_events("ABCD1234", seq), (None, None))
+
+    def test_broadcast_during_welcome_delivered(self):
+        manager = ConnectionManager(event_buffer_size=8)
+        socket = BroadcastingWebSocket(manager, notice("P2"))
+
+        async def run():
+            await manager.connect(socket, "ABCD1234", "P0", "token0")
+            seq = manager.last_seq("ABCD1234")
+            await manager.broadcast_to_session("ABCD1234", notice("P1"))
+            await manager.sync(socket, "ABCD1234", protocol.hello([protocol.RESUME], seq), dict)
+
+        asyncio.run(run())
+        received = [manager.codec_for(socket).decode(frame) for frame in socket.frames]
+        self.assertTrue(received[0]["resumed"])
+        self.assertEqual([message.get("player_name") for message in received], [None, "P1", "P2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Unit tests for coalescing writes into group commits.
+"""
+
+import asyncio
+import unittest
+
+try:
+    import sqlalchemy
+except ImportError:
+    sqlalchemy = None  # Server dependencies not installed
+
+if sqlalchemy:
+    from server.group_commit import GroupCommitter
+    from server.session_manager import SessionManager
+    from server.state_cache import versions
+
+from src.board import GRID_SPOTS
+from tests.test_statement_budget import StatementBudgetTestCase
+
+
+@unittest.skipUnless(sqlalchemy, "sqlalchemy is not installed")
+class TestGroupCommit(StatementBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.session_id = self.session_manager.create_session().id
+        for name in ("P1", "P2", "P3"):
+            self.session_manager.join_session(self.session_id, name)
+        self.session_manager.start_race(self.session_id)
+
+        self.commits = 0
+
+        @sqlalchemy.event.listens_for(self.SessionLocal, "after_commit")
+        def _count(db):
+            if not db.in_nested_transaction():
+                self.commits += 1
+
+    def place_bet(self, name: str, spot: int):
+        def write(db):
+            return SessionManager(db, defer_commit=True).place_bet(
+                self.session_id, name, GRID_SPOTS[spot].bet_data(name, 5))
+        return write
+
+    def fail(self, db):
+        SessionManager(db, defer_commit=True).place_bet(self.session_id, "P3", GRID_SPOTS[2].bet_data("P3", 5))
+        raise RuntimeError("write failed")
+
+    def bets(self):
+        self.db.expire_all()
+        return [(bet["player"], bet["spot_key"]) for bet in self.session_manager.get_session_state(
+            self.session_id)["current_bets"]]
+
+    def test_writes_share_one_commit(self):
+        committer = GroupCommitter(self.SessionLocal, window=0.01)
+
+        async def run():
+            return await asyncio.gather(
+                committer.run(self.place_bet("P1", 0)),
+                committer.run(self.place_bet("P2", 0)),
+                committer.run(self.place_bet("P2", 1))
+            )
+
+        results = asyncio.run(run())
+        self.assertEqual(self.commits, 1)
+        # Later writes see earlier ones in the same group
+        self.assertEqual([result.get("error") for result in results], [None, "Spot already taken", None])
+        self.assertEqual(self.bets(), [("P1", GRID_SPOTS[0].spot_key), ("P2", GRID_SPOTS[1].spot_key)])
+
+    def test_failed_write_rolled_back_alone(self):
+        committer = GroupCommitter(self.SessionLocal, window=0.01)
+        version = versions.get(self.session_id)
+
+        async def run():
+            return await asyncio.gather(
+                committer.run(self.place_bet("P1", 0)),
+                committer.run(self.place_bet("P2", 1)),
+                committer.run(self.fail),
+                return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        self.assertIsInstance(results[2], RuntimeError)
+        self.assertNotEqual(versions.get(self.session_id), version)
+        self.assertEqual(self.bets(), [("P1", GRID_SPOTS[0].spot_key), ("P2", GRID_SPOTS[1].spot_key)])
+
+    def test_full_group_commits_early(self):
+        committer = GroupCommitter(self.SessionLocal, window=60, max_writes=2)
+
+        async def run():
+            return await asyncio.wait_for(asyncio.gather(
+                committer.run(self.place_bet("P1", 0)),
+                committer.run(self.place_bet("P2", 1))
+            ), 5)
+
+        asyncio.run(run())
+        self.assertEqual(self.commits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Unit tests for structured logging.
+"""
+
+import json
+import logging
+import queue
+import sys
+import unittest
+from src.log import JsonFormatter, RateLimitFilter, _QueueHandler, parse_levels
+
+
+def make_record(msg, *args, level=logging.WARNING, **extra):
+    record = logging.LogRecord("server.websocket_manager", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestRateLimitFilter(unittest.TestCase):
+    def test_limits_each_call_site(self):
+        limiter = RateLimitFilter(limit=3, window=60)
+        allowed = [limiter.filter(make_record("Error broadcasting to session: %s", i)) for i in range(10)]
+        self.assertEqual(allowed, [True] * 3 + [False] * 7)
+
+        # A different message is a different call site
+        self.assertTrue(limiter.filter(make_record("Error closing connection: %s", 1)))
+
+    def test_reports_suppressed_count_in_next_window(self):
+        limiter = RateLimitFilter(limit=1, window=0)
+        limiter.filter(make_record("boom"))
+        limiter.window = 60
+        limiter.filter(make_record("boom"))
+        limiter.filter(make_record("boom"))
+
+        limiter.window = 0
+        record = make_record("boom")
+        self.assertTrue(limiter.filter(record))
+        self.assertEqual(record.suppressed, 2)
+
+
+class TestJsonFormatter(unittest.TestCase):
+    def test_fields_and_exception_survive_the_queue(self):
+        records = queue.SimpleQueue()
+        handler = _QueueHandler(records)
+        try:
+            raise ValueError("bad frame")
+        except ValueError:
+            record = make_record("Error sending to %s", "P1", session_id="ABC123")
+            record.exc_info = sys.exc_info()
+        handler.handle(record)
+
+        entry = json.loads(JsonFormatter().format(records.get_nowait()))
+        self.assertEqual(entry["msg"], "Error sending to P1")
+        self.assertEqual(entry["level"], "WARNING")
+        self.assertEqual(entry["logger"], "server.websocket_manager")
+        self.assertEqual(entry["session_id"], "ABC123")
+        self.assertIn("ValueError: bad frame", entry["exc"])
+
+    def test_parse_levels(self):
+        self.assertEqual(parse_levels("server.main=debug, src.network_client=WARNING"),
+                         {"server.main": "DEBUG", "src.network_client": "WARNING"})
+        self.assertEqual(parse_levels(""), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""
+Tests for server memory accounting
+"""
+import sys
+import unittest
+
+try:
+    from server import memory
+except ImportError:
+    memory = None
+
+
+@unittest.skipUnless(memory, "server dependencies not installed")
+class TestMemory(unittest.TestCase):
+    """Test cases for deep sizing and allocation categories"""
+
+    def test_deep_sizeof_counts_contents(self):
+        """Containers include the objects they hold"""
+        values = ["x" * 1000]
+        self.assertGreaterEqual(memory.deep_sizeof(values), sys.getsizeof(values) + 1000)
+
+    def test_deep_sizeof_skips_shared_objects(self):
+        """Types, functions and skipped ids are not followed"""
+        holder = {"fn": memory.deep_sizeof, "cls": dict}
+        payload = ["y" * 1000]
+        self.assertLess(memory.deep_sizeof(holder), 1000)
+        self.assertLess(memory.deep_sizeof([payload], skip=(id(payload),)), 1000)
+
+    def test_category_of(self):
+        """Allocating files are grouped by package"""
+        self.assertEqual(memory.category_of("/venv/lib/sqlalchemy/orm/session.py"), "orm")
+        self.assertEqual(memory.category_of("/venv/lib/websockets/frames.py"), "connections")
+        self.assertEqual(memory.category_of("C:\\app\\server\\main.py"), "server")
+        self.assertEqual(memory.category_of("/app/src/models.py"), "game")
+        self.assertEqual(memory.category_of("/usr/lib/python3/json/encoder.py"), "other")
+
+    def test_timers_by_session(self):
+        """Scheduler timers are attributed to the session in their key"""
+        from server.scheduler import TimerScheduler
+        scheduler = TimerScheduler(clock=lambda: 0.0)
+        scheduler.schedule(("idle", "ABCD1234"), 10, print, "ABCD1234")
+        scheduler.schedule(("disconnect_grace", "ABCD1234", "Alice"), 10, print)
+        scheduler.schedule("global", 10, print)
+        sessions = memory.timers(scheduler)
+        self.assertEqual(list(sessions), ["ABCD1234"])
+        self.assertEqual(sessions["ABCD1234"]["timers"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
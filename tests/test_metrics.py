@@ -0,0 +1,44 @@
+"""
+Unit tests for the server metrics registry.
+"""
+
+import unittest
+from server.metrics import Registry
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_renders_labels(self):
+        counter = self.registry.counter("rsb_test_total", "Test counter", ("type",))
+        counter.inc("place_bet")
+        counter.inc("place_bet")
+        counter.inc('odd "name"')
+
+        text = self.registry.render()
+        self.assertIn("# TYPE rsb_test_total counter", text)
+        self.assertIn('rsb_test_total{type="place_bet"} 2', text)
+        self.assertIn('rsb_test_total{type="odd \\"name\\""} 1', text)
+
+    def test_gauge_callback(self):
+        values = [1, 2, 3]
+        self.registry.gauge("rsb_test_items", "Items", callback=lambda: len(values))
+        self.assertIn("rsb_test_items 3", self.registry.render())
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram("rsb_test_seconds", "Test", buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(2.0)
+
+        text = self.registry.render()
+        self.assertIn('rsb_test_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('rsb_test_seconds_bucket{le="1"} 2', text)
+        self.assertIn('rsb_test_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("rsb_test_seconds_count 3", text)
+        self.assertIn("rsb_test_seconds_sum 2.55", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ Unit tests for the models module.
 """
 
 import unittest
+from src.constants import PLAYER_TOKENS
 from src.models import Player, Bet, GameState, RaceResults
 
 
@@ -36,6 +37,21 @@ class TestPlayer(unittest.TestCase):
         self.player.subtract_money(10)  # Should not go below 0
         self.assertEqual(self.player.money, 0)
 
+    def test_token_dicts(self):
+        self.player.use_token("3")
+        self.assertEqual(self.player.tokens, PLAYER_TOKENS)
+        self.assertEqual(dict(self.player.used_tokens), {"5": 0, "3": 1, "2": 0, "1": 0})
+
+        self.player.used_tokens["3"] += 1
+        self.assertEqual(self.player.get_available_tokens("3"), 0)
+
+        self.player.reset_tokens()
+        self.assertEqual(self.player.get_available_tokens("3"), 2)
+
+    def test_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            self.player.nickname = "TP"
+
 
 class TestBet(unittest.TestCase):
     def test_bet_creation(self):
@@ -63,6 +79,64 @@ class TestGameState(unittest.TestCase):
         self.assertFalse(self.game_state.add_player("Player1"))  # Duplicate
         self.assertIn("Player1", self.game_state.players)
 
+    def test_load_server_state_updates_players_in_place(self):
+        self.game_state.add_player("Player1")
+        player = self.game_state.players["Player1"]
+        self.game_state.load_server_state({
+            "current_race": 2, "max_races": 4, "race_active": True, "status": "active",
+            "players": [{"name": "Player1", "money": 7, "vip_cards": [],
+                         "tokens": PLAYER_TOKENS, "used_tokens": {"5": 1, "3": 0, "2": 0, "1": 0}}],
+            "current_bets": [], "locked_spots": {},
+            "current_prop_bets": [], "current_exotic_finishes": []
+        })
+        self.assertIs(self.game_state.players["Player1"], player)
+        self.assertEqual(player.money, 7)
+        self.assertEqual(player.get_available_tokens("5"), 0)
+
+
+class TestBetStore(unittest.TestCase):
+    def setUp(self):
+        self.game_state = GameState()
+        for name in ("Alice", "Bob"):
+            self.game_state.add_player(name)
+        self.game_state.start_race()
+
+    def bet(self, player, spot_key, token_value=5, exotic_finish_id=None):
+        return Bet(player=player, horse="7", bet_type="win", multiplier=3, penalty=1,
+                   token_value=token_value, spot_key=spot_key, exotic_finish_id=exotic_finish_id)
+
+    def test_spot_taken_once(self):
+        self.assertTrue(self.game_state.place_bet(self.bet("Alice", "7_win_0_0")))
+        self.assertFalse(self.game_state.place_bet(self.bet("Bob", "7_win_0_0")))
+        self.assertEqual(self.game_state.locked_spots, {"7_win_0_0": "Alice"})
+        self.assertEqual(self.game_state.players["Bob"].get_available_tokens("5"), 1)
+
+    def test_indexes_follow_removal(self):
+        bets = self.game_state.current_bets
+        self.game_state.place_bet(self.bet("Alice", "7_win_0_0"))
+        self.game_state.place_bet(self.bet("Alice", "exotic_1_Alice", 3, exotic_finish_id=1))
+        self.game_state.place_bet(self.bet("Bob", "exotic_1_Bob", 3, exotic_finish_id=1))
+        self.assertEqual([bet.spot_key for bet in bets.for_player("Alice")], ["7_win_0_0", "exotic_1_Alice"])
+        self.assertEqual(len(bets.on_exotic(1)), 2)
+
+        self.assertTrue(self.game_state.remove_bet("exotic_1_Alice"))
+        self.assertFalse(self.game_state.remove_bet("exotic_1_Alice"))
+        self.assertEqual([bet.player for bet in bets.on_exotic(1)], ["Bob"])
+        self.assertEqual(len(bets.for_player("Alice")), 1)
+        self.assertEqual(self.game_state.players["Alice"].get_available_tokens("3"), 2)
+        self.assertNotIn("exotic_1_Alice", self.game_state.locked_spots)
+
+        self.game_state.clear_all_bets()
+        self.assertEqual(bets.for_player("Bob"), [])
+        self.assertEqual(self.game_state.players["Bob"].get_available_tokens("3"), 2)
+
+    def test_remove_after_remove_does_not_collide(self):
+        self.game_state.place_bet(self.bet("Alice", "7_win_0_0"))
+        self.game_state.place_bet(self.bet("Alice", "7_win_0_1", 3))
+        self.game_state.remove_bet("7_win_0_0")
+        self.game_state.place_bet(self.bet("Alice", "7_win_0_2", 3))
+        self.assertEqual(set(self.game_state.current_bets), {"7_win_0_1", "7_win_0_2"})
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Unit tests for NetworkClient reconnect backoff and command buffering.
+"""
+
+import asyncio
+import random
+import unittest
+
+try:
+    import websockets
+    from src import network_client, protocol
+    from src.network_client import NetworkClient
+except ImportError:
+    websockets = None  # Client dependencies not installed
+
+try:
+    from server.websocket_manager import ConnectionManager
+    from tests.test_protocol import FakeWebSocket
+except ImportError:
+    ConnectionManager = None  # Server dependencies not installed
+
+
+class ClosingWebSocket:
+    """Accepts a number of sends, then behaves like a dropped connection"""
+
+    def __init__(self, accepted=0):
+        self.accepted = accepted
+        self.sent = []
+        self.extensions = []
+
+    async def send(self, data):
+        if len(self.sent) >= self.accepted:
+            raise websockets.exceptions.ConnectionClosed(None, None)
+        self.sent.append(data)
+
+
+def handshake(client, websocket):
+    """Connect client over websocket: its hello goes through the server's handshake"""
+    client.websocket = websocket
+    hello = protocol.hello(client._offered_capabilities())
+    welcome = ConnectionManager().handshake(FakeWebSocket(), hello)
+    asyncio.run(client._handle_message(welcome))
+
+
+@unittest.skipUnless(websockets, "websockets not installed")
+class TestReconnect(unittest.TestCase):
+    def test_backoff_is_jittered_and_capped(self):
+        rng = random.Random(7)
+        delays = [network_client.reconnect_delay(attempt, 0.5, 4.0, rng) for attempt in range(10)]
+        self.assertTrue(all(0 <= delay <= min(4.0, 0.5 * 2 ** attempt) for attempt, delay in enumerate(delays)))
+        self.assertNotEqual(len(set(delays)), 1)
+
+    def test_commands_buffered_while_reconnecting(self):
+        client = NetworkClient()
+        client.connection_state = network_client.RECONNECTING
+        client.place_bet({"spot_key": "7_win_7_5"})
+        client.start_race()
+        messages = [message for message, _ in client._outbox]
+        self.assertEqual([message["type"] for message in messages], ["place_bet", "start_race"])
+        self.assertEqual(len({message["request_id"] for message in messages}), 2)
+
+        websocket = ClosingWebSocket(accepted=2)
+        asyncio.run(client._flush_outbox(websocket))
+        self.assertEqual([client.codec.decode(frame) for frame in websocket.sent], messages)
+        self.assertFalse(client._outbox)
+
+    def test_command_retried_once(self):
+        client = NetworkClient()
+        client.connection_state = network_client.CONNECTED
+        client.websocket = ClosingWebSocket()
+        asyncio.run(client._send({"type": "next_race", "request_id": "r1"}, 1))
+        self.assertEqual(client._outbox[0], ({"type": "next_race", "request_id": "r1"}, 0))
+
+        # The retry fails too: the command is dropped rather than retried forever
+        with self.assertRaises(websockets.exceptions.ConnectionClosed):
+            asyncio.run(client._flush_outbox(ClosingWebSocket()))
+        self.assertFalse(client._outbox)
+
+    @unittest.skipUnless(ConnectionManager, "server dependencies not installed")
+    def test_acks_agreed_in_handshake(self):
+        client = NetworkClient()
+        handshake(client, ClosingWebSocket())
+        self.assertIn(protocol.ACKS, client.capabilities)
+
+    @unittest.skipUnless(ConnectionManager, "server dependencies not installed")
+    def test_unacked_commands_resent_after_reconnect(self):
+        client = NetworkClient()
+        handshake(client, ClosingWebSocket(accepted=2))
+        client.connection_state = network_client.CONNECTED
+        for message in ({"type": "start_race"}, {"type": "next_race"}):
+            asyncio.run(client._send({**message, "request_id": message["type"]}, 1))
+        asyncio.run(client._handle_message({"type": "ack", "request_id": "start_race"}))
+
+        client._requeue_unacked()
+        self.assertEqual([message["request_id"] for message, _ in client._outbox], ["next_race"])
+
+    def test_nack_reported_as_error(self):
+        client = NetworkClient()
+        errors = []
+        client.register_callback("error", errors.append)
+        asyncio.run(client._handle_message({"type": "nack", "request_id": "r1", "error": "Spot already taken"}))
+        self.assertEqual(errors[0]["message"], "Spot already taken")
+
+    def test_bets_batched_within_window(self):
+        client = NetworkClient(bet_batch_window=0.01)
+        client.connection_state = network_client.RECONNECTING
+        client.capabilities = [protocol.BATCH_BETS]
+        acks = []
+        client.register_callback("ack", acks.append)
+
+        async def run():
+            client.loop = asyncio.get_running_loop()
+            request_ids = [client.place_bet({"spot_key": f"s{i}"}) for i in range(3)]
+            await asyncio.sleep(0.05)
+            client.place_bet({"spot_key": "late"})
+            await asyncio.sleep(0.05)
+            batch = client._outbox[0][0]
+            await client._handle_message({"type": "ack", "request_id": batch["request_id"]})
+            return request_ids
+
+        request_ids = asyncio.run(run())
+        messages = [message for message, _ in client._outbox]
+        self.assertEqual([message["type"] for message in messages], ["place_bets", "place_bet"])
+        self.assertEqual([bet["spot_key"] for bet in messages[0]["bets"]], ["s0", "s1", "s2"])
+        self.assertEqual(acks[0]["request_ids"], request_ids)
+
+    def test_nothing_buffered_once_closed(self):
+        client = NetworkClient()
+        client.next_race()
+        self.assertFalse(client._outbox)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Unit tests for optimistic bet placement.
+"""
+
+import unittest
+from src.board import GRID_SPOTS
+from src.models import Bet, GameState, Player
+from src.pending_bets import PendingBets
+
+
+def make_bet(player: str, spot: int = 0, token_value: int = 5) -> Bet:
+    return Bet(**GRID_SPOTS[spot].bet_data(player, token_value), player=player)
+
+
+def server_state(bets, used=None):
+    """state_sync payload for players A and B with the given bets"""
+    players = []
+    for name in ("A", "B"):
+        player = Player(name)
+        for token_value, count in (used or {}).get(name, {}).items():
+            player.used_tokens = {**player.used_tokens.copy(), token_value: count}
+        players.append({"name": name, "money": 0, "vip_cards": [], "tokens": player.tokens.copy(),
+                        "used_tokens": player.used_tokens.copy()})
+    return {
+        "current_race": 1, "max_races": 4, "race_active": True, "status": "active", "players": players,
+        "current_bets": [{**GRID_SPOTS[spot].bet_data(player, value), "player": player} for player, spot, value in bets],
+        "current_prop_bets": [], "current_exotic_finishes": []
+    }
+
+
+class TestPendingBets(unittest.TestCase):
+    def setUp(self):
+        self.game_state = GameState()
+        self.game_state.load_server_state(server_state([]))
+        self.pending = PendingBets()
+
+    def test_place_shows_bet_and_spends_token(self):
+        self.assertTrue(self.pending.place(self.game_state, make_bet("A"), "r1"))
+        self.assertEqual(self.game_state.locked_spots[GRID_SPOTS[0].spot_key], "A")
+        self.assertEqual(self.game_state.players["A"].get_available_tokens("5"), 0)
+        # The spent token stops a second optimistic bet
+        self.assertFalse(self.pending.place(self.game_state, make_bet("A", spot=1), "r2"))
+
+    def test_nack_rolls_back(self):
+        self.pending.place(self.game_state, make_bet("A"), "r1")
+        self.assertIsNotNone(self.pending.reject(self.game_state, "r1"))
+        self.assertNotIn(GRID_SPOTS[0].spot_key, self.game_state.locked_spots)
+        self.assertEqual(self.game_state.players["A"].get_available_tokens("5"), 1)
+
+    def test_in_flight_bet_survives_state_sync(self):
+        self.pending.place(self.game_state, make_bet("A"), "r1")
+        # Another player's bet arrives before ours is processed
+        self.game_state.load_server_state(server_state([("B", 1, 3)], used={"B": {"3": 1}}))
+        self.assertEqual(self.pending.rebase(self.game_state), [])
+        self.assertEqual(self.game_state.locked_spots[GRID_SPOTS[0].spot_key], "A")
+        self.assertEqual(self.game_state.players["A"].get_available_tokens("5"), 0)
+        self.assertEqual(len(self.pending), 1)
+
+        # Then the server's state includes it
+        self.game_state.load_server_state(server_state([("B", 1, 3), ("A", 0, 5)], used={"A": {"5": 1}}))
+        self.assertEqual(self.pending.rebase(self.game_state), [])
+        self.assertEqual(len(self.pending), 0)
+        self.assertEqual(self.game_state.players["A"].get_available_tokens("5"), 0)
+
+    def test_conflict_goes_to_server_order(self):
+        self.pending.place(self.game_state, make_bet("A"), "r1")
+        self.game_state.load_server_state(server_state([("B", 0, 3)], used={"B": {"3": 1}}))
+        lost = self.pending.rebase(self.game_state)
+        self.assertEqual([bet.player for bet in lost], ["A"])
+        self.assertEqual(self.game_state.locked_spots[GRID_SPOTS[0].spot_key], "B")
+        self.assertEqual(self.game_state.players["A"].get_available_tokens("5"), 1)
+        # The nack that follows changes nothing
+        self.assertIsNone(self.pending.reject(self.game_state, "r1"))
+        self.assertEqual(self.game_state.locked_spots[GRID_SPOTS[0].spot_key], "B")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Unit tests for the sampling profiler.
+"""
+
+import threading
+import time
+import unittest
+from server import tracing
+from server.profiler import profile_thread
+
+
+def busy_handler(trace, stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestProfiler(unittest.TestCase):
+    def profile(self, target_session, **kwargs):
+        stop = threading.Event()
+        ready = threading.Event()
+        thread_ids = []
+
+        def worker():
+            thread_ids.append(threading.get_ident())
+            ready.set()
+            busy_handler(tracing.Trace(target_session), stop)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        ready.wait()
+        try:
+            return profile_thread(thread_ids[0], 0.2, hz=200, **kwargs)
+        finally:
+            stop.set()
+            thread.join()
+
+    def test_collapsed_stacks(self):
+        profiler = self.profile("ABC123")
+        self.assertGreater(profiler.samples, 10)
+
+        lines = profiler.collapsed().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+        self.assertIn("busy_handler (tests/test_profiler.py:", stack)
+        self.assertLess(stack.index("worker"), stack.index("busy_handler"))
+
+    def test_session_filter(self):
+        self.assertTrue(self.profile("ABC123", session_id="ABC123").stacks)
+        self.assertFalse(self.profile("ABC123", session_id="OTHER").stacks)
+
+
+if __name__ == '__main__':
+    unittest.main()
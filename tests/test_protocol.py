@@ -0,0 +1,113 @@
+"""
+Unit tests for the wire encodings.
+"""
+
+import asyncio
+import unittest
+from src import protocol
+
+try:
+    from server.websocket_manager import ConnectionManager
+except ImportError:
+    ConnectionManager = None
+
+STATE = {
+    "type": "state_sync",
+    "data": {
+        "players": [{"name": "Alice", "tokens": {"5": 1, "3": 2}, "vip_cards": [{"type": "roll_bonus"}]}],
+        "locked_spots": {"7_win_7_5": "Alice"},
+        "results": {"prop_bet_results": {3: True}}
+    }
+}
+
+
+class FakeWebSocket:
+    def __init__(self, subprotocols=()):
+        self.scope = {"subprotocols": list(subprotocols)}
+        self.subprotocol = None
+        self.frames = []
+
+    async def accept(self, subprotocol=None, headers=None):
+        self.subprotocol = subprotocol
+        self.headers = dict(headers or [])
+
+    async def send_text(self, data):
+        self.frames.append(data)
+
+    async def send_bytes(self, data):
+        self.frames.append(data)
+
+
+class TestProtocol(unittest.TestCase):
+    def test_short_keys_are_unique(self):
+        self.assertEqual(len(set(protocol.SHORT_KEYS.values())), len(protocol.FIELDS))
+        self.assertFalse(any(key[0].isdigit() for key in protocol.LONG_KEYS))
+
+    def test_negotiate(self):
+        self.assertIs(protocol.negotiate([]), protocol.JSON)
+        self.assertIs(protocol.negotiate(["chat", "rsb.json"]), protocol.JSON)
+        self.assertEqual(protocol.preferred_subprotocols(binary=False), ["rsb.json"])
+
+    def test_agree(self):
+        supported = [protocol.BITSET_BOARD, protocol.BINARY]
+        self.assertEqual(protocol.agree([protocol.BINARY, protocol.DELTAS, 7], supported), [protocol.BINARY])
+        self.assertEqual(protocol.agree("board.bitset", supported), [])
+        self.assertEqual(protocol.peer_protocol(None), 1)
+        self.assertEqual(protocol.peer_protocol("2"), 2)
+
+    @unittest.skipUnless(protocol.msgpack, "msgpack not installed")
+    def test_msgpack_round_trip(self):
+        codec = protocol.negotiate(protocol.preferred_subprotocols())
+        self.assertTrue(codec.binary)
+        frame = codec.encode(STATE)
+        self.assertLess(len(frame), len(protocol.JSON.encode(STATE)))
+        self.assertEqual(codec.decode(frame), STATE)
+
+    @unittest.skipUnless(protocol.msgpack, "msgpack not installed")
+    def test_msgpack_data_keys_are_not_field_names(self):
+        codec = protocol.MsgpackCodec()
+        # Client-supplied dicts, e.g. end_race results echoed in race_ended
+        message = {"type": "race_ended", "data": {"winners": {"a": 10, "~b": 1, "type": 2, 7: 3}}}
+        self.assertEqual(codec.decode(codec.encode(message)), message)
+
+
+@unittest.skipUnless(ConnectionManager and protocol.msgpack, "server dependencies or msgpack not installed")
+class TestMixedClients(unittest.TestCase):
+    def test_broadcast_per_encoding(self):
+        manager = ConnectionManager()
+        json_socket = FakeWebSocket()
+        binary_sockets = [FakeWebSocket(protocol.preferred_subprotocols()) for _ in range(2)]
+
+        async def run():
+            for i, socket in enumerate([json_socket] + binary_sockets):
+                await manager.connect(socket, "ABCD1234", f"P{i}", f"token{i}")
+                await manager.finish_sync(socket, None)
+            await manager.broadcast_to_session("ABCD1234", STATE)
+
+        asyncio.run(run())
+        sent = {**STATE, "seq": manager.last_seq("ABCD1234")}
+        self.assertIsNone(json_socket.subprotocol)
+        self.assertEqual(protocol.JSON.decode(json_socket.frames[0]), protocol.JSON.decode(protocol.JSON.encode(sent)))
+        codec = protocol.CODECS[binary_sockets[0].subprotocol]
+        self.assertEqual(codec.decode(binary_sockets[0].frames[0]), sent)
+        # Encoded once for both binary connections
+        self.assertIs(binary_sockets[0].frames[0], binary_sockets[1].frames[0])
+
+    def test_handshake(self):
+        manager = ConnectionManager()
+        json_socket = FakeWebSocket()
+        asyncio.run(manager.connect(json_socket, "ABCD1234", "P0", "token0"))
+        self.assertEqual(json_socket.headers[protocol.PROTOCOL_HEADER.encode()], b"2")
+
+        hello = protocol.hello([protocol.BINARY, protocol.BITSET_BOARD, protocol.RESUME])
+        welcome = manager.handshake(json_socket, hello)
+        self.assertEqual(welcome["capabilities"], [protocol.BITSET_BOARD, protocol.RESUME])
+        self.assertEqual(welcome["encoding"], protocol.JSON.name)
+        self.assertIn(json_socket, manager.compact_boards)
+
+        manager.disconnect(json_socket)
+        self.assertNotIn(json_socket, manager.capabilities)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Unit tests for the command reply cache.
+"""
+
+import asyncio
+import unittest
+
+from server.request_cache import RequestCache, valid_request_id
+
+
+class TestRequestCache(unittest.TestCase):
+    def test_duplicate_gets_original_reply(self):
+        async def run():
+            cache = RequestCache()
+            future, first = cache.claim("P1", "r1")
+            self.assertTrue(first)
+            duplicate, first = cache.claim("P1", "r1")
+            self.assertFalse(first)
+            # Other players may reuse the id
+            self.assertTrue(cache.claim("P2", "r1")[1])
+
+            cache.resolve("P1", "r1", future, {"type": "ack", "request_id": "r1"})
+            return await duplicate
+
+        self.assertEqual(asyncio.run(run()), {"type": "ack", "request_id": "r1"})
+
+    def test_failed_command_runs_again(self):
+        async def run():
+            cache = RequestCache()
+            future, _ = cache.claim("P1", "r1")
+            cache.resolve("P1", "r1", future, None)
+            return future.result(), cache.claim("P1", "r1")[1]
+
+        self.assertEqual(asyncio.run(run()), (None, True))
+
+    def test_least_recent_evicted(self):
+        async def run():
+            cache = RequestCache(size=2)
+            for request_id in ("r1", "r2"):
+                cache.claim("P1", request_id)
+            cache.claim("P1", "r1")
+            cache.claim("P1", "r3")
+            return sorted(request_id for _, request_id in cache.replies)
+
+        self.assertEqual(asyncio.run(run()), ["r1", "r3"])
+
+    def test_valid_request_id(self):
+        self.assertTrue(valid_request_id("a1b2c3-r1"))
+        self.assertFalse(valid_request_id(""))
+        self.assertFalse(valid_request_id(12))
+        self.assertFalse(valid_request_id("x" * 65))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Unit tests for the server timer scheduler.
+"""
+
+import asyncio
+import unittest
+from server.scheduler import TimerScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTimerScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = TimerScheduler(clock=self.clock)
+        self.fired = []
+
+    def test_fires_in_deadline_order(self):
+        self.scheduler.schedule("b", 2, self.fired.append, "b")
+        self.scheduler.schedule("a", 1, self.fired.append, "a")
+        self.scheduler.schedule("c", 3, self.fired.append, "c")
+
+        self.clock.now = 2.5
+        self.assertEqual(self.scheduler.run_due(), 2)
+        self.assertEqual(self.fired, ["a", "b"])
+        self.assertEqual(len(self.scheduler), 1)
+
+    def test_cancel(self):
+        self.scheduler.schedule("a", 1, self.fired.append, "a")
+        self.assertTrue(self.scheduler.cancel("a"))
+        self.assertFalse(self.scheduler.cancel("a"))
+
+        self.clock.now = 5
+        self.assertEqual(self.scheduler.run_due(), 0)
+        self.assertEqual(self.fired, [])
+
+    def test_reschedule_replaces_timer(self):
+        self.scheduler.schedule("a", 1, self.fired.append, "first")
+        self.scheduler.schedule("a", 3, self.fired.append, "second")
+        self.assertEqual(self.scheduler.remaining("a"), 3)
+
+        self.clock.now = 2
+        self.scheduler.run_due()
+        self.assertEqual(self.fired, [])
+
+        self.clock.now = 3
+        self.scheduler.run_due()
+        self.assertEqual(self.fired, ["second"])
+        self.assertIsNone(self.scheduler.remaining("a"))
+
+    def test_compaction_keeps_live_timers(self):
+        for i in range(200):
+            self.scheduler.schedule(i, i, self.fired.append, i)
+        for i in range(150):
+            self.scheduler.cancel(i)
+
+        self.assertEqual(len(self.scheduler), 50)
+        self.clock.now = 1000
+        self.assertEqual(self.scheduler.run_due(), 50)
+        self.assertEqual(self.fired, list(range(150, 200)))
+
+    def test_callback_compacting_heap(self):
+        for i in range(100):
+            self.scheduler.schedule(i, 10, self.fired.append, i)
+
+        def cancel_all():
+            self.fired.append("cancel")
+            for i in range(100):
+                self.scheduler.cancel(i)
+
+        self.scheduler.schedule("cancel", 1, cancel_all)
+        self.scheduler.schedule("b", 2, self.fired.append, "b")
+
+        self.clock.now = 2
+        self.assertEqual(self.scheduler.run_due(), 2)
+        self.clock.now = 20
+        self.assertEqual(self.scheduler.run_due(), 0)
+        self.assertEqual(self.fired, ["cancel", "b"])
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_runs_coroutines_on_loop(self):
+        async def run():
+            scheduler = TimerScheduler()
+            scheduler.start()
+            done = asyncio.Event()
+
+            async def callback():
+                done.set()
+
+            scheduler.schedule("a", 0.01, callback)
+            await asyncio.wait_for(done.wait(), timeout=1)
+            scheduler.stop()
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
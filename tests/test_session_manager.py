@@ -0,0 +1,75 @@
+"""
+Unit tests for the betting window in the session manager.
+"""
+
+import time
+import unittest
+
+from src.board import GRID_SPOTS
+from src.models import GameState
+
+try:
+    import sqlalchemy
+except ImportError:
+    sqlalchemy = None  # Server dependencies not installed
+
+if sqlalchemy:
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from server.database import Base
+    from server.session_manager import SessionManager
+
+
+@unittest.skipUnless(sqlalchemy, "server dependencies not installed")
+class TestBettingWindow(unittest.TestCase):
+    def setUp(self):
+        engine = sqlalchemy.create_engine("sqlite://", connect_args={"check_same_thread": False},
+                                          poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        self.session_manager = SessionManager(self.db)
+        self.session_id = self.session_manager.create_session().id
+        self.session_manager.join_session(self.session_id, "P1")
+
+    def tearDown(self):
+        self.db.close()
+
+    def state(self):
+        return self.session_manager.get_session_state(self.session_id)
+
+    def test_close_betting_keeps_status(self):
+        started = time.time()
+        self.session_manager.start_race(self.session_id, betting_window=30)
+        state = self.state()
+        self.assertTrue(state["betting_open"])
+        self.assertGreaterEqual(state["betting_closes_at"], started + 30)
+
+        self.assertTrue(self.session_manager.close_betting(self.session_id))
+        self.assertFalse(self.session_manager.close_betting(self.session_id))
+        state = self.state()
+        self.assertEqual((state["status"], state["race_active"]), ("active", True))
+        self.assertEqual((state["betting_open"], state["betting_closes_at"]), (False, None))
+        result = self.session_manager.place_bet(self.session_id, "P1", GRID_SPOTS[0].bet_data("P1", 5))
+        self.assertEqual(result["error"], "Betting is closed")
+
+        game_state = GameState()
+        game_state.load_server_state(state)
+        self.assertFalse(game_state.betting_open)
+
+    def test_next_race_reopens_betting(self):
+        self.session_manager.start_race(self.session_id, betting_window=30)
+        self.session_manager.close_betting(self.session_id)
+        self.session_manager.end_race(self.session_id, {
+            "win_horses": [], "place_horses": [], "show_horses": [],
+            "prop_bet_results": {}, "exotic_finish_results": {}
+        })
+        self.session_manager.next_race(self.session_id)
+        self.session_manager.start_race(self.session_id)
+
+        state = self.state()
+        self.assertEqual((state["betting_open"], state["betting_closes_at"]), (True, None))
+        self.assertTrue(self.session_manager.place_bet(self.session_id, "P1", GRID_SPOTS[0].bet_data("P1", 5))["success"])
+
+
+if __name__ == "__main__":
+    unittest.main()
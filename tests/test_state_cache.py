@@ -0,0 +1,92 @@
+"""
+Unit tests for state versions and encoded-state caching.
+"""
+
+import unittest
+
+from src import protocol
+from src.board import GRID_SPOTS, compact_state
+
+try:
+    import sqlalchemy
+except ImportError:
+    sqlalchemy = None  # Server dependencies not installed
+
+if sqlalchemy:
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from server.database import Base
+    from server.session_manager import SessionManager
+    from server import metrics
+    from server.state_cache import EncodedStates, compact_board_state
+
+
+@unittest.skipUnless(sqlalchemy, "server dependencies not installed")
+class TestStateCache(unittest.TestCase):
+    def setUp(self):
+        engine = sqlalchemy.create_engine("sqlite://", connect_args={"check_same_thread": False},
+                                          poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        self.session_manager = SessionManager(self.db)
+        self.session_id = self.session_manager.create_session().id
+        for name in ("P1", "P2"):
+            self.session_manager.join_session(self.session_id, name)
+        self.session_manager.start_race(self.session_id)
+
+    def tearDown(self):
+        self.db.close()
+
+    def state(self):
+        return self.session_manager.get_session_state(self.session_id)
+
+    def test_version_changes_with_commits(self):
+        version = self.state()["state_version"]
+        self.assertEqual(self.state()["state_version"], version)
+
+        self.session_manager.place_bet(self.session_id, "P1", GRID_SPOTS[0].bet_data("P1", 5))
+        placed = self.state()["state_version"]
+        self.assertGreater(placed, version)
+
+        self.session_manager.mark_disconnected(self.session_id, "P2")
+        self.assertNotEqual(self.state()["state_version"], placed)
+
+    def test_no_version_with_uncommitted_writes(self):
+        self.session_manager.get_session(self.session_id).race_active = False
+        self.db.flush()
+        self.assertIsNone(self.state()["state_version"])
+        self.db.rollback()
+        self.assertIsNotNone(self.state()["state_version"])
+
+    def test_encoded_once_per_version(self):
+        states = EncodedStates()
+        state = self.state()
+        encoded = states.encode(state)
+        self.assertIs(states.encode(self.state()), encoded)
+        self.assertEqual(protocol.JSON.decode(encoded), protocol.JSON.decode(protocol.JSON.encode(state)))
+
+        self.session_manager.place_bet(self.session_id, "P1", GRID_SPOTS[0].bet_data("P1", 5))
+        self.assertEqual(len(protocol.JSON.decode(states.encode(self.state()))["current_bets"]), 1)
+
+    def test_splice_matches_full_encoding(self):
+        state = self.state()
+        message = {"type": "state_sync", "trace_id": "t1", "data": compact_state(state)}
+        for codec in protocol.CODECS.values():
+            frame = codec.splice(message, "data", EncodedStates().encode(state, codec, True))
+            self.assertEqual(codec.decode(frame), codec.decode(codec.encode(message)))
+
+    def test_bitset_fallback_counted(self):
+        fallbacks = metrics.BITSET_FALLBACKS.values.get((), 0)
+        compact_board_state(self.state())
+        self.assertEqual(metrics.BITSET_FALLBACKS.values.get((), 0), fallbacks)
+
+        # Token values above 15 do not fit the bet's nibble
+        self.session_manager.place_bet(self.session_id, "P1", GRID_SPOTS[0].bet_data("P1", 5))
+        state = self.state()
+        state["current_bets"][0]["token_value"] = 20
+        self.assertIs(compact_board_state(state), state)
+        self.assertEqual(metrics.BITSET_FALLBACKS.values.get((), 0), fallbacks + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
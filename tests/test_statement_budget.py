@@ -0,0 +1,146 @@
+"""
+Statement budgets for SessionManager code paths.
+Fails when a change makes a path issue more SQL statements, e.g. an N+1
+query per bet or player.
+"""
+
+import random
+import unittest
+from contextlib import contextmanager
+
+try:
+    import sqlalchemy
+except ImportError:
+    sqlalchemy = None  # Server dependencies not installed
+
+if sqlalchemy:
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from server.database import Base, QueryStats, count_statements, instrument_engine
+    from server.session_manager import SessionManager
+
+from src.board import GRID_SPOTS
+from src.race_model import simulate_race
+
+
+class StatementBudgetTestCase(unittest.TestCase):
+    """Runs SessionManager against an instrumented in-memory database"""
+
+    def setUp(self):
+        engine = sqlalchemy.create_engine("sqlite://", connect_args={"check_same_thread": False},
+                                          poolclass=StaticPool)
+        self.query_stats = QueryStats()
+        instrument_engine(engine, self.query_stats)
+        Base.metadata.create_all(engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.db = self.SessionLocal()
+        self.session_manager = SessionManager(self.db)
+
+    def tearDown(self):
+        self.db.close()
+
+    @contextmanager
+    def assertStatementBudget(self, budget: int):
+        """Fail if the block executes more than budget statements"""
+        # Start from expired rows, as each WebSocket message does
+        self.db.expire_all()
+        with count_statements() as statements:
+            yield statements
+        self.assertLessEqual(
+            statements.count, budget,
+            f"{statements.count} statements executed, budget is {budget}"
+        )
+
+
+@unittest.skipUnless(sqlalchemy, "sqlalchemy is not installed")
+class TestSessionManagerStatements(StatementBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.session_id = self.session_manager.create_session().id
+        self.names = [f"P{i + 1}" for i in range(9)]
+        for name in self.names:
+            self.session_manager.join_session(self.session_id, name)
+        self.session_manager.start_race(self.session_id)
+
+    def place_bets(self, count: int):
+        for i, spot in enumerate(GRID_SPOTS[:count]):
+            name = self.names[i % len(self.names)]
+            result = self.session_manager.place_bet(self.session_id, name, spot.bet_data(name, 1))
+            self.assertTrue(result["success"], result)
+
+    def end_race(self):
+        results = simulate_race(random.Random(1))
+        return self.session_manager.end_race(self.session_id, {
+            "win_horses": results.win_horses,
+            "place_horses": results.place_horses,
+            "show_horses": results.show_horses,
+            "prop_bet_results": {},
+            "exotic_finish_results": {}
+        })
+
+    def test_get_session_state_does_not_scale_with_bets(self):
+        with self.assertStatementBudget(3):
+            self.session_manager.get_session_state(self.session_id)
+
+        self.place_bets(9)
+        with self.assertStatementBudget(3):
+            state = self.session_manager.get_session_state(self.session_id)
+        self.assertEqual(len(state["current_bets"]), 9)
+
+    def test_place_and_remove_bet(self):
+        spot = GRID_SPOTS[0]
+        with self.assertStatementBudget(6):
+            self.session_manager.place_bet(self.session_id, "P1", spot.bet_data("P1", 5))
+        with self.assertStatementBudget(7):
+            self.session_manager.remove_bet(self.session_id, "P1", spot.spot_key)
+
+    def test_place_bets_batch(self):
+        bets = [spot.bet_data("P1", value) for spot, value in zip(GRID_SPOTS, (5, 3, 3))]
+        # One lookup and update for the batch; the bet and event rows are inserted
+        # one by one where the driver cannot return their ids in bulk
+        with self.assertStatementBudget(4 + 2 * len(bets)):
+            result = self.session_manager.place_bets(self.session_id, "P1", bets)
+        self.assertTrue(result["success"], result)
+        state = self.session_manager.get_session_state(self.session_id)
+        self.assertEqual(len(state["current_bets"]), 3)
+
+    def test_place_bets_all_or_nothing(self):
+        # The second "3" token is fine, a third is not
+        bets = [spot.bet_data("P1", 3) for spot in GRID_SPOTS[:3]]
+        self.assertEqual(self.session_manager.place_bets(self.session_id, "P1", bets)["error"],
+                         "Token not available")
+        # Same spot twice in one batch
+        bets = [GRID_SPOTS[0].bet_data("P1", 5), GRID_SPOTS[0].bet_data("P1", 3)]
+        self.assertEqual(self.session_manager.place_bets(self.session_id, "P1", bets)["error"],
+                         "Spot already taken")
+        state = self.session_manager.get_session_state(self.session_id)
+        self.assertEqual(state["current_bets"], [])
+        player = next(p for p in state["players"] if p["name"] == "P1")
+        self.assertEqual(sum(player["used_tokens"].values()), 0)
+
+    def test_end_and_next_race(self):
+        self.place_bets(9)
+        with self.assertStatementBudget(8):
+            self.assertTrue(self.end_race())
+        with self.assertStatementBudget(7):
+            self.assertTrue(self.session_manager.next_race(self.session_id))
+
+    def test_used_tokens_are_persisted(self):
+        spot = GRID_SPOTS[0]
+        self.session_manager.place_bet(self.session_id, "P1", spot.bet_data("P1", 5))
+
+        other = SessionManager(self.SessionLocal())
+        player = next(p for p in other.get_session_state(self.session_id)["players"] if p["name"] == "P1")
+        self.assertEqual(player["used_tokens"]["5"], 1)
+        other.db.close()
+
+    def test_query_stats_summary(self):
+        self.place_bets(3)
+        summary = self.query_stats.summary(limit=5)
+        self.assertGreater(summary["statements"], 0)
+        self.assertLessEqual(len(summary["by_statement"]), 5)
+        self.assertLessEqual(len(summary["slowest"]), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Unit tests for per-message latency tracing.
+"""
+
+import unittest
+from server import tracing
+
+
+class TestTracing(unittest.TestCase):
+    def tearDown(self):
+        tracing._current.set(None)
+
+    def test_phases_accumulate_on_current_trace(self):
+        trace = tracing.start("ABC123")
+        self.assertIs(tracing.current(), trace)
+
+        tracing.record("commit", 0.001)
+        tracing.record("commit", 0.002)
+        with tracing.phase("state"):
+            pass
+
+        self.assertAlmostEqual(trace.phases["commit"], 0.003)
+        self.assertIn("state", trace.phases)
+
+    def test_phase_outside_trace_is_noop(self):
+        with tracing.phase("send"):
+            pass
+        tracing.record("commit", 1.0)
+        self.assertIsNone(tracing.current())
+
+    def test_client_trace_id(self):
+        trace = tracing.Trace("ABC123")
+        trace.use_client_id("client-1")
+        self.assertEqual(trace.trace_id, "client-1")
+        trace.use_client_id("x" * 100)
+        trace.use_client_id(42)
+        # Would forge fields or lines in the trace file
+        trace.use_client_id("a\tb")
+        trace.use_client_id("a\nb")
+        self.assertEqual(trace.trace_id, "client-1")
+
+    def test_format_is_one_tab_separated_line(self):
+        trace = tracing.Trace("ABC123")
+        trace.msg_type = "place_bet"
+        trace.add("parse", 0.000012)
+        trace.add("manager", 0.0005)
+
+        fields = trace.format(0.001).split("\t")
+        self.assertEqual(fields[1:5], [trace.trace_id, "ABC123", "place_bet", "1000"])
+        self.assertEqual(fields[5], "parse=12 manager=500")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -212,6 +212,7 @@ class UnifiedLauncher(ctk.CTk):
 
                 # Import the FastAPI app
                 from server.main import app as fastapi_app
+                from server.ws_protocol import DeflateWebSocketProtocol
 
                 # Start uvicorn in a background thread
                 def run_uvicorn():
@@ -224,6 +225,7 @@ class UnifiedLauncher(ctk.CTk):
                             fastapi_app,
                             host="0.0.0.0",
                             port=8000,
+                            ws=DeflateWebSocketProtocol,
                             log_level="info",
                             log_config=None,  # Disable default logging config for .exe compatibility
                             access_log=False   # Disable access logs to reduce console spam
@@ -295,6 +297,12 @@ class UnifiedLauncher(ctk.CTk):
                     text=f"✅ Server running!\n🔄 Launching game..."
                 ))
                 self.after(0, lambda: append_log("\n=== Server Started Successfully! ==="))
+                if os.getenv("ADMIN_TOKEN"):
+                    # The profiler samples the uvicorn thread, not this UI
+                    self.after(0, lambda: append_log(
+                        "Profiler: curl -H 'X-Admin-Token: <ADMIN_TOKEN>' "
+                        "'http://localhost:8000/admin/profile?seconds=10'"
+                    ))
                 self.after(0, lambda: append_log("Launching game..."))
 
                 time.sleep(1)
@@ -449,6 +457,9 @@ class UnifiedLauncher(ctk.CTk):
 
 def main():
     """Main entry point"""
+    from src.log import configure as configure_logging
+    configure_logging()
+
     ctk.set_appearance_mode("dark")
     ctk.set_default_color_theme("blue")
 